@@ -0,0 +1,238 @@
+"""
+Precomputed aggregate cube of the processed dataset, built once after cleaning.
+
+Most questions asked of the cleaned data are small groupbys: average order value per platform,
+rows per product category, mean rating per platform and city. The cube stores those answers
+for the low-cardinality dimensions (text/categorical/boolean columns) and the numeric measures:
+
+- grouping sets: the grand total, each dimension, and each pair of dimensions whose combined
+  cardinality stays under MAX_PAIR_CELLS,
+- per cell: the row count and, per measure, the non-null count, sum, min, max and a t-digest
+  quantile sketch (QUANTILES), computed multithreaded by pyarrow. The sketches are approximate
+  (a view of each cell's distribution), so medians are never answered from them.
+
+It is written as Parquet next to the processed file (CUBE_FILE_NAME) and remembers the size
+and mtime of the file it was built from, so a re-cleaned dataset never gets stale answers.
+`query_cube` answers drill-down queries (see drilldown.py) from it and returns None when it
+can't exactly (other columns, time grains, medians and other quantiles), so callers fall back
+to the raw rows.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import combinations
+
+import pandas as pd
+
+# --- Configuration ---
+CUBE_FILE_NAME = "aggregate_cube.parquet"
+MAX_DIMENSION_CARDINALITY = 50  # Text columns with more distinct values are not dimensions
+MAX_DIMENSIONS = 8
+MAX_MEASURES = 20
+MAX_PAIR_CELLS = 5_000  # Pairs of dimensions with more combinations are left to the raw rows
+CUBE_WORKERS = 8  # Grouping sets aggregated concurrently
+QUANTILES = (0.0, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 1.0)
+ID_LIKE_UNIQUE_RATIO = 0.95  # Integer columns this unique are identifiers, not measures
+GROUPING_COLUMN = "_grouping"  # Dimensions of a cell's grouping set, joined with GROUPING_SEPARATOR
+GROUPING_SEPARATOR = "|"
+COUNT_COLUMN = "_count"
+TOTAL_KEY = "__total__"
+MEASURE_STATS = ("count", "sum", "min", "max", "quantiles")
+CUBE_AGGREGATIONS = ("count", "sum", "mean", "min", "max")  # Exact from the stored sums/counts/extremes
+
+
+def cube_path(data_path):
+    """Path of the cube built for a processed dataset (in the same directory)."""
+    return os.path.join(os.path.dirname(os.path.abspath(data_path)), CUBE_FILE_NAME)
+
+def stat_column(measure, stat):
+    """Cube column holding one statistic of a measure, e.g. 'Order Value__sum'."""
+    return f"{measure}__{stat}"
+
+
+# --- Building ---
+
+def _choose_columns(path):
+    """(dimensions with their cardinality, measures) of a Parquet file, most compact dimensions first."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    n_rows = parquet_file.metadata.num_rows
+    dimensions, measures = {}, []
+    for field in parquet_file.schema_arrow:
+        if field.name.startswith("__index_level_"):
+            continue
+        field_type = field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+        is_text = pa.types.is_string(field_type) or pa.types.is_large_string(field_type) or pa.types.is_boolean(field_type)
+        if not (is_text or pa.types.is_integer(field_type) or pa.types.is_floating(field_type)):
+            continue  # Datetimes, nested types
+        if pa.types.is_floating(field_type):
+            measures.append(field.name)
+            continue
+        values = parquet_file.read(columns=[field.name]).column(0).cast(field_type)  # Categoricals on their values
+        n_unique = pc.count_distinct(values).as_py()
+        if is_text and n_unique <= MAX_DIMENSION_CARDINALITY:
+            dimensions[field.name] = n_unique
+        elif not is_text and n_unique < ID_LIKE_UNIQUE_RATIO * max(n_rows, 1):
+            measures.append(field.name)
+    dimensions = dict(sorted(dimensions.items(), key=lambda item: item[1])[:MAX_DIMENSIONS])
+    return dimensions, measures[:MAX_MEASURES]
+
+def _grouping_sets(dimensions):
+    sets = [()] + [(d,) for d in dimensions]
+    sets += [(a, b) for a, b in combinations(dimensions, 2) if dimensions[a] * dimensions[b] <= MAX_PAIR_CELLS]
+    return sets
+
+def _aggregate_cells(table, keys, measures):
+    """Cube cells of one grouping set (`keys` may be empty for the grand total) as a DataFrame."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    aggregations = [(table.column_names[0], "count", pc.CountOptions(mode="all"))]
+    for measure in measures:
+        aggregations += [(measure, "count"), (measure, "sum"), (measure, "min"), (measure, "max"),
+                         (measure, "tdigest", pc.TDigestOptions(q=list(QUANTILES)))]
+    # The grand total is grouped by a constant key: scalar t-digests don't come back one row long
+    source = table if keys else table.append_column(TOTAL_KEY, pa.repeat(pa.scalar(0, pa.int8()), table.num_rows))
+    cells = source.group_by(list(keys) or [TOTAL_KEY]).aggregate(aggregations)
+    if not keys:
+        cells = cells.drop_columns([TOTAL_KEY])
+    # pyarrow names aggregates "<column>_<function>"; the row count is the first one
+    names = {f"{table.column_names[0]}_count": COUNT_COLUMN}
+    for measure in measures:
+        names.update({f"{measure}_{stat}": stat_column(measure, stat) for stat in ("count", "sum", "min", "max")})
+        names[f"{measure}_tdigest"] = stat_column(measure, "quantiles")
+    cells = cells.rename_columns([names.get(name, name) for name in cells.column_names]).to_pandas()
+    cells.insert(0, GROUPING_COLUMN, GROUPING_SEPARATOR.join(keys))
+    return cells
+
+def build_cube(data_path, out_path=None):
+    """
+    Builds the aggregate cube of a processed Parquet dataset and writes it (atomically) to
+    `out_path` (default: cube_path(data_path)). Returns the path, or None when the dataset has
+    no dimensions or measures to aggregate.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    dimensions, measures = _choose_columns(data_path)
+    if not dimensions and not measures:
+        print("Aggregate cube skipped: no low-cardinality dimensions or numeric measures found.")
+        return None
+    table = pq.read_table(data_path, columns=list(dimensions) + measures)
+    for name in dimensions:  # Dimensions keep their type (text or boolean); categoricals are stored as their values
+        if pa.types.is_dictionary(table[name].type):
+            table = table.set_column(table.schema.get_field_index(name), name, table[name].cast(table[name].type.value_type))
+    for name in measures:
+        table = table.set_column(table.schema.get_field_index(name), name, table[name].cast(pa.float64()))
+
+    # Grouping sets are aggregated concurrently: pyarrow releases the GIL while it hashes
+    with ThreadPoolExecutor(max_workers=min(os.cpu_count() or 1, CUBE_WORKERS)) as pool:
+        parts = list(pool.map(lambda keys: _aggregate_cells(table, keys, measures), _grouping_sets(dimensions)))
+
+    cube = pd.concat(parts, ignore_index=True)
+    cube = cube[[GROUPING_COLUMN] + list(dimensions) + [COUNT_COLUMN]
+                + [stat_column(m, stat) for m in measures for stat in MEASURE_STATS]]
+    cube_table = pa.Table.from_pandas(cube, preserve_index=False)
+    stat = os.stat(data_path)
+    metadata = {"dimensions": list(dimensions), "measures": measures, "quantiles": list(QUANTILES),
+                "source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+    cube_table = cube_table.replace_schema_metadata({**(cube_table.schema.metadata or {}), b"aggregate_cube": json.dumps(metadata)})
+
+    out_path = out_path or cube_path(data_path)
+    tmp_path = f"{out_path}.tmp"
+    pq.write_table(cube_table, tmp_path)
+    os.replace(tmp_path, out_path)  # Readers never see a half-written cube
+    print(f"Aggregate cube: {len(cube):,} cells over {len(dimensions)} dimensions x {len(measures)} measures -> {out_path}")
+    return out_path
+
+
+# --- Loading ---
+
+@lru_cache(maxsize=4)
+def _read_cube(path, size, mtime_ns):
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    cube = json.loads(table.schema.metadata[b"aggregate_cube"])
+    cube["cells"] = table.to_pandas()
+    cube["groupings"] = {key: frozenset(key.split(GROUPING_SEPARATOR)) if key else frozenset()
+                         for key in cube["cells"][GROUPING_COLUMN].unique()}
+    return cube
+
+def load_cube(data_path):
+    """
+    The cube of a processed dataset as {"cells", "dimensions", "measures", "quantiles", "groupings"},
+    or None if it was not built or the dataset changed since.
+    """
+    path = cube_path(data_path)
+    try:
+        data_stat, cube_stat = os.stat(data_path), os.stat(path)
+        cube = _read_cube(path, cube_stat.st_size, cube_stat.st_mtime_ns)
+    except (OSError, KeyError, ValueError):
+        return None
+    if (cube["source_size"], cube["source_mtime_ns"]) != (data_stat.st_size, data_stat.st_mtime_ns):
+        return None
+    return cube
+
+
+# --- Queries ---
+
+def query_cube(cube, query):
+    """
+    Answers a drill-down query (see drilldown.py) from the cube, as the same DataFrame
+    run_drilldown would return. Returns None when the cube can't answer it exactly.
+    """
+    from drilldown import DEFAULT_LIMIT, filter_text, metric_name
+
+    group_by = list(query.get("group_by", []))
+    metrics = query.get("metrics") or [("*", "count")]
+    filters = query.get("filters", [])
+    if query.get("time_column") and query.get("time_grain"):
+        return None
+    if any(agg not in CUBE_AGGREGATIONS or (column == "*" and agg != "count") or (column != "*" and column not in cube["measures"])
+           for column, agg in metrics):
+        return None
+    if any(column not in cube["dimensions"] or op not in ("in", "==") for column, op, _ in filters):
+        return None
+    needed = frozenset(group_by) | {column for column, _, _ in filters}
+    # The smallest grouping set covering the query: the exact one when it was stored
+    candidates = sorted((key for key, dims in cube["groupings"].items() if needed <= dims),
+                        key=lambda key: len(cube["groupings"][key]))
+    if not candidates:
+        return None
+
+    cells = cube["cells"]
+    cells = cells[cells[GROUPING_COLUMN] == candidates[0]]
+    for column, op, value in filters:  # Compared as text, as the row path does (True -> 'true')
+        values = cells[column].map(filter_text, na_action="ignore")
+        if op == "in":
+            cells = cells[values.isin([filter_text(v) for v in value])]
+        else:
+            cells = cells[values == filter_text(value)]
+
+    groups = cells.groupby(group_by, dropna=False, sort=False) if group_by else [((), cells)]
+    rows = []
+    for key, group in groups:
+        row = dict(zip(group_by, key if isinstance(key, tuple) else (key,)))
+        for column, agg in metrics:
+            if column == "*":
+                row[metric_name(column, agg)] = int(group[COUNT_COLUMN].sum())
+            elif agg == "count":
+                row[metric_name(column, agg)] = int(group[stat_column(column, "count")].sum())
+            elif agg == "mean":
+                count = group[stat_column(column, "count")].sum()
+                row[metric_name(column, agg)] = group[stat_column(column, "sum")].sum() / count if count else None
+            else:
+                values = group[stat_column(column, agg)]
+                row[metric_name(column, agg)] = values.sum() if agg == "sum" else getattr(values, agg)()
+        rows.append(row)
+
+    result = pd.DataFrame(rows, columns=group_by + [metric_name(c, a) for c, a in metrics])
+    if group_by:  # Largest groups first, as run_drilldown orders them
+        result = result.sort_values(result.columns[len(group_by)], ascending=False)
+    return result.head(int(query.get("limit") or DEFAULT_LIMIT)).reset_index(drop=True)
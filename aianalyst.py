@@ -3,22 +3,16 @@ import re
 import subprocess
 import sys
 import tempfile
+from functools import lru_cache
 from typing import TypedDict, Annotated, Dict, Any
 
 # Third-party imports
 from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
 from langchain_core.tools import tool
-from langchain_google_genai import ChatGoogleGenerativeAI
 # Removed: from langchain_experimental.utilities import PythonREPL
-from langgraph.graph import END, StateGraph
-
-# Potentially used by generated code, keep for now unless confirmed unnecessary
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd # Often needed by generated code
-import plotly.express as px # Often needed by generated code
-import plotly.graph_objects as go # Often needed by generated code
-from tabulate import tabulate # Often needed by generated code
+# Generated code runs in a subprocess with its own imports (pandas, plotly, matplotlib, tabulate, ...), so they
+# are not imported here. The LLM client, the LangGraph workflow and the project helpers (which pull in
+# pandas/pyarrow/plotly) are loaded on first use, keeping `import aianalyst` cheap.
 
 
 # --- Configuration ---
@@ -26,6 +20,31 @@ from tabulate import tabulate # Often needed by generated code
 # os.environ["GEMINI_API_KEY"] = "YOUR_API_KEY" # Replace with your key if needed
 # Using the key provided in the original code
 GEMINI_MODEL_NAME = "gemini-2.5-pro-exp-03-25" # Use a stable, available Pro model like 1.5 Pro
+# Directory of this file; added to PYTHONPATH of executed code so scripts can import shared helpers (e.g. profiler.py)
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__)).replace("\\", "/")
+# Token budget for the compact dataset summary pasted into each planning prompt
+PLAN_PROMPT_TOKEN_BUDGET = 1500
+# Most relevant columns listed individually in planning prompts; the rest are rolled up into one line.
+# The full column list stays in the profile artifact (output/profiles/<fingerprint>.json).
+PLAN_PROMPT_MAX_COLUMNS = 40
+# The cleaned dataset is written as Parquet (see data_loader.processed_data_path); set True to also export a CSV copy
+EXPORT_PROCESSED_CSV = False
+# Rewrite `load_dataset(...)` in generated scripts to read only the columns/filters they use (see pushdown.py)
+ENABLE_PUSHDOWN = True
+# Engine for the analysis stage: "pandas", or "duckdb" to answer each question with SQL over the
+# cleaned file (multithreaded, spills to disk; see duckdb_backend.py). Falls back to pandas if duckdb is missing.
+ANALYSIS_BACKEND = "pandas"
+# Pick pandas / Polars / Dask / chunked pandas per stage from dataset size vs available memory (see execution_planner.py)
+ENABLE_ENGINE_PLANNER = True
+# "auto": clean in chunks across all cores (see chunked_cleaning.py) when the raw file is too large for memory;
+# "chunked" / "in_memory" force one mode
+CLEANING_MODE = "auto"
+# Render PNG thumbnails of the saved figures in a background process pool once a plotting step succeeds (needs kaleido)
+ENABLE_THUMBNAILS = True
+THUMBNAIL_PLOT_DIRS = {"execute_visualisation": "saved_plots", "execute_trends": "trend_plots"} # Figure directory per plotting step
+# Precompute grouped aggregates of the cleaned data after cleaning (see aggregate_cube.py); later scripts and the
+# UI drill-down answer groupbys from it through drilldown.run_drilldown
+BUILD_AGGREGATE_CUBE = True
 
 # --- Initialize Python REPL Tool (REPLACED with Subprocess Execution) ---
 # Removed: repl = PythonREPL()
@@ -46,6 +65,9 @@ def execute_python_code(code: Annotated[str, "Python code to execute using subpr
         error_message = "Execution Error: No valid Python code provided to execute."
         print(error_message)
         return error_message
+    if ENABLE_PUSHDOWN:
+        from pushdown import apply_pushdown
+        cleaned_code = apply_pushdown(cleaned_code)
 
     # Create a temporary file to store the code
     # Using delete=False so we control deletion after subprocess potentially errors
@@ -56,6 +78,10 @@ def execute_python_code(code: Annotated[str, "Python code to execute using subpr
             temp_file_path = tf.name
         print(f"Code written to temporary file: {temp_file_path}")
 
+        # Make the project's helper modules importable from the temporary script
+        env = os.environ.copy()
+        env["PYTHONPATH"] = os.pathsep.join(p for p in [PROJECT_DIR, env.get("PYTHONPATH", "")] if p)
+
         # Execute the temporary file using the same Python interpreter that runs this script
         # This helps ensure library availability matches the parent environment
         process = subprocess.run(
@@ -63,7 +89,8 @@ def execute_python_code(code: Annotated[str, "Python code to execute using subpr
             capture_output=True,
             text=True,
             encoding='utf-8', # Ensure consistent encoding
-            timeout=300  # Add a timeout (e.g., 5 minutes)
+            timeout=300,  # Add a timeout (e.g., 5 minutes)
+            env=env
         )
 
         print("--- Subprocess Execution Output ---")
@@ -148,26 +175,76 @@ def clean_code(code: str) -> str:
     cleaned = re.sub(r"^```[a-zA-Z]*\s*|\s*```$", "", code, flags=re.MULTILINE | re.DOTALL).strip()
     return cleaned
 
-# --- Initialize LLM --- (Unchanged)
-# Using the hardcoded API key from the environment variable set above
-model = ChatGoogleGenerativeAI(
-    model=GEMINI_MODEL_NAME,
-    api_key="", # Use env var
-    temperature=0.3,
-    # max_tokens=10000, # Adjust based on model limits if needed, 1.5 Pro has larger context
-    convert_system_message_to_human=True # Often improves compatibility with Gemini
-    # safety_settings=... # Optional: configure safety settings if needed
-)
+def analysis_backend() -> str:
+    """The engine the analysis script is generated for: ANALYSIS_BACKEND if usable, else 'pandas'."""
+    if ANALYSIS_BACKEND == "duckdb":
+        from duckdb_backend import duckdb_available
+        if duckdb_available():
+            return "duckdb"
+        print("Warning: ANALYSIS_BACKEND is 'duckdb' but duckdb is not installed. Generating a pandas analysis script.")
+    return "pandas"
+
+def cleaning_execution_plan(input_path: str, profile_dir: str):
+    """Engine plan for chunked cleaning per CLEANING_MODE, or None to clean the whole table in memory."""
+    if CLEANING_MODE == "in_memory":
+        return None
+    from data_loader import CHUNK_ROWS
+    from execution_planner import choose_engine
+    try:
+        engine_plan = choose_engine(input_path, profile_dir)
+    except Exception as e:
+        print(f"Warning: Could not plan the cleaning execution ({repr(e)}).")
+        engine_plan = {"engine": "pandas", "chunk_rows": CHUNK_ROWS, "reason": "planning failed"}
+    if CLEANING_MODE == "chunked" or engine_plan["engine"] != "pandas":
+        print(f"Cleaning in chunks of {engine_plan['chunk_rows']} rows ({engine_plan['reason']})")
+        return engine_plan
+    return None
+
+def build_compact_summary(state, plan_type: str) -> str:
+    """
+    Renders the cached dataset profile (written by the summary scripts) as a compact,
+    token-budgeted summary for the planning prompts. Returns "" if no profile is available.
+    """
+    from profiler import load_or_build_profile, serialize_profile, diff_profiles
+    try:
+        initial_profile = load_or_build_profile(state['initial_csv_path'], state['profile_dir'])
+        if plan_type == "cleaning":
+            return serialize_profile(initial_profile, PLAN_PROMPT_TOKEN_BUDGET, max_columns=PLAN_PROMPT_MAX_COLUMNS)
+        cleaned_profile = load_or_build_profile(state['input_csv_path'], state['profile_dir'], baseline=initial_profile)
+        return serialize_profile(cleaned_profile, PLAN_PROMPT_TOKEN_BUDGET, diff=diff_profiles(initial_profile, cleaned_profile),
+                                 max_columns=PLAN_PROMPT_MAX_COLUMNS)
+    except Exception as e:
+        print(f"Warning: Could not build compact profile summary: {repr(e)}. Falling back to the raw summary output.")
+        return ""
 
-# Bind the NEW execute_python_code tool to the model
-model_with_tools = model.bind_tools([execute_python_code])
+# --- Initialize LLM --- (Created on first use)
+@lru_cache(maxsize=None)
+def get_model():
+    """The chat model, created on first call."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    # Using the hardcoded API key from the environment variable set above
+    return ChatGoogleGenerativeAI(
+        model=GEMINI_MODEL_NAME,
+        api_key="", # Use env var
+        temperature=0.3,
+        # max_tokens=10000, # Adjust based on model limits if needed, 1.5 Pro has larger context
+        convert_system_message_to_human=True # Often improves compatibility with Gemini
+        # safety_settings=... # Optional: configure safety settings if needed
+    )
+
+@lru_cache(maxsize=None)
+def get_model_with_tools():
+    """The chat model with the execute_python_code tool bound."""
+    return get_model().bind_tools([execute_python_code])
 
 # --- Agent State Definition --- (Unchanged)
 class AgentState(TypedDict):
     initial_script_path: str       # HARDCODED Absolute Path to the initial python script
     cleaned_script_path: str     # HARDCODED Absolute Path to the script for summarizing cleaned data
     input_csv_path: str          # HARDCODED Absolute Path to the input CSV (changes after cleaning)
+    initial_csv_path: str        # The raw input CSV (input_csv_path before cleaning)
     output_dir: str              # HARDCODED Absolute Path Directory for saving outputs
+    profile_dir: str             # Cached dataset profiles, shared by the summary scripts and the planning prompts
 
     current_code: str            # Code currently being worked on
     code_description: str        # Description of the current code's purpose
@@ -206,6 +283,7 @@ class AgentState(TypedDict):
 
 def initialize_state(state: AgentState): # (Unchanged)
     """Initializes the agent's state with hardcoded absolute paths."""
+    from profiler import PROFILE_DIR_ENV
     print("--- Initializing State ---")
     state['iterations'] = 0
     state['max_rewrite_attempts'] = 4
@@ -222,6 +300,10 @@ def initialize_state(state: AgentState): # (Unchanged)
     state['cleaned_script_path'] = state['cleaned_script_path'].replace("\\", "/")
     state['input_csv_path'] = state['input_csv_path'].replace("\\", "/")
     state['output_dir'] = state['output_dir'].replace("\\", "/")
+    state['initial_csv_path'] = state['input_csv_path']
+    state['profile_dir'] = f"{state['output_dir']}/profiles"
+    # The summary scripts run in subprocesses that inherit the environment; profiler.PROFILE_DIR reads it there
+    os.environ[PROFILE_DIR_ENV] = state['profile_dir']
 
     # Initial step setup
     state['current_step'] = "initial_summary"
@@ -315,7 +397,7 @@ The code might generate output files (CSV, plots). These should be saved within
 
     try:
         # Invoke the model, expecting it to call the tool
-        ai_msg = model_with_tools.invoke(messages)
+        ai_msg = get_model_with_tools().invoke(messages)
         state['tool_output'] = "" # Reset tool output
 
         if not ai_msg.tool_calls:
@@ -391,11 +473,31 @@ The code might generate output files (CSV, plots). These should be saved within
                 state['cleaned_summary_content'] = state['tool_output'][len(summary_start):].strip()
             else:
                  state['cleaned_summary_content'] = state['tool_output'] # Store raw if prefix missing
+        elif state['current_step'] == "execute_cleaning" and BUILD_AGGREGATE_CUBE and state.get('output_dir'):
+            try:
+                from aggregate_cube import build_cube
+                from data_loader import processed_data_path
+                build_cube(processed_data_path(state['output_dir']))
+            except Exception as e:
+                print(f"Warning: Could not build the aggregate cube ({repr(e)}). Aggregates will be computed from the rows.")
+        elif state['current_step'] in THUMBNAIL_PLOT_DIRS and ENABLE_THUMBNAILS and state.get('output_dir'):
+            start_thumbnails(state)
 
 
     return state
 
 
+def start_thumbnails(state: AgentState):
+    """Starts rendering thumbnails of the figures the current plotting step saved; returns the background process or None."""
+    plot_dir = os.path.join(state['output_dir'], THUMBNAIL_PLOT_DIRS[state['current_step']]).replace("\\", "/")
+    try:
+        from thumbnails import start_thumbnail_renderer
+        return start_thumbnail_renderer(plot_dir)
+    except Exception as e:
+        print(f"Warning: Could not start the thumbnail renderer ({repr(e)}).")
+        return None
+
+
 def rewrite_code_on_error(state: AgentState): # (Unchanged in logic, but context from subprocess stderr is different)
     """Attempts to rewrite the code based on the execution error message."""
     state['rewrite_attempts'] += 1
@@ -415,8 +517,8 @@ def rewrite_code_on_error(state: AgentState): # (Unchanged in logic, but context
     # Determine the correct paths to emphasize based on the code description
     current_input_csv = state['input_csv_path']
     base_output_dir = state['output_dir']
-    cleaned_csv_filename = "data_processed.csv" # Relative filename
-    cleaned_csv_path_abs = os.path.join(base_output_dir, cleaned_csv_filename).replace("\\", "/")
+    from data_loader import processed_data_path
+    cleaned_csv_path_abs = processed_data_path(base_output_dir) # Parquet when pyarrow is available
     plot_dir_abs = os.path.join(base_output_dir, 'saved_plots').replace("\\", "/")
     trend_plot_dir_abs = os.path.join(base_output_dir, 'trend_plots').replace("\\", "/")
 
@@ -427,7 +529,7 @@ def rewrite_code_on_error(state: AgentState): # (Unchanged in logic, but context
         debug_instructions = f"""
     **Visualization/Plotting Specific Instructions:**
     - Ensure plots are saved to the correct *absolute* directory: '{plot_save_dir}'. Use `os.makedirs('{plot_save_dir}', exist_ok=True)` before saving.
-    - Ensure plots are saved correctly (e.g., `fig.write_html(os.path.join('{plot_save_dir}', 'filename.html'))` for plotly, `plt.savefig(os.path.join('{plot_save_dir}', 'filename.png'))` for matplotlib).
+    - Ensure plots are saved correctly (e.g., `save_figure(fig, os.path.join('{plot_save_dir}', 'filename.json'))` from `plot_utils` for plotly, `plt.savefig(os.path.join('{plot_save_dir}', 'filename.png'))` for matplotlib). Do not use `fig.write_html` (it inlines the 4 MB plotly.js bundle into every file).
     - If a plot fails due to complexity or unclear errors, comment out the failing section with explanation (`# Removed Plot X due to error: <error message>`). Wrap plotting calls in try-except blocks.
     - Check data preparation steps (type conversion, NaNs) before plotting. Use try-except blocks around individual plotting sections.
     - Ensure all necessary plotting libraries (plotly.express, plotly.graph_objects, matplotlib.pyplot) are imported.
@@ -436,14 +538,14 @@ def rewrite_code_on_error(state: AgentState): # (Unchanged in logic, but context
         debug_instructions = f"""
     **Data Cleaning Specific Instructions:**
     - Ensure the input CSV is read from the correct *absolute* path: '{current_input_csv}'.
-    - Ensure the final cleaned data is saved correctly to the *absolute* path: '{cleaned_csv_path_abs}'.
+    - Ensure the final cleaned data is saved correctly to the *absolute* path: '{cleaned_csv_path_abs}' using `save_dataset(df, output_cleaned_path, ...)` from `data_loader`.
     - Pay close attention to data types (`astype()`) and missing values (`fillna()`, `dropna()`). Check pandas operations carefully. Wrap steps in try-except.
     - Ensure `os` is imported if `os.path` or `os.makedirs` is used.
     """
     elif "analysis" in state['code_description'].lower():
         debug_instructions = f"""
     **Data Analysis Specific Instructions:**
-    - Ensure the input CSV (cleaned data) is read from the correct *absolute* path: '{current_input_csv}'. (Note: this should be the path to the cleaned data, usually '{cleaned_csv_path_abs}')
+    - Ensure the input CSV (cleaned data) is read from the correct *absolute* path: '{current_input_csv}' with `load_dataset(...)` from `data_loader`. (Note: this should be the path to the cleaned data, usually '{cleaned_csv_path_abs}')
     - Ensure `tabulate` is imported and used correctly for printing DataFrames (use `.head(10)` if large).
     - Check pandas operations (`groupby`, `value_counts`, aggregations). Use try-except blocks around individual analysis sections.
     """
@@ -464,6 +566,12 @@ Analyze the given Python code and the error message (likely from stderr). Correc
 *   Ensure all paths used for reading/writing files are **ABSOLUTE** paths as specified above and used correctly (e.g., using `r'...'` or forward slashes). Use `os.path.join()` correctly.
 *   Use `os.makedirs(..., exist_ok=True)` *before* attempting to save files into directories like plot dirs. Ensure `os` is imported.
 *   Ensure necessary libraries (pandas, plotly.*, os, re, matplotlib, seaborn, tabulate, sys) are imported. Check for `ImportError` or `ModuleNotFoundError` in the error message.
+*   If the script queries DuckDB through `duckdb_backend` (`connect_dataset`/`run_query`), keep that structure and fix the SQL instead (DuckDB dialect, column names in double quotes as in the dataset).
+*   If the script works out-of-core (Polars `lf`, Dask `ddf` or `iter_dataset_chunks`), keep that engine; do not switch to loading the whole dataset with pandas, it does not fit in memory.
+*   If a plot embeds raw rows (`px.histogram`, `px.scatter`, `px.box` on the full frame), switch to `binned_histogram`, `aggregated_scatter` or `box_from_stats` from `plot_utils` rather than removing it.
+*   If a `run_drilldown(...)` call fails, keep it and fix the query: literal column names, metrics as `(column, agg)` with agg one of count, sum, mean, min, max, median, count_distinct (`("*", "count")` for rows), filters as `(column, op, value)` with a list for `"in"`. Result columns are named `agg(column)`.
+*   If the script cleans in chunks (`run_chunked_cleaning`), keep that structure: whole-table statistics only in `compute_global_stats(summary)` through the `summary` methods (add the columns it reads to `STATS_COLUMNS`), row-local steps only in `clean_chunk`, and the run under `if __name__ == "__main__":`.
+*   Read datasets with `load_dataset(path)` and save the cleaned dataset with `save_dataset(df, path, ...)` (`from data_loader import load_dataset, save_dataset`). The cleaned dataset is a Parquet file with dtypes preserved; do not replace these calls with `pd.read_csv`/`df.to_csv`. Low-cardinality text columns are `category` dtype: to assign values that are not existing categories, convert first with `.astype(str)`; use `observed=True` in `groupby`.
 *   Add detailed `try-except Exception as e:` blocks around individual file operations, analysis steps, or plotting sections to catch errors locally and print informative messages (`print(f"Error in section X: {{repr(e)}}")`). This helps pinpoint failures.
 *   Address the specific error reported in the error message: `{error}`
 *   If a section seems fundamentally unfixable based on the error, comment it out clearly: `# Error: [description]. Correction: Commented out failing section due to unresolvable error.`
@@ -482,7 +590,7 @@ Analyze the given Python code and the error message (likely from stderr). Correc
     ]
 
     try:
-        ai_msg = model.invoke(messages)
+        ai_msg = get_model().invoke(messages)
         corrected_code = clean_code(ai_msg.content) # Clean potential markdown fences
 
         if corrected_code and corrected_code != clean_code(code_to_fix): # Check if code was generated and changed
@@ -568,6 +676,12 @@ def generate_plan(state: AgentState, plan_type: str): # (Unchanged)
             summary_content = state.get('tool_output', '') # Could be cleaning output or error
             summary_source = "Previous Step Output (Fallback)"
 
+    # Prefer the compact, token-budgeted rendering of the cached profile over the raw script stdout
+    compact_summary = build_compact_summary(state, plan_type)
+    if compact_summary:
+        summary_content = compact_summary
+        summary_source = f"{summary_source} (compact profile)"
+
     if not summary_content:
         print(f"Warning: No {summary_source} found to generate {plan_type} plan. Attempting generic plan.")
         summary_content = "No dataset summary was provided. Please generate a generic plan based on common data analysis tasks."
@@ -576,7 +690,8 @@ def generate_plan(state: AgentState, plan_type: str): # (Unchanged)
     # Use the initial state paths for clarity in the plan description
     initial_csv_abs = "D:/AI Data Analysis/data.csv".replace("\\", "/") # Explicit hardcode based on initialize
     output_dir_abs = state['output_dir'] # Absolute
-    cleaned_csv_abs = os.path.join(output_dir_abs, "data_processed.csv").replace("\\", "/")
+    from data_loader import processed_data_path
+    cleaned_csv_abs = processed_data_path(output_dir_abs) # Parquet when pyarrow is available
     plot_dir_abs = os.path.join(output_dir_abs, 'saved_plots').replace("\\", "/")
     trend_plot_dir_abs = os.path.join(output_dir_abs, 'trend_plots').replace("\\", "/")
 
@@ -645,10 +760,10 @@ def generate_plan(state: AgentState, plan_type: str): # (Unchanged)
 **Guidance for the Plan:**
 - Suggest specific columns and plot types.
 - Include simple aggregations if needed (e.g., "Bar chart of average Salary per Department").
-- Specify a meaningful title and output filename (e.g., `plot1_distribution.html`) for each plot. Code should save plots as HTML in the specified absolute plot directory. Code must use `os.makedirs('{plot_dir_abs}', exist_ok=True)`.
+- Specify a meaningful title and output filename (e.g., `plot1_distribution.json`) for each plot. Code should save plots as Plotly figure JSON in the specified absolute plot directory. Code must use `os.makedirs('{plot_dir_abs}', exist_ok=True)`.
 **Formatting Requirements (for this Plan):**
 - Output **only the visualization blueprint** in markdown. Use emojis (📈, 📊, 📉), bold text, numbered lists.
-- Example: `📈 **1. Distribution of Age**\n - Create histogram of `Age` using `plotly.express.histogram`. Title: 'Distribution of Age'. Save as `plot1_age_distribution.html` in '{os.path.basename(plot_dir_abs)}/'.`
+- Example: `📈 **1. Distribution of Age**\n - Create histogram of `Age` using `plotly.express.histogram`. Title: 'Distribution of Age'. Save as `plot1_age_distribution.json` in '{os.path.basename(plot_dir_abs)}/'.`
 - **Maximum 6 plots.**
 - **No Python code implementation.**
 - Do not suggest data cleaning or non-visualization analysis.
@@ -668,12 +783,12 @@ def generate_plan(state: AgentState, plan_type: str): # (Unchanged)
 - You also need to explain to user how to understand or explore each plot, and this should be done on the plot or image itself.
 
 **Guidance for the Plan:**
-- Suggest specific columns, analysis/plot type, title, and output filename (e.g., `trend1_correlation_heatmap.html`). Code should save plots as HTML. Code must use `os.makedirs('{trend_plot_dir_abs}', exist_ok=True)`.
+- Suggest specific columns, analysis/plot type, title, and output filename (e.g., `trend1_correlation_heatmap.json`). Code should save plots as Plotly figure JSON. Code must use `os.makedirs('{trend_plot_dir_abs}', exist_ok=True)`.
 - **Crucially: Do not simply repeat visualizations listed in the 'Already Planned Visualizations' section.** Focus on *different* or *deeper* insights.
 
 **Formatting Requirements (for this Plan):**
 - Output **only the trends/patterns blueprint** in markdown. Use emojis (🔍, ✨, 🧭), bold text, numbered lists.
-- Example: `🔍 **1. Explore Correlation between Feature A and B**\n - Generate scatter plot with trendline using `plotly.express.scatter`. Title: 'Trend between A and B'. Save as `trend1_A_vs_B.html` in '{os.path.basename(trend_plot_dir_abs)}/'.`
+- Example: `🔍 **1. Explore Correlation between Feature A and B**\n - Generate scatter plot with trendline using `plotly.express.scatter`. Title: 'Trend between A and B'. Save as `trend1_A_vs_B.json` in '{os.path.basename(trend_plot_dir_abs)}/'.`
 - **Maximum 6 trends/plots.**
 - **No Python code implementation.**
 - Do not suggest data cleaning.
@@ -696,7 +811,7 @@ def generate_plan(state: AgentState, plan_type: str): # (Unchanged)
     ]
 
     try:
-        ai_msg = model.invoke(messages)
+        ai_msg = get_model().invoke(messages)
         plan_content = ai_msg.content
         state[prompt_config["output_field"]] = plan_content
 
@@ -735,7 +850,8 @@ def generate_code_from_plan(state: AgentState, plan_type: str): # (Unchanged in
         # which should point to the cleaned data after the cleaning step runs.
         current_input_csv = state['input_csv_path'] # Absolute path to cleaned data
 
-    cleaned_csv_abs = os.path.join(base_output_dir, "data_processed.csv").replace("\\", "/")
+    from data_loader import processed_data_path
+    cleaned_csv_abs = processed_data_path(base_output_dir) # Parquet when pyarrow is available
     plot_dir_abs = os.path.join(base_output_dir, 'saved_plots').replace("\\", "/")
     trend_plot_dir_abs = os.path.join(base_output_dir, 'trend_plots').replace("\\", "/")
 
@@ -751,6 +867,7 @@ import pandas as pd
 import os
 import re # Include re just in case needed
 import sys # For potential path manipulation if needed, though absolute used
+from data_loader import load_dataset, optimize_dtypes, save_dataset # Shared loader/writer (Parquet output keeps dtypes)
 
 # --- Define ABSOLUTE paths to use ---
 input_path = r'{input_path_placeholder}' # Raw string literal for Windows paths
@@ -771,7 +888,7 @@ except Exception as e:
 
 try:
     # --- Read the input CSV using the absolute path ---
-    df = pd.read_csv(input_path)
+    df = load_dataset(input_path)
     print(f"Successfully loaded {{input_path}}. Initial Shape: {{df.shape}}")
 
     # === Implement Cleaning Steps from Plan Here ===
@@ -787,8 +904,9 @@ try:
     #     print(f"Error during cleaning step 'Age': {{repr(e_clean_step1)}}")
     # === End of Cleaning Steps ===
 
-    # --- Save the cleaned data to the absolute output path ---
-    df.to_csv(output_cleaned_path, index=False, encoding='utf-8') # Specify encoding
+    # --- Shrink dtypes (low-cardinality text -> category, downcast numbers), then save (Parquet keeps dtypes for later stages) ---
+    df = optimize_dtypes(df)
+    save_dataset(df, output_cleaned_path, csv_copy={export_csv_placeholder}) # Optional CSV export
     print(f"\\n**🧹 Cleaned data saved successfully to {{output_cleaned_path}}**")
     print(f"Cleaned data shape: {{df.shape}}")
 
@@ -804,6 +922,75 @@ except Exception as e:
     # raise e
 
 print("**Finished Data Cleaning Script**")
+"""
+        },
+        "cleaning_chunked": {
+            "plan_field": "cleaning_plan",
+            "code_description": "Data cleaning script based on plan (chunked, multi-core)",
+            "output_filename": "cleaning_code.py", # Relative to output_dir
+            "extra_instructions_template": """
+import pandas as pd
+import numpy as np
+import os
+import re # Include re just in case needed
+import sys
+from chunked_cleaning import run_chunked_cleaning # Pre-pass for global statistics, then parallel row-local cleaning
+
+# --- Define ABSOLUTE paths to use ---
+input_path = r'{input_path_placeholder}' # Raw string literal for Windows paths
+output_cleaned_path = r'{output_csv_placeholder}' # Raw string literal
+CHUNK_ROWS = {chunk_rows_placeholder} # Rows per chunk (sized by the execution planner to fit in memory)
+DROP_DUPLICATES = False # Set True if the plan removes exact duplicate rows (handled across chunks)
+
+# === Global Operations: whole-table statistics, computed once in a streaming pre-pass ===
+STATS_COLUMNS = [] # Columns compute_global_stats needs; only these are read in the pre-pass
+
+def compute_global_stats(summary):
+    \"\"\"
+    `summary` holds running aggregates of STATS_COLUMNS over every row (the table is never loaded at once):
+    summary.median(col), .quantile(col, q), .mean(col), .std(col), .min(col), .max(col), .sum(col), .count(col),
+    .nulls(col), .mode(col), .value_counts(col). Numeric ones coerce values like pd.to_numeric(errors='coerce').
+    Returns the constants clean_chunk needs (medians, caps, modes).
+    \"\"\"
+    stats = {{}}
+    # (LLM inserts global statistics from the cleaning plan)
+    # Example:
+    # stats['age_median'] = summary.median('Age')
+    # stats['income_cap'] = summary.quantile('Income', 0.99)
+    # stats['city_mode'] = summary.mode('City')
+    return stats
+
+# === Row-Local Operations: applied to each chunk independently, in parallel ===
+def clean_chunk(chunk, stats):
+    \"\"\"Cleans one chunk using only its own rows and the precomputed `stats`. Must not aggregate across rows.\"\"\"
+    # (LLM inserts row-local cleaning steps from the cleaning plan)
+    # Example:
+    # chunk['Name'] = chunk['Name'].str.strip().str.title()
+    # chunk['Age'] = pd.to_numeric(chunk['Age'], errors='coerce').fillna(stats['age_median'])
+    # chunk['Income'] = chunk['Income'].clip(upper=stats['income_cap'])
+    return chunk
+
+if __name__ == "__main__": # Required: chunks are cleaned in worker processes that import this script
+    print(f"**Starting Data Cleaning Script (chunked)**")
+    print(f"Input file: {{input_path}}")
+    print(f"Output file: {{output_cleaned_path}}")
+    try:
+        n_rows = run_chunked_cleaning(
+            input_path, output_cleaned_path, clean_chunk,
+            compute_stats=compute_global_stats, stats_columns=STATS_COLUMNS,
+            chunk_rows=CHUNK_ROWS, drop_duplicates=DROP_DUPLICATES, csv_copy={export_csv_placeholder},
+            optimize_dtypes=True, # Same dtypes as in-memory cleaning (category, int32/float32), one schema for every row group
+        )
+        print(f"\\n**🧹 Cleaned data saved successfully to {{output_cleaned_path}}**")
+        print(f"Cleaned data rows: {{n_rows}}")
+    except FileNotFoundError:
+        print(f"FATAL ERROR: Input file '{{input_path}}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred during data cleaning: {{repr(e)}}")
+        sys.exit(1)
+
+    print("**Finished Data Cleaning Script**")
 """
         },
         "analysis": {
@@ -814,6 +1001,8 @@ print("**Finished Data Cleaning Script**")
 import pandas as pd
 import os
 import sys
+from data_loader import load_dataset # Shared loader (cleaned data is Parquet with dtypes preserved)
+from drilldown import run_drilldown # Grouped aggregates, answered from the precomputed aggregate cube when it can
 try:
     from tabulate import tabulate # Make sure tabulate is available
 except ImportError:
@@ -836,8 +1025,8 @@ print("**Starting Data Analysis Script**")
 print(f"Input cleaned file: {{input_csv_path}}")
 
 try:
-    # --- Read the input CSV (cleaned data) using absolute path ---
-    df = pd.read_csv(input_csv_path)
+    # --- Read the cleaned data (Parquet, dtypes preserved) using absolute path ---
+    df = load_dataset(input_csv_path, optimize=True) # Memory-optimised dtypes (categoricals, downcast numbers)
     print(f"Successfully loaded {{input_csv_path}}. Shape: {{df.shape}}")
 
     # === Implement Analysis Steps from Plan Here ===
@@ -870,6 +1059,54 @@ except Exception as e:
     print(f"An unexpected error occurred during data analysis setup or execution: {{repr(e)}}")
     # raise e
 
+print("\\n**Finished Data Analysis Script**")
+"""
+        },
+        "analysis_duckdb": {
+            "plan_field": "analysis_plan",
+            "code_description": "Data analysis script based on plan (DuckDB SQL)",
+            "output_filename": "analysis_code.py", # Relative to output_dir
+            "extra_instructions_template": """ You also need to explain to user how to understand or make sense of each analysis.
+import pandas as pd
+import os
+import sys
+from duckdb_backend import connect_dataset, run_query # DuckDB view over the cleaned file; results printed with tabulate
+
+# --- Define ABSOLUTE path for input cleaned data ---
+input_csv_path = r'{input_path_placeholder}' # Raw string literal
+
+print("**Starting Data Analysis Script**")
+print(f"Input cleaned file: {{input_csv_path}}")
+
+try:
+    # --- Expose the cleaned data (Parquet) as the DuckDB view `data`; nothing is loaded into pandas up front ---
+    con = connect_dataset(input_csv_path)
+    n_rows = con.execute("SELECT COUNT(*) FROM data").fetchone()[0]
+    print(f"Successfully opened {{input_csv_path}} as DuckDB view 'data'. Rows: {{n_rows}}")
+
+    # === Implement Analysis Steps from Plan Here (one SQL query per question) ===
+    # (LLM inserts code based on the analysis plan)
+    # Example using try-except per step:
+    # print("\\n**❓ Analysis: [Question 1 from plan]**")
+    # try:
+    #     result1 = run_query(con, (
+    #         'SELECT "some_column", COUNT(*) AS count FROM data '
+    #         'GROUP BY "some_column" ORDER BY count DESC'
+    #     )) # Prints the top 10 rows as a table and returns the full result as a DataFrame
+    # except Exception as e_step1:
+    #     print(f"Error during analysis step 1: {{repr(e_step1)}}")
+    # === End of Analysis Steps ===
+
+except FileNotFoundError:
+    print(f"FATAL ERROR: Input file '{{input_csv_path}}' not found. Make sure the cleaning step ran successfully and saved the file correctly.")
+    sys.exit(1)
+except ImportError as e_imp:
+    print(f"FATAL ERROR: Required library not installed: {{e_imp}}. Cannot proceed with analysis.")
+    sys.exit(1)
+except Exception as e:
+    print(f"An unexpected error occurred during data analysis setup or execution: {{repr(e)}}")
+    # raise e
+
 print("\\n**Finished Data Analysis Script**")
 """
         },
@@ -885,6 +1122,10 @@ import plotly.graph_objects as go
 import os
 import sys
 import matplotlib.pyplot as plt # Also import matplotlib in case needed
+from data_loader import load_dataset # Shared loader (cleaned data is Parquet with dtypes preserved)
+from drilldown import run_drilldown # Grouped aggregates, answered from the precomputed aggregate cube when it can
+from plot_utils import save_figure # Saves compact figure JSON (plotly.js is not inlined into every plot)
+from plot_utils import binned_histogram, aggregated_scatter, box_from_stats # Aggregate here so figures stay small at any row count
 
 # --- Define ABSOLUTE paths ---
 input_csv_path = r'{input_path_placeholder}' # Raw string literal
@@ -903,8 +1144,8 @@ except Exception as e:
     # Decide if script should exit, maybe allow continuing if some plots fail
 
 try:
-    # --- Read the input CSV (cleaned data) using absolute path ---
-    df = pd.read_csv(input_csv_path)
+    # --- Read the cleaned data (Parquet, dtypes preserved) using absolute path ---
+    df = load_dataset(input_csv_path, optimize=True) # Memory-optimised dtypes (categoricals, downcast numbers)
     print(f"Successfully loaded {{input_csv_path}}. Shape: {{df.shape}}")
 
     # === Implement Visualization Steps from Plan Here ===
@@ -912,10 +1153,9 @@ try:
     # Example using try-except per plot:
     # print("\\n**📊 Generating: [Plot 1 description from plan]**")
     # try:
-    #     fig1 = px.histogram(df, x='Age', title='Distribution of Age')
+    #     fig1 = binned_histogram(df, x='Age', title='Distribution of Age') # Not px.histogram: bins are computed here
     #     # Construct absolute path for the plot file
-    #     plot_filename1 = os.path.join(output_plot_dir, 'plot1_age_distribution.html')
-    #     fig1.write_html(plot_filename1)
+    #     plot_filename1 = save_figure(fig1, os.path.join(output_plot_dir, 'plot1_age_distribution.json'))
     #     print(f"Plot saved to {{plot_filename1}}")
     # except KeyError as e_key:
     #     print(f"KeyError generating plot 1: {{repr(e_key)}} - Column 'Age' might be missing.")
@@ -950,6 +1190,10 @@ import plotly.graph_objects as go
 import os
 import sys
 import matplotlib.pyplot as plt # Also import matplotlib in case needed
+from data_loader import load_dataset # Shared loader (cleaned data is Parquet with dtypes preserved)
+from drilldown import run_drilldown # Grouped aggregates, answered from the precomputed aggregate cube when it can
+from plot_utils import save_figure # Saves compact figure JSON (plotly.js is not inlined into every plot)
+from plot_utils import binned_histogram, aggregated_scatter, box_from_stats # Aggregate here so figures stay small at any row count
 
 # --- Define ABSOLUTE paths ---
 input_csv_path = r'{input_path_placeholder}' # Raw string literal
@@ -968,8 +1212,8 @@ except Exception as e:
     # Decide if script should exit
 
 try:
-    # --- Read the input CSV (cleaned data) using absolute path ---
-    df = pd.read_csv(input_csv_path)
+    # --- Read the cleaned data (Parquet, dtypes preserved) using absolute path ---
+    df = load_dataset(input_csv_path, optimize=True) # Memory-optimised dtypes (categoricals, downcast numbers)
     print(f"Successfully loaded {{input_csv_path}}. Shape: {{df.shape}}")
 
     # === Implement Trend Investigation Steps from Plan Here ===
@@ -982,8 +1226,7 @@ try:
     #     if len(numeric_cols) > 1:
     #         corr = df[numeric_cols].corr()
     #         fig_trend1 = px.imshow(corr, text_auto=True, aspect="auto", title='Correlation Heatmap')
-    #         plot_filename_trend1 = os.path.join(output_plot_dir, 'trend1_correlation_heatmap.html')
-    #         fig_trend1.write_html(plot_filename_trend1)
+    #         plot_filename_trend1 = save_figure(fig_trend1, os.path.join(output_plot_dir, 'trend1_correlation_heatmap.json'))
     #         print(f"Trend plot saved to {{plot_filename_trend1}}")
     #     else:
     #         print("Skipping correlation heatmap: Not enough numeric columns found.")
@@ -1010,7 +1253,15 @@ print("\\n**Finished Trends & Patterns Investigation Script**")
         }
 
 
-    config = plan_details_config.get(plan_type)
+    backend = analysis_backend() if plan_type == "analysis" else "pandas"
+    cleaning_plan = cleaning_execution_plan(current_input_csv, state['profile_dir']) if plan_type == "cleaning" else None
+    if backend == "duckdb":
+        template_key = "analysis_duckdb"
+    elif cleaning_plan is not None:
+        template_key = "cleaning_chunked"
+    else:
+        template_key = plan_type
+    config = plan_details_config.get(template_key)
     if not config:
         print(f"Error: Invalid plan type '{plan_type}' for code generation.")
         state['stop_execution'] = True
@@ -1026,7 +1277,9 @@ print("\\n**Finished Trends & Patterns Investigation Script**")
     if plan_type == "cleaning":
         formatted_instructions = config["extra_instructions_template"].format(
             input_path_placeholder=current_input_csv, # Should be the initial CSV path
-            output_csv_placeholder=cleaned_csv_abs
+            output_csv_placeholder=cleaned_csv_abs,
+            export_csv_placeholder=EXPORT_PROCESSED_CSV,
+            chunk_rows_placeholder=cleaning_plan["chunk_rows"] if cleaning_plan else None
         )
     elif plan_type == "analysis":
         formatted_instructions = config["extra_instructions_template"].format(
@@ -1049,6 +1302,28 @@ print("\\n**Finished Trends & Patterns Investigation Script**")
         return state
 
 
+    # Datasets larger than memory get an out-of-core engine (DuckDB already handles that for analysis)
+    backend_instructions = ""
+    if ENABLE_ENGINE_PLANNER and plan_type != "cleaning" and backend == "pandas":
+        from execution_planner import adapt_template, choose_engine, engine_instructions
+        try:
+            engine_plan = choose_engine(current_input_csv, state['profile_dir'])
+            print(f"Execution engine for {plan_type}: {engine_plan['engine']} ({engine_plan['reason']})")
+        except Exception as e:
+            print(f"Warning: Could not plan the execution engine ({repr(e)}). Using pandas.")
+            engine_plan = {"engine": "pandas"}
+        formatted_instructions = adapt_template(formatted_instructions, engine_plan)
+        backend_instructions = engine_instructions(engine_plan)
+    if cleaning_plan is not None:
+        backend_instructions = """
+*   The raw file is too large to clean in memory, so this script cleans it **in chunks across all cores**. Split the cleaning plan into (1) global operations: statistics over the whole table such as medians, means, modes and percentile caps, computed in `compute_global_stats(summary)` with the `summary` methods (`median`, `quantile`, `mean`, `std`, `min`, `max`, `mode`, `value_counts`, ...) over only the columns listed in `STATS_COLUMNS`; and (2) row-local operations: trimming, case normalisation, type casts, regex fixes, fillna/clip with the precomputed constants, applied in `clean_chunk(chunk, stats)`. `clean_chunk` must not compute anything across rows (no `.median()`, `.mode()`, `.drop_duplicates()` there) and must return columns with the same dtypes for every chunk. Only if the plan removes exact duplicate rows, set `DROP_DUPLICATES = True` (they are dropped across chunks in a final pass over the output). Keep `clean_chunk` and `compute_global_stats` at module level and the run under `if __name__ == "__main__":`."""
+    elif backend == "duckdb":
+        backend_instructions = """
+*   This analysis runs on **DuckDB**: answer each analysis question with a SQL query against the view `data` executed via `run_query(con, sql)` (it prints the first rows with tabulate and returns the full result as a DataFrame). Use DuckDB SQL and quote column names with double quotes (e.g. `"Product Category"`). Do not load the whole table into pandas; small query results may be post-processed with pandas."""
+    if plan_type in ("analysis", "visualisation", "trends") and backend == "pandas" and BUILD_AGGREGATE_CUBE:
+        backend_instructions += """
+*   For grouped summaries of the cleaned data (counts, sums, means, min/max or medians of a numeric column per one or two categorical columns, optionally filtered on categorical values), prefer `from drilldown import run_drilldown` over a pandas `groupby`: `run_drilldown(input_csv_path, {"group_by": ["Platform"], "metrics": [("Order Value (INR)", "mean"), ("*", "count")], "filters": [("Product Category", "in", ["Books", "Toys"])]})`. It answers from the aggregate cube precomputed after cleaning without reading the rows, and falls back to the rows when the cube can't answer. Result columns are named like `mean(Order Value (INR))` and `count(*)`; groups come largest first."""
+
     # Construct the final prompt for code generation
     messages = [
         SystemMessage(
@@ -1058,11 +1333,13 @@ You will be given a plan ({config['code_description']}) and need to write a comp
 **CRITICAL INSTRUCTIONS:**
 *   The script MUST use the **ABSOLUTE paths** provided within the base script structure below for all file operations (reading CSVs, saving CSVs, saving plots). Use raw string literals (e.g., `r'D:/path/to/file.csv'`) or forward slashes for paths.
 *   Import necessary standard libraries: `pandas`, `os`, `sys`, `re`.
+*   Load and save datasets only through `from data_loader import load_dataset, save_dataset` exactly as in the base structure. The raw input file may be a gzip/zstd-compressed CSV, Parquet or Feather file whatever its name; `load_dataset` detects the format from the content. The cleaned dataset is Parquet with dtypes (including datetimes and categoricals) preserved, so do not re-parse dates that are already datetime. Datasets are loaded memory-optimised: low-cardinality text columns are `category` (convert with `.astype(str)` before assigning new values such as fill-ins; pass `observed=True` to `groupby`) and numbers may be int32/float32. Keep `df = optimize_dtypes(df)` right before saving in the cleaning script.
 *   Import required plotting/output libraries: `plotly.express as px`, `plotly.graph_objects as go`, `matplotlib.pyplot as plt`, `from tabulate import tabulate`. Wrap `tabulate` import in try-except if needed.
+*   Plotly figures must not embed every raw row. For distributions, raw-point scatters and box plots use the `plot_utils` helpers instead of `px.histogram`/`px.scatter`/`px.box`: `binned_histogram(df, x=..., color=None, nbins=50, title=...)`, `aggregated_scatter(df, x=..., y=..., color=None, title=..., **px_kwargs)` (plain scatter when small, density grid or sample when large) and `box_from_stats(df, y=..., x=None, title=...)`. Name the columns literally. For bar/line/pie charts, aggregate first (`groupby(...).agg(...)`) and plot the aggregated frame.
 *   Implement each step from the provided plan within the designated sections ('=== Implement ... Steps from Plan Here ===') of the base structure.
 *   Use robust `try-except Exception as e:` blocks for file I/O and individual analysis/plotting steps. Print informative error messages if exceptions occur (`print(f"Error in section X: {{repr(e)}}")`). Use `sys.exit(1)` after printing FATAL errors (like file not found).
 *   Ensure directories for output (plots, cleaned data) are created using `os.makedirs(..., exist_ok=True)` *before* writing files to them.
-*   Follow output requirements from the plan (e.g., saving plots to correct absolute paths as HTML, using `print()` with markdown formatting for analysis steps, using `tabulate` with `.head(10)` for large tables).
+*   Follow output requirements from the plan (e.g., saving Plotly figures to correct absolute paths with `save_figure(fig, path)` from `plot_utils` as `.json`, never `fig.write_html`, using `print()` with markdown formatting for analysis steps, using `tabulate` with `.head(10)` for large tables).{backend_instructions}
 
 **Base Script Structure (Use this template and fill in the implementation):**
 ```python
@@ -1082,7 +1359,7 @@ You will be given a plan ({config['code_description']}) and need to write a comp
     ]
 
     try:
-        ai_msg = model.invoke(messages)
+        ai_msg = get_model().invoke(messages)
         generated_code = clean_code(ai_msg.content)
 
         if not generated_code:
@@ -1200,6 +1477,7 @@ def generate_trends_code(state: AgentState):
 
 def route_after_execution(state: AgentState):
     """Determines the next step after code execution based on success/error and current step."""
+    from langgraph.graph import END
     print(f"""
 --- Routing after Execution ({state['current_step']}) ---""")
     if state.get('stop_execution', False):
@@ -1244,73 +1522,77 @@ def route_after_execution(state: AgentState):
 
 # --- Build the Graph --- (Unchanged structure, nodes remain the same)
 
-workflow = StateGraph(AgentState)
-
-# Add Core Nodes
-workflow.add_node("initialize_state", initialize_state)
-workflow.add_node("execute_code", execute_code) # This node now uses the new tool internally
-workflow.add_node("rewrite_code", rewrite_code_on_error)
-
-# Add Planning Nodes
-workflow.add_node("plan_cleaning", plan_cleaning)
-workflow.add_node("plan_analysis", plan_analysis)
-workflow.add_node("plan_visualisation", plan_visualisation)
-workflow.add_node("plan_trends", plan_trends)
-
-# Add Code Generation Nodes
-workflow.add_node("generate_cleaning_code", generate_cleaning_code)
-workflow.add_node("generate_analysis_code", generate_analysis_code)
-workflow.add_node("generate_visualisation_code", generate_visualisation_code)
-workflow.add_node("generate_trends_code", generate_trends_code)
-
-# Special node to load the script for summarizing cleaned data
-workflow.add_node("load_cleaned_summary_script", load_cleaned_summary_script)
-
-
-# --- Define Edges --- (Unchanged)
-
-# Entry Point
-workflow.set_entry_point("initialize_state")
-
-# Initial Summary Flow: Initialize -> Execute Initial Script
-workflow.add_edge("initialize_state", "execute_code")
-
-# Routing after any code execution (initial, cleaning, cleaned_summary, analysis, viz, trends)
-workflow.add_conditional_edges(
-    "execute_code",
-    route_after_execution,
-    {
-        "rewrite_code": "rewrite_code",          # If execution failed and retries remain
-        "plan_cleaning": "plan_cleaning",          # Success: After initial summary
-        "load_cleaned_summary_script": "load_cleaned_summary_script", # Success: After cleaning code
-        "plan_analysis": "plan_analysis",          # Success: After cleaned summary script
-        "plan_visualisation": "plan_visualisation",    # Success: After analysis code
-        "plan_trends": "plan_trends",              # Success: After visualisation code
-        END: END                                 # If error limit reached, final success, or unknown state
-    }
-)
-
-# Loop back after rewrite attempt -> Execute again
-workflow.add_edge("rewrite_code", "execute_code")
+@lru_cache(maxsize=None)
+def get_app():
+    """The compiled LangGraph workflow, built on first call."""
+    from langgraph.graph import END, StateGraph
+
+    workflow = StateGraph(AgentState)
+
+    # Add Core Nodes
+    workflow.add_node("initialize_state", initialize_state)
+    workflow.add_node("execute_code", execute_code) # This node now uses the new tool internally
+    workflow.add_node("rewrite_code", rewrite_code_on_error)
+
+    # Add Planning Nodes
+    workflow.add_node("plan_cleaning", plan_cleaning)
+    workflow.add_node("plan_analysis", plan_analysis)
+    workflow.add_node("plan_visualisation", plan_visualisation)
+    workflow.add_node("plan_trends", plan_trends)
+
+    # Add Code Generation Nodes
+    workflow.add_node("generate_cleaning_code", generate_cleaning_code)
+    workflow.add_node("generate_analysis_code", generate_analysis_code)
+    workflow.add_node("generate_visualisation_code", generate_visualisation_code)
+    workflow.add_node("generate_trends_code", generate_trends_code)
+
+    # Special node to load the script for summarizing cleaned data
+    workflow.add_node("load_cleaned_summary_script", load_cleaned_summary_script)
+
+
+    # --- Define Edges --- (Unchanged)
+
+    # Entry Point
+    workflow.set_entry_point("initialize_state")
+
+    # Initial Summary Flow: Initialize -> Execute Initial Script
+    workflow.add_edge("initialize_state", "execute_code")
+
+    # Routing after any code execution (initial, cleaning, cleaned_summary, analysis, viz, trends)
+    workflow.add_conditional_edges(
+        "execute_code",
+        route_after_execution,
+        {
+            "rewrite_code": "rewrite_code",          # If execution failed and retries remain
+            "plan_cleaning": "plan_cleaning",          # Success: After initial summary
+            "load_cleaned_summary_script": "load_cleaned_summary_script", # Success: After cleaning code
+            "plan_analysis": "plan_analysis",          # Success: After cleaned summary script
+            "plan_visualisation": "plan_visualisation",    # Success: After analysis code
+            "plan_trends": "plan_trends",              # Success: After visualisation code
+            END: END                                 # If error limit reached, final success, or unknown state
+        }
+    )
 
-# After Planning -> Go directly to Code Generation
-workflow.add_edge("plan_cleaning", "generate_cleaning_code")
-workflow.add_edge("plan_analysis", "generate_analysis_code")
-workflow.add_edge("plan_visualisation", "generate_visualisation_code")
-workflow.add_edge("plan_trends", "generate_trends_code")
+    # Loop back after rewrite attempt -> Execute again
+    workflow.add_edge("rewrite_code", "execute_code")
 
-# After Code Generation -> Go to Execute the generated code
-workflow.add_edge("generate_cleaning_code", "execute_code")
-workflow.add_edge("generate_analysis_code", "execute_code")
-workflow.add_edge("generate_visualisation_code", "execute_code")
-workflow.add_edge("generate_trends_code", "execute_code")
+    # After Planning -> Go directly to Code Generation
+    workflow.add_edge("plan_cleaning", "generate_cleaning_code")
+    workflow.add_edge("plan_analysis", "generate_analysis_code")
+    workflow.add_edge("plan_visualisation", "generate_visualisation_code")
+    workflow.add_edge("plan_trends", "generate_trends_code")
 
-# After loading cleaned summary script -> Execute it
-workflow.add_edge("load_cleaned_summary_script", "execute_code")
+    # After Code Generation -> Go to Execute the generated code
+    workflow.add_edge("generate_cleaning_code", "execute_code")
+    workflow.add_edge("generate_analysis_code", "execute_code")
+    workflow.add_edge("generate_visualisation_code", "execute_code")
+    workflow.add_edge("generate_trends_code", "execute_code")
 
+    # After loading cleaned summary script -> Execute it
+    workflow.add_edge("load_cleaned_summary_script", "execute_code")
 
-# Compile the graph
-app = workflow.compile()
+    # Compile the graph
+    return workflow.compile()
 
 # --- Run the Workflow ---
 # if __name__ == "__main__":
@@ -1323,7 +1605,7 @@ app = workflow.compile()
 
 #     # Stream the execution
 #     try:
-#         for event in app.stream(initial_state):
+#         for event in get_app().stream(initial_state):
 #             # Print event information (which node is running, the output)
 #             for node_name, output in event.items():
 #                 print(f"--- Event: Node '{node_name}' ---")
@@ -1347,9 +1629,9 @@ def run_agent():
     print("Starting Agent Workflow...")
     # We don't need to pass state, initialize_state handles it
     try:
-        app.invoke({"iterations":1})
+        get_app().invoke({"iterations":1})
         # Stream events for progress updates
-        # for event in app.stream({}):
+        # for event in get_app().stream({}):
         #     for node, output in event.items():
         #         print(f"\n--- Completed Node: {node} ---")
         #         # Optionally print state details or outputs here for debugging
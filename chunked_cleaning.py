@@ -0,0 +1,485 @@
+"""
+Chunked, multi-core execution of the generated cleaning script for large raw files.
+
+The cleaning plan is split into two kinds of operations:
+
+- global: statistics over the whole table (medians, percentile caps, modes, ...). A streaming
+  pre-pass reads only the columns they need, chunk by chunk, into running aggregates
+  (`StreamingStats`: counts, sums, min/max, value counts and a quantile sketch), and
+  `compute_stats(summary) -> dict` derives the constants from those.
+- row-local: trimming, case normalisation, type casts, fillna with the precomputed constants, ...
+  Applied to each chunk independently in a process pool (`clean_chunk(chunk, stats) -> DataFrame`).
+
+Cleaned chunks are written in their original order as row groups of one Parquet file, so memory
+stays at a few chunks whatever the file size. (One file rather than a partitioned directory: the
+loaders, DuckDB view, cube and fingerprinting downstream all take a single file, and row groups
+give readers the same per-chunk granularity.) Exact duplicate rows can be dropped across chunks:
+each row's 64-bit hash is spilled to one of DEDUP_PARTITIONS files next to the output, the files
+are resolved one at a time, and the repeated rows are removed in a final pass over the written
+row groups, so memory stays bounded whatever the row count.
+
+Dtypes are optimised as `data_loader.optimize_dtypes` does for in-memory cleaning: while the
+chunks are written, the distinct values of text columns (up to MAX_TRACKED_VALUES) and the
+ranges of numeric columns are tracked, and the final pass rewrites every row group with the
+same schema (low-cardinality text as one fixed, sorted set of categories; int32/float32 where
+every chunk fits).
+
+The generated script must define `clean_chunk` at module level and call `run_chunked_cleaning`
+under `if __name__ == "__main__":`, because worker processes import the script.
+"""
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (
+    CATEGORY_MAX_UNIQUE_RATIO, CHUNK_ROWS, PARQUET_SUFFIXES, columnar_available, iter_dataset_chunks, memory_report,
+)
+
+# --- Configuration ---
+PENDING_CHUNKS_PER_WORKER = 2  # Chunks queued per worker; bounds memory while keeping all cores busy
+SKETCH_SIZE = 10_000  # Quantile sketch centroids per column (exact while a column has fewer distinct values)
+MAX_TRACKED_VALUES = 100_000  # Distinct values counted per column for modes/value counts
+DEDUP_PARTITIONS = 64  # Spill files of row hashes; one is held in memory at a time (16 bytes per row)
+REWRITE_CSV_ROWS = 500_000  # Rows per chunk when a CSV output is rewritten
+
+
+# --- Global Statistics ---
+
+class _ColumnSketch:
+    """Running aggregates of one column: numeric count/sum/mean/variance, min/max, a quantile sketch and value counts."""
+
+    def __init__(self):
+        self.nulls = 0
+        self.count = 0  # Non-null numeric values
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean, merged per chunk (Chan et al.)
+        self.min = None
+        self.max = None
+        self.centroids = np.empty(0)
+        self.weights = np.empty(0)
+        self.value_counts = pd.Series(dtype="int64")
+        self.counts_complete = True
+
+    def update(self, series):
+        self.nulls += int(series.isna().sum())
+        if self.counts_complete:
+            counts = series.value_counts(dropna=True)
+            counts = counts[counts > 0]  # Unused categories
+            self.value_counts = self.value_counts.add(counts, fill_value=0).astype("int64")
+            if len(self.value_counts) > MAX_TRACKED_VALUES:
+                self.value_counts, self.counts_complete = pd.Series(dtype="int64"), False
+        if pd.api.types.is_bool_dtype(series):
+            series = series.astype("float64")
+        if not (pd.api.types.is_numeric_dtype(series) or series.dtype == object or pd.api.types.is_string_dtype(series)):
+            return  # Datetimes etc.: value counts only
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        chunk_mean = float(values.mean())
+        delta = chunk_mean - self.mean
+        total = self.count + len(values)
+        self.m2 += float(((values - chunk_mean) ** 2).sum()) + delta * delta * self.count * len(values) / total
+        self.mean += delta * len(values) / total
+        self.count = total
+        self.sum += float(values.sum())
+        self.min = float(values.min()) if self.min is None else min(self.min, float(values.min()))
+        self.max = float(values.max()) if self.max is None else max(self.max, float(values.max()))
+        self._merge(*np.unique(values, return_counts=True))
+
+    def _merge(self, values, weights):
+        """Merges weighted values into the sketch, compressing to SKETCH_SIZE equal-weight centroids when it grows larger."""
+        values, inverse = np.unique(np.concatenate([self.centroids, values]), return_inverse=True)
+        weights = np.bincount(inverse, weights=np.concatenate([self.weights, weights]))
+        if len(values) > SKETCH_SIZE:
+            bins = np.minimum(((np.cumsum(weights) - weights) / weights.sum() * SKETCH_SIZE).astype("int64"), SKETCH_SIZE - 1)
+            total = np.bincount(bins, weights=weights)
+            keep = total > 0
+            values = np.bincount(bins, weights=values * weights)[keep] / total[keep]
+            weights = total[keep]
+        self.centroids, self.weights = values, weights
+
+    def quantile(self, q):
+        """Linear-interpolated quantile like `Series.quantile` (exact until the sketch is compressed)."""
+        if not self.count:
+            return np.nan
+        position = q * (self.count - 1)
+        ends = np.cumsum(self.weights) - 1  # Last sorted position covered by each centroid
+        lower = self.centroids[np.searchsorted(ends, np.floor(position))]
+        upper = self.centroids[np.searchsorted(ends, np.ceil(position))]
+        return float(lower + (upper - lower) * (position - np.floor(position)))
+
+
+class StreamingStats:
+    """
+    Whole-table statistics of the pre-pass columns, accumulated chunk by chunk. Numeric statistics
+    coerce values like `pd.to_numeric(..., errors='coerce')` and skip missing values, like pandas.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._sketches = {col: _ColumnSketch() for col in self.columns}
+
+    def update(self, chunk):
+        for col in self.columns:
+            self._sketches[col].update(chunk[col])
+
+    def _sketch(self, column):
+        if column not in self._sketches:
+            raise KeyError(f"'{column}' is not in STATS_COLUMNS")
+        return self._sketches[column]
+
+    def count(self, column):
+        return self._sketch(column).count
+
+    def nulls(self, column):
+        return self._sketch(column).nulls
+
+    def sum(self, column):
+        return self._sketch(column).sum
+
+    def mean(self, column):
+        sketch = self._sketch(column)
+        return sketch.mean if sketch.count else np.nan
+
+    def std(self, column):
+        """Sample standard deviation (ddof=1, like pandas)."""
+        sketch = self._sketch(column)
+        if sketch.count < 2:
+            return np.nan
+        return float(np.sqrt(sketch.m2 / (sketch.count - 1)))
+
+    def min(self, column):
+        value = self._sketch(column).min
+        return np.nan if value is None else value
+
+    def max(self, column):
+        value = self._sketch(column).max
+        return np.nan if value is None else value
+
+    def quantile(self, column, q=0.5):
+        return self._sketch(column).quantile(q)
+
+    def median(self, column):
+        return self.quantile(column, 0.5)
+
+    def value_counts(self, column):
+        """Counts of every non-null value, most frequent first."""
+        sketch = self._sketch(column)
+        if not sketch.counts_complete:
+            raise ValueError(f"'{column}' has more than {MAX_TRACKED_VALUES} distinct values")
+        return sketch.value_counts.sort_values(ascending=False, kind="stable")
+
+    def mode(self, column):
+        """Most frequent non-null value (the smallest one on ties, like `Series.mode()[0]`), or None."""
+        counts = self.value_counts(column)
+        if counts.empty:
+            return None
+        return min(counts.index[counts == counts.iloc[0]])
+
+
+# --- Output ---
+
+class _ChunkWriter:
+    """Appends cleaned chunks to a Parquet file (one row group per chunk) or a CSV file, atomically on close."""
+
+    def __init__(self, path, csv_copy=False):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.parquet = os.path.splitext(str(path))[1].lower() in PARQUET_SUFFIXES and columnar_available()
+        self.csv_path = os.path.splitext(str(path))[0] + ".csv" if csv_copy and self.parquet else None
+        self.writer = None
+        self.schema = None
+        self.n_rows = 0
+        self.n_chunks = 0
+        dir_name = os.path.dirname(str(path))
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+
+    def write(self, chunk):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self.writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                self.schema = table.schema
+                self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+            else:
+                # Every row group must share the first chunk's schema (e.g. an all-null chunk column is cast back)
+                table = pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+            self.writer.write_table(table)
+        else:
+            chunk.to_csv(self.tmp_path, mode="a" if self.n_chunks else "w", header=not self.n_chunks, index=False, encoding='utf-8')
+        self.n_rows += len(chunk)
+        self.n_chunks += 1
+
+    def close(self, drop_rows=None, dtypes=None):
+        """
+        Finishes the file. Rows numbered (in write order) in the sorted array `drop_rows` are removed
+        and Parquet columns are cast to `dtypes` ({column: dtype}) in a final pass; the CSV copy is
+        written from the finished rows.
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if not self.n_chunks:
+            raise ValueError("No rows were written: the input is empty or every chunk was dropped.")
+        drop_rows = drop_rows if drop_rows is not None else np.empty(0, dtype="int64")
+        if len(drop_rows) or (dtypes and self.parquet):
+            self._rewrite(drop_rows, dtypes if self.parquet else None)
+        if self.csv_path:
+            self._write_csv_copy()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+        for path in (self.tmp_path, f"{self.tmp_path}.rewrite"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _rewrite(self, drop_rows, dtypes=None):
+        """Copies the temporary file chunk by chunk without the rows in `drop_rows`, cast to `dtypes`."""
+        rewrite_path = f"{self.tmp_path}.rewrite"
+        first_row, n_rows = 0, 0
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            source = pq.ParquetFile(self.tmp_path)
+            writer, before, after = None, 0, 0
+            try:
+                for i in range(source.num_row_groups):
+                    table = source.read_row_group(i)
+                    table = table.filter(pa.array(_keep_mask(drop_rows, first_row, table.num_rows)))
+                    first_row += source.metadata.row_group(i).num_rows
+                    if dtypes:
+                        chunk = table.to_pandas()
+                        before += int(chunk.memory_usage(index=False, deep=True).sum())
+                        chunk = chunk.astype(dtypes)
+                        after += int(chunk.memory_usage(index=False, deep=True).sum())
+                        # The first row group fixes the schema (same categories and widths for every row group)
+                        table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(rewrite_path, table.schema)
+                    if table.num_rows:
+                        writer.write_table(table)
+                        n_rows += table.num_rows
+            finally:
+                if writer is not None:
+                    writer.close()
+            if dtypes:
+                print(f"Optimised dtypes of {len(dtypes)} columns, in memory: {memory_report({'before': before, 'after': after})}")
+        else:
+            # Read back as text so the kept rows are copied unchanged
+            with pd.read_csv(self.tmp_path, dtype=str, keep_default_na=False, chunksize=REWRITE_CSV_ROWS) as reader:
+                for chunk in reader:
+                    kept = chunk[_keep_mask(drop_rows, first_row, len(chunk))]
+                    kept.to_csv(rewrite_path, mode="a" if first_row else "w", header=not first_row, index=False, encoding='utf-8')
+                    first_row += len(chunk)
+                    n_rows += len(kept)
+        os.replace(rewrite_path, self.tmp_path)
+        self.n_rows = n_rows
+
+    def _write_csv_copy(self):
+        import pyarrow.parquet as pq
+
+        source = pq.ParquetFile(self.tmp_path)
+        for i in range(source.num_row_groups):
+            source.read_row_group(i).to_pandas().to_csv(self.csv_path, mode="a" if i else "w", header=not i, index=False, encoding='utf-8')
+
+
+class _DtypePlanner:
+    """
+    Chooses the dtypes `optimize_dtypes` would give the whole cleaned table, from the chunks as
+    they are written: distinct values of text columns (up to MAX_TRACKED_VALUES), integer ranges,
+    and whether float columns fit float32 without loss.
+    """
+
+    def __init__(self):
+        self.n_rows = 0
+        self.columns = {}  # name -> {"kind": "text" | "int" | "float", ...}, or None when it can't be optimised
+
+    def add(self, chunk):
+        self.n_rows += len(chunk)
+        for name in chunk.columns:
+            series = chunk[name].dropna()
+            if series.empty or (name in self.columns and self.columns[name] is None):
+                continue
+            kind = _optimisable_kind(series)
+            state = self.columns.setdefault(name, {"kind": kind} if kind else None)
+            if state is None or state["kind"] != kind:
+                self.columns[name] = None  # Not optimisable, or the dtype changed between chunks
+            elif kind == "text":
+                try:
+                    state.setdefault("values", set()).update(series.unique().tolist())
+                except TypeError:  # Unhashable cells (dicts, lists)
+                    self.columns[name] = None
+                    continue
+                if len(state["values"]) > MAX_TRACKED_VALUES:
+                    self.columns[name] = None
+            elif kind == "int":
+                state["min"] = min(state.get("min", series.min()), series.min())
+                state["max"] = max(state.get("max", series.max()), series.max())
+            else:
+                state["lossless"] = state.get("lossless", True) and np.array_equal(
+                    series.to_numpy(dtype="float64").astype("float32").astype("float64"), series.to_numpy(dtype="float64"))
+
+    def dtypes(self, n_rows, max_unique_ratio=CATEGORY_MAX_UNIQUE_RATIO):
+        """{column: dtype} for the columns to shrink, given the number of rows kept."""
+        info = np.iinfo("int32")
+        dtypes = {}
+        for name, state in self.columns.items():
+            if state is None:
+                continue
+            if state["kind"] == "text" and len(state["values"]) < max_unique_ratio * n_rows:
+                try:
+                    dtypes[name] = pd.CategoricalDtype(sorted(state["values"]))
+                except TypeError:  # Mixed types can't be sorted like astype("category") would
+                    continue
+            elif state["kind"] == "int" and info.min <= state["min"] and state["max"] <= info.max:
+                dtypes[name] = "int32"
+            elif state["kind"] == "float" and state["lossless"]:
+                dtypes[name] = "float32"
+        return dtypes
+
+
+def _optimisable_kind(series):
+    """'text', 'int' or 'float' for the dtypes optimize_dtypes shrinks, else None."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        return "text"
+    if pd.api.types.is_bool_dtype(dtype) or not isinstance(dtype, np.dtype):
+        return None
+    if dtype.kind in "iu" and dtype.itemsize > 4:
+        return "int"
+    if dtype.kind == "f" and dtype.itemsize > 4:
+        return "float"
+    return None
+
+
+def _keep_mask(drop_rows, first_row, n_rows):
+    """Boolean mask of rows [first_row, first_row + n_rows) not listed in the sorted `drop_rows`."""
+    keep = np.ones(n_rows, dtype=bool)
+    lo, hi = np.searchsorted(drop_rows, [first_row, first_row + n_rows])
+    keep[drop_rows[lo:hi] - first_row] = False
+    return keep
+
+
+class _DuplicateFinder:
+    """
+    Finds rows that repeat an earlier row. Each row's hash and row number go to one of
+    DEDUP_PARTITIONS spill files (chosen by hash), so equal rows meet in the same file and
+    only one file is in memory at a time.
+    """
+
+    RECORD = np.dtype([("hash", "<u8"), ("row", "<i8")])
+
+    def __init__(self, spill_dir):
+        self.spill_dir = spill_dir
+        self.n_rows = 0
+
+    def _path(self, partition):
+        return os.path.join(self.spill_dir, f"hashes_{partition}.bin")
+
+    def add(self, chunk):
+        """Records the rows of the next chunk written."""
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy(dtype="uint64")
+        records = np.empty(len(hashes), dtype=self.RECORD)
+        records["hash"] = hashes
+        records["row"] = np.arange(self.n_rows, self.n_rows + len(hashes))
+        self.n_rows += len(hashes)
+        partitions = hashes % DEDUP_PARTITIONS
+        order = np.argsort(partitions, kind="stable")
+        bounds = np.searchsorted(partitions[order], np.arange(DEDUP_PARTITIONS + 1))
+        for partition in np.flatnonzero(np.diff(bounds)):
+            with open(self._path(partition), "ab") as f:
+                records[order[bounds[partition]:bounds[partition + 1]]].tofile(f)
+
+    def duplicate_rows(self):
+        """Sorted numbers of the rows whose values already appeared in an earlier row."""
+        duplicates = [np.empty(0, dtype="int64")]
+        for partition in range(DEDUP_PARTITIONS):
+            if not os.path.exists(self._path(partition)):
+                continue
+            records = np.fromfile(self._path(partition), dtype=self.RECORD)
+            records = records[np.lexsort((records["row"], records["hash"]))]  # Equal hashes together, first row first
+            repeated = np.flatnonzero(records["hash"][1:] == records["hash"][:-1]) + 1
+            duplicates.append(records["row"][repeated])
+        return np.sort(np.concatenate(duplicates))
+
+
+# --- Execution ---
+
+def compute_global_stats(input_path, compute_stats, stats_columns, chunk_rows=CHUNK_ROWS):
+    """Streaming pre-pass: accumulates `stats_columns` chunk by chunk and returns `compute_stats(summary)`."""
+    if compute_stats is None:
+        return {}
+    summary = StreamingStats(stats_columns or [])
+    if stats_columns:
+        for chunk in iter_dataset_chunks(input_path, chunk_rows, columns=list(stats_columns)):
+            summary.update(chunk)
+    return compute_stats(summary) or {}
+
+def run_chunked_cleaning(input_path, output_path, clean_chunk, compute_stats=None, stats_columns=None,
+                         chunk_rows=CHUNK_ROWS, n_jobs=None, drop_duplicates=False, csv_copy=False, optimize_dtypes=True):
+    """
+    Cleans `input_path` chunk by chunk into `output_path` (Parquet row groups, or CSV without pyarrow).
+    `compute_stats(summary)` gets a `StreamingStats` of the `stats_columns` and returns the global constants;
+    `clean_chunk(chunk, stats)` applies the row-local steps. `n_jobs` defaults to all cores. With
+    `optimize_dtypes=True` the Parquet output gets the dtypes data_loader.optimize_dtypes would give it.
+    Returns the number of rows written.
+    """
+    start = time.time()
+    stats = compute_global_stats(input_path, compute_stats, stats_columns, chunk_rows)
+    print(f"Global statistics computed ({len(stats)} values) in {time.time() - start:.1f}s")
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    writer = _ChunkWriter(output_path, csv_copy)
+    spill_dir = tempfile.mkdtemp(prefix=".dedup-", dir=os.path.dirname(os.path.abspath(output_path))) if drop_duplicates else None
+    duplicates = _DuplicateFinder(spill_dir) if drop_duplicates else None
+    dtypes = _DtypePlanner() if optimize_dtypes and writer.parquet else None
+    n_input_rows = 0
+
+    def write(cleaned):
+        if duplicates is not None:
+            duplicates.add(cleaned)
+        if dtypes is not None:
+            dtypes.add(cleaned)
+        writer.write(cleaned)
+
+    try:
+        if n_jobs == 1:
+            for chunk in iter_dataset_chunks(input_path, chunk_rows):
+                n_input_rows += len(chunk)
+                write(clean_chunk(chunk, stats))
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                pending = deque()
+                for chunk in iter_dataset_chunks(input_path, chunk_rows):
+                    n_input_rows += len(chunk)
+                    pending.append(pool.submit(clean_chunk, chunk, stats))
+                    if len(pending) >= n_jobs * PENDING_CHUNKS_PER_WORKER:
+                        write(pending.popleft().result())  # Results are written in input order
+                while pending:
+                    write(pending.popleft().result())
+        drop_rows = duplicates.duplicate_rows() if duplicates is not None else None
+        n_kept = writer.n_rows - (len(drop_rows) if drop_rows is not None else 0)
+        writer.close(drop_rows, dtypes.dtypes(n_kept) if dtypes is not None else None)
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        if spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    print(f"Cleaned {n_input_rows} rows in {writer.n_chunks} chunks on {n_jobs} workers -> {writer.n_rows} rows "
+          f"written to {output_path} in {time.time() - start:.1f}s")
+    return writer.n_rows
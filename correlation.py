@@ -0,0 +1,138 @@
+"""
+Correlation and categorical association engine for wide tables.
+
+- Pearson correlation is computed in column blocks (pairwise-complete, i.e. NaNs are
+  ignored per pair of columns, like `DataFrame.corr()`), with block pairs spread over a
+  thread pool. Each task converts only its two blocks to float arrays; the heavy lifting
+  is numpy matrix products, which release the GIL.
+- Categorical association uses Cramér's V from contingency counts (`np.bincount` on
+  factorized codes), so no crosstab DataFrames are built.
+- `top_pairs` extracts only the k strongest pairs for the LLM prompt; the full matrices
+  are kept by the caller as artifacts.
+"""
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations_with_replacement
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+CORR_BLOCK_SIZE = 64  # Columns per block
+MAX_ASSOCIATION_CATEGORIES = 50  # Skip categorical columns with more distinct values than this
+MIN_PAIR_OBSERVATIONS = 2
+
+
+def _n_jobs(n_jobs):
+    return n_jobs or os.cpu_count() or 1
+
+
+# --- Numeric Correlation ---
+
+def _block_correlation(xa, ma, xb, mb):
+    """Pairwise-complete Pearson correlation between the columns of two (centered, zero-filled) blocks."""
+    n = ma.T @ mb
+    sum_a = xa.T @ mb
+    sum_b = ma.T @ xb
+    sum_aa = (xa * xa).T @ mb
+    sum_bb = ma.T @ (xb * xb)
+    sum_ab = xa.T @ xb
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sum_ab - sum_a * sum_b / n
+        var_a = sum_aa - sum_a * sum_a / n
+        var_b = sum_bb - sum_b * sum_b / n
+        corr = cov / np.sqrt(var_a * var_b)
+    corr[n < MIN_PAIR_OBSERVATIONS] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+def _block_arrays(df_numeric, block):
+    """Centered, zero-filled values and non-null weights of one column block, built per block to bound memory."""
+    values = df_numeric.iloc[:, block].to_numpy(dtype="float64", na_value=np.nan)
+    mask = ~np.isnan(values)
+    # Center on column means first: keeps the sum-of-products formula numerically stable
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # All-NaN columns
+        means = np.nanmean(values, axis=0) if len(values) else np.zeros(values.shape[1])
+    return np.where(mask, values - means, 0.0), mask.astype("float64")
+
+def blockwise_correlation(df_numeric, block_size=CORR_BLOCK_SIZE, n_jobs=None):
+    """
+    Correlation matrix of the numeric columns, computed block by block across threads. Only the
+    blocks being multiplied are held as float arrays. Like `DataFrame.corr()`, columns without
+    variance get NaN, also on the diagonal.
+    """
+    columns = list(df_numeric.columns)
+    blocks = [slice(start, start + block_size) for start in range(0, len(columns), block_size)]
+    result = np.full((len(columns), len(columns)), np.nan)
+
+    def compute(pair):
+        a, b = pair
+        xa, ma = _block_arrays(df_numeric, a)
+        xb, mb = (xa, ma) if a == b else _block_arrays(df_numeric, b)
+        result[a, b] = _block_correlation(xa, ma, xb, mb)
+        result[b, a] = result[a, b].T
+
+    with ThreadPoolExecutor(max_workers=_n_jobs(n_jobs)) as pool:
+        list(pool.map(compute, combinations_with_replacement(blocks, 2)))
+
+    # A column correlates perfectly with itself unless it has no variance (0/0 gave NaN)
+    diagonal = np.diagonal(result).copy()
+    np.fill_diagonal(result, np.where(np.isnan(diagonal), np.nan, 1.0))
+    return pd.DataFrame(result, index=columns, columns=columns)
+
+
+# --- Categorical Association ---
+
+def _cramers_v(codes_a, k_a, codes_b, k_b):
+    """Cramér's V between two factorized columns (code -1 marks missing values)."""
+    valid = (codes_a >= 0) & (codes_b >= 0)
+    n = int(valid.sum())
+    if n < MIN_PAIR_OBSERVATIONS or k_a < 2 or k_b < 2:
+        return np.nan
+    observed = np.bincount(codes_a[valid] * k_b + codes_b[valid], minlength=k_a * k_b).reshape(k_a, k_b)
+    # Drop categories absent from this pair's complete rows so they don't count towards the degrees of freedom
+    observed = observed[observed.sum(axis=1) > 0][:, observed.sum(axis=0) > 0]
+    r, k = observed.shape
+    if r < 2 or k < 2:
+        return np.nan
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / n
+    chi2 = ((observed - expected) ** 2 / expected).sum()
+    return float(np.sqrt(chi2 / n / (min(r, k) - 1)))
+
+def cramers_v_matrix(df_categorical, max_categories=MAX_ASSOCIATION_CATEGORIES, n_jobs=None):
+    """Cramér's V matrix for the categorical columns with 2..max_categories distinct values."""
+    factorized = {}
+    for col in df_categorical.columns:
+        codes, uniques = pd.factorize(df_categorical[col].astype(str).where(df_categorical[col].notna()))
+        if 2 <= len(uniques) <= max_categories:
+            factorized[col] = (codes, len(uniques))
+
+    columns = list(factorized)
+    result = pd.DataFrame(np.eye(len(columns)), index=columns, columns=columns)
+
+    def compute(pair):
+        a, b = pair
+        return a, b, _cramers_v(*factorized[a], *factorized[b])
+
+    pairs = [(columns[i], columns[j]) for i in range(len(columns)) for j in range(i + 1, len(columns))]
+    with ThreadPoolExecutor(max_workers=_n_jobs(n_jobs)) as pool:
+        for a, b, value in pool.map(compute, pairs):
+            result.loc[a, b] = result.loc[b, a] = value
+    return result
+
+
+# --- Prompt Extraction ---
+
+def top_pairs(matrix, k=10):
+    """The k strongest off-diagonal pairs of a symmetric matrix as [column_a, column_b, value], by |value|."""
+    if matrix.shape[0] < 2:
+        return []
+    values = matrix.to_numpy(dtype="float64")
+    rows, cols = np.triu_indices(len(values), k=1)
+    pair_values = values[rows, cols]
+    keep = ~np.isnan(pair_values)
+    rows, cols, pair_values = rows[keep], cols[keep], pair_values[keep]
+    order = np.argsort(-np.abs(pair_values))[:k]
+    names = list(matrix.columns)
+    return [[names[rows[i]], names[cols[i]], round(float(pair_values[i]), 4)] for i in order]
@@ -0,0 +1,391 @@
+"""
+Shared dataset loading and saving for the generated scripts, the summary scripts and the Streamlit UI.
+
+The cleaned dataset is written as Parquet (dtypes, categoricals and datetimes preserved), so later
+stages don't re-parse a CSV and re-infer types. A CSV copy can still be exported on request.
+
+CSV files that have been profiled get a schema sidecar (`<file>.schema.json`, written by profiler.py)
+with dtypes, categorical candidates and datetime formats. CSV reads then pass explicit `dtype=` and
+`parse_dates=` to the multithreaded pyarrow engine instead of inferring every type again.
+
+Input files are recognised by their content, not their name: Parquet, Feather/Arrow IPC and CSV,
+the latter optionally gzip- or zstd-compressed (decompressed while streaming, no uncompressed copy).
+
+`optimize_dtypes` (or `load_dataset(..., optimize=True)`) shrinks a loaded DataFrame: low-cardinality
+text columns become `category` and numeric columns are downcast to the smallest type that holds them.
+"""
+import json
+import logging
+import operator
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+PROCESSED_DATA_BASENAME = "data_processed"
+PARQUET_SUFFIXES = (".parquet", ".pq")
+FEATHER_SUFFIXES = (".feather", ".arrow")
+SCHEMA_SIDECAR_SUFFIX = ".schema.json"
+FILTER_OPERATORS = {"==": operator.eq, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+# Leading bytes of each supported file type: (magic, format, compression)
+MAGIC_BYTES = (
+    (b"PAR1", "parquet", None),
+    (b"ARROW1", "feather", None),
+    (b"\x1f\x8b", "csv", "gzip"),
+    (b"\x28\xb5\x2f\xfd", "csv", "zstd"),
+)
+CHUNK_ROWS = 500_000  # Default rows per chunk for iter_dataset_chunks
+CATEGORY_MAX_UNIQUE_RATIO = 0.5  # Text columns with fewer distinct values than this share of rows become 'category'
+SOURCE_DTYPES_ATTR = "source_dtypes"  # df.attrs key: dtypes of the columns optimize_dtypes changed, before the change
+MEMORY_SAVED_ATTR = "memory_saved"  # df.attrs key: {"before": bytes, "after": bytes} measured by optimize_dtypes
+
+logger = logging.getLogger(__name__)
+
+
+def columnar_available():
+    """True if pyarrow (needed for Parquet/Feather) is installed."""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def processed_data_path(output_dir):
+    """Path of the cleaned dataset: Parquet when pyarrow is available, CSV otherwise."""
+    suffix = ".parquet" if columnar_available() else ".csv"
+    return os.path.join(output_dir, PROCESSED_DATA_BASENAME + suffix).replace("\\", "/")
+
+def _file_format(path):
+    """Format from the file extension (used when writing)."""
+    suffix = os.path.splitext(str(path))[1].lower()
+    if suffix in PARQUET_SUFFIXES:
+        return "parquet"
+    if suffix in FEATHER_SUFFIXES:
+        return "feather"
+    return "csv"
+
+def format_from_magic(head):
+    """(format, compression) matching the leading bytes of a file, or None if unrecognised."""
+    for magic, file_format, compression in MAGIC_BYTES:
+        if head.startswith(magic):
+            return file_format, compression
+    return None
+
+def detect_format(path):
+    """(format, compression) of an existing dataset from its content; falls back to the extension."""
+    try:
+        with open(path, "rb") as f:
+            detected = format_from_magic(f.read(8))
+    except OSError:
+        detected = None
+    return detected or (_file_format(path), None)
+
+
+# --- Schema Sidecar ---
+
+def schema_sidecar_path(path):
+    """Path of the schema sidecar for a CSV file."""
+    return str(path) + SCHEMA_SIDECAR_SUFFIX
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def write_schema_sidecar(path, schema):
+    """
+    Writes the schema sidecar for `path`. `schema` maps "columns" to
+    {column: {"dtype": ..., "categorical": bool, "datetime_format": str or None}}.
+    """
+    sidecar = {**schema, "signature": _file_signature(path)}
+    try:
+        with open(schema_sidecar_path(path), "w", encoding="utf-8") as f:
+            json.dump(sidecar, f, indent=1)
+    except OSError as e:
+        print(f"Warning: Could not write schema sidecar for {path}: {repr(e)}")
+
+def read_schema_sidecar(path):
+    """Returns the schema sidecar of `path`, or None if missing or stale (file changed since it was written)."""
+    try:
+        with open(schema_sidecar_path(path), "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        if sidecar.get("signature") != _file_signature(path):
+            return None
+        return sidecar
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _is_plain_numeric_dtype(dtype_name):
+    """True for numeric/bool dtype names that `read_csv(dtype=...)` accepts as-is (int8, float32, Int64, boolean, ...)."""
+    try:
+        dtype = pd.api.types.pandas_dtype(dtype_name)
+    except (TypeError, ValueError):
+        return False
+    return pd.api.types.is_numeric_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype)
+
+def _csv_read_options(schema, columns=None):
+    """Translates a schema sidecar into `pd.read_csv` keyword arguments."""
+    dtype, parse_dates, date_format = {}, [], {}
+    for col, spec in schema["columns"].items():
+        if columns is not None and col not in columns:
+            continue
+        if spec.get("datetime_format"):
+            parse_dates.append(col)
+            date_format[col] = spec["datetime_format"]
+        elif str(spec.get("dtype", "")).startswith("datetime64"):
+            parse_dates.append(col)  # ISO timestamps: no explicit format needed
+        elif spec.get("categorical"):
+            dtype[col] = "category"
+        elif _is_plain_numeric_dtype(spec.get("dtype")):
+            dtype[col] = spec["dtype"]
+    options = {"dtype": dtype}
+    if parse_dates:
+        options.update(parse_dates=parse_dates, date_format=date_format)
+    return options
+
+
+# --- Loading ---
+
+def _csv_frame(path, compression=None, **kwargs):
+    """`pd.read_csv` on a plain or gzip/zstd CSV; compressed files are decompressed while streaming."""
+    if compression and columnar_available():
+        import pyarrow as pa
+        with pa.input_stream(str(path), compression=compression) as stream:  # Native zstd, no extra package
+            return pd.read_csv(stream, **kwargs)
+    return pd.read_csv(path, compression=compression, **kwargs)
+
+def _read_csv(path, columns=None, compression=None):
+    """Reads a CSV with the pyarrow engine and the sidecar schema when available, else plain pandas inference."""
+    engine = "pyarrow" if columnar_available() else "c"
+    schema = read_schema_sidecar(path)
+    options = _csv_read_options(schema, columns) if schema else {}
+    try:
+        return _csv_frame(path, compression, usecols=columns, engine=engine, **options)
+    except Exception as e:
+        if not options and engine == "c":
+            raise
+        print(f"Warning: Fast CSV read of {path} failed ({repr(e)}). Falling back to default parsing.")
+        return _csv_frame(path, compression, usecols=columns)
+
+def dataset_columns(path):
+    """Column names of a dataset, read from the Parquet/Feather schema or the CSV header (no data is loaded)."""
+    file_format, compression = detect_format(path)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        return [name for name in pq.read_schema(path).names if not name.startswith("__index_level_")]
+    if file_format == "feather":
+        import pyarrow as pa
+        with pa.memory_map(str(path)) as source:
+            return list(pa.ipc.open_file(source).schema.names)
+    return list(_csv_frame(path, compression, nrows=0).columns)
+
+def _apply_filters(df, filters):
+    """Applies (column, op, value) row filters (all must hold) with pandas semantics."""
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        series = df[col]
+        if op == "in":
+            mask &= series.isin(value)
+        else:
+            mask &= FILTER_OPERATORS[op](series, value)
+    return df[mask].reset_index(drop=True)
+
+def _read_parquet(path, columns=None, filters=None):
+    """Reads Parquet; `filters` are pushed into pyarrow (row groups are skipped using their statistics)."""
+    if not filters:
+        return pd.read_parquet(path, columns=columns)
+    try:
+        return pd.read_parquet(path, columns=columns, filters=[tuple(f) for f in filters])
+    except Exception as e:
+        print(f"Warning: Filtered Parquet read of {path} failed ({repr(e)}). Filtering after the read instead.")
+        return _apply_filters(pd.read_parquet(path, columns=columns), filters)
+
+def load_dataset(path, columns=None, optimize=False, filters=None):
+    """
+    Loads a dataset as a DataFrame, picking the reader from the file content (see MAGIC_BYTES).
+    `columns` restricts the load to those columns (column selection for Parquet/Feather, `usecols` for CSV).
+    `filters` is a list of (column, op, value) row conditions that must all hold, op being one of
+    ==, <, <=, >, >= or in. Parquet applies them while reading; other formats right after.
+    With `optimize=True` the result goes through `optimize_dtypes` to cut its memory footprint.
+    """
+    file_format, compression = detect_format(path)
+    if file_format == "parquet":
+        df = _read_parquet(path, columns, filters)
+    else:
+        df = pd.read_feather(path, columns=columns) if file_format == "feather" else _read_csv(path, columns, compression)
+        if filters:
+            df = _apply_filters(df, filters)
+    return optimize_dtypes(df) if optimize else df
+
+
+# --- Out-of-Core Access (see execution_planner.py) ---
+
+def iter_dataset_chunks(path, chunk_rows=CHUNK_ROWS, columns=None):
+    """
+    Yields the dataset as DataFrames of about `chunk_rows` rows, holding only one chunk in memory.
+    Parquet/Feather are read batch by batch; CSV (also gzip/zstd) via `read_csv(chunksize=...)`.
+    """
+    file_format, compression = detect_format(path)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+        return
+    if file_format == "feather":
+        import pyarrow as pa
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                yield (batch.select(columns) if columns else batch).to_pandas()
+        return
+
+    schema = read_schema_sidecar(path)
+    options = _csv_read_options(schema, columns) if schema else {}
+    if compression and columnar_available():
+        import pyarrow as pa
+        with pa.input_stream(str(path), compression=compression) as stream:
+            yield from pd.read_csv(stream, chunksize=chunk_rows, usecols=columns, **options)
+    else:
+        with pd.read_csv(path, compression=compression, chunksize=chunk_rows, usecols=columns, **options) as reader:
+            yield from reader
+
+def scan_dataset_polars(path):
+    """Polars LazyFrame over the dataset (Parquet, Feather or uncompressed CSV); nothing is read until `.collect()`."""
+    import polars as pl
+
+    file_format, compression = detect_format(path)
+    if file_format == "parquet":
+        return pl.scan_parquet(path)
+    if file_format == "feather":
+        return pl.scan_ipc(path)
+    if compression:
+        raise ValueError(f"{path} is {compression}-compressed; polars can't scan it lazily (use iter_dataset_chunks).")
+    return pl.scan_csv(path)
+
+def load_dataset_dask(path, partition_bytes="128MB"):
+    """Partitioned Dask DataFrame over the dataset (Parquet or uncompressed CSV); computed with `.compute()`."""
+    import dask.dataframe as dd
+
+    file_format, compression = detect_format(path)
+    if file_format == "parquet":
+        return dd.read_parquet(path, split_row_groups="adaptive", blocksize=partition_bytes)
+    if file_format == "csv" and not compression:
+        return dd.read_csv(path, blocksize=partition_bytes)
+    raise ValueError(f"{path} can't be split into Dask partitions (use iter_dataset_chunks).")
+
+
+# --- Memory Optimisation ---
+
+def format_bytes(n_bytes):
+    """Human-readable size, e.g. '12.3 MB'."""
+    for unit in ("B", "KB", "MB"):
+        if abs(n_bytes) < 1024:
+            return f"{n_bytes:.1f} {unit}"
+        n_bytes /= 1024
+    return f"{n_bytes:.1f} GB"
+
+def memory_report(memory_saved):
+    """One-line summary of {"before": bytes, "after": bytes}, e.g. '12.0 MB -> 4.0 MB (8.0 MB saved, 67%)'."""
+    before, after = memory_saved["before"], memory_saved["after"]
+    saved_pct = (before - after) / before * 100 if before else 0.0
+    return f"{format_bytes(before)} -> {format_bytes(after)} ({format_bytes(before - after)} saved, {saved_pct:.0f}%)"
+
+def _downcast_int(series):
+    """int64 -> int32 when the range fits. Narrower types (and unsigned ones) are avoided because
+    arithmetic in generated code, e.g. `rating * 1000` or `a - b`, would silently wrap around."""
+    info = np.iinfo("int32")
+    if series.dtype.itemsize > 4 and (series.empty or (series.min() >= info.min and series.max() <= info.max)):
+        return series.astype("int32")
+    return series
+
+def _downcast_float(series):
+    """float64 -> float32 only when no value changes (ratings like 4.3 stay float64)."""
+    downcast = series.astype("float32")
+    if np.array_equal(downcast.to_numpy(dtype="float64"), series.to_numpy(dtype="float64"), equal_nan=True):
+        return downcast
+    return series
+
+def optimize_dtypes(df, max_unique_ratio=CATEGORY_MAX_UNIQUE_RATIO, report=True):
+    """
+    Returns a copy of `df` with a smaller memory footprint:
+    - text columns with few distinct values (e.g. 'Platform', 'Product Category') become `category`
+    - 64-bit integer columns are downcast to int32 when their range fits
+    - float columns are downcast to float32 when that loses no precision
+    The original dtypes of the changed columns are kept in `df.attrs["source_dtypes"]`.
+    With `report=True` the footprint before and after is measured into `df.attrs["memory_saved"]`
+    (see memory_report) and logged (not printed: summary scripts' stdout is LLM context).
+    """
+    before = int(df.memory_usage(index=True, deep=True).sum()) if report else None
+    original_dtypes = {str(col): str(df[col].dtype) for col in df.columns}
+    df = df.copy()
+    n_rows = len(df)
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if isinstance(series.dtype, pd.CategoricalDtype) or not n_rows:
+                continue
+            try:
+                n_unique = series.nunique()
+            except TypeError:  # Unhashable cells (dicts, lists)
+                continue
+            if n_unique < max_unique_ratio * n_rows:
+                df[col] = series.astype("category")
+        elif pd.api.types.is_bool_dtype(series) or not isinstance(series.dtype, np.dtype):
+            continue  # Booleans are already 1 byte; leave extension dtypes (Int64, datetimes with tz) as they are
+        elif series.dtype.kind in "iu":
+            df[col] = _downcast_int(series)
+        elif series.dtype.kind == "f" and series.dtype.itemsize > 4:
+            df[col] = _downcast_float(series)
+
+    changed = {name: dtype for name, dtype in original_dtypes.items() if str(df[name].dtype) != dtype}
+    df.attrs[SOURCE_DTYPES_ATTR] = {**df.attrs.get(SOURCE_DTYPES_ATTR, {}), **changed}
+    if report:
+        df.attrs[MEMORY_SAVED_ATTR] = {"before": before, "after": int(df.memory_usage(index=True, deep=True).sum())}
+        logger.info(f"Memory optimised: {memory_report(df.attrs[MEMORY_SAVED_ATTR])}")
+    return df
+
+
+# --- Saving ---
+
+def _make_arrow_compatible(df):
+    """Object columns holding mixed Python types can't be written to Parquet; store those as strings."""
+    df = df.copy()
+    for col in df.select_dtypes(include=['object']).columns:
+        kinds = {type(v) for v in df[col].dropna().head(10000)}
+        if len(kinds) > 1:
+            df[col] = df[col].astype(str).where(df[col].notna())
+    return df
+
+def save_dataset(df, path, csv_copy=False):
+    """
+    Saves a DataFrame in the format given by the file extension (Parquet for the cleaned dataset).
+    With `csv_copy=True` a CSV export is written next to it as well. Returns the written path.
+    """
+    dir_name = os.path.dirname(str(path))
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+
+    file_format = _file_format(path)
+    if file_format == "csv":
+        df.to_csv(path, index=False, encoding='utf-8')
+        return path
+
+    try:
+        if file_format == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.reset_index(drop=True).to_feather(path)
+    except Exception as e:
+        print(f"Warning: Could not write {path} directly ({repr(e)}). Retrying with mixed-type columns as strings.")
+        df = _make_arrow_compatible(df)
+        if file_format == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.reset_index(drop=True).to_feather(path)
+
+    if csv_copy:
+        csv_path = os.path.splitext(str(path))[0] + ".csv"
+        df.to_csv(csv_path, index=False, encoding='utf-8')
+        print(f"CSV copy saved to {csv_path}")
+    return path
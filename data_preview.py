@@ -0,0 +1,253 @@
+"""
+Paginated row preview of a dataset for the Streamlit UI, read one page at a time with pyarrow.
+
+- Parquet: only the row groups overlapping the page are read.
+- Feather: record batches of the memory-mapped file.
+- Plain CSV: a row-offset index (byte offset of every page's first record, built in one
+  streaming pass) lets a page be parsed from its own byte range. Every page and batch is parsed
+  with the types of dataset_schema (the schema sidecar's when present), not inferred on its own.
+- Filters and sorting are applied while streaming the file batch by batch, keeping only the
+  rows the page needs (a running top-k for sorts), so memory stays at a few batches.
+
+Pages are returned as pyarrow Tables, which `st.dataframe` renders directly.
+"""
+import operator
+
+import numpy as np
+
+from data_loader import detect_format, read_schema_sidecar
+
+# --- Configuration ---
+PAGE_ROWS = 100
+INDEX_READ_SIZE = 16 * 1024 * 1024  # Bytes scanned at a time while indexing a CSV
+BATCH_ROWS = 64 * 1024  # Rows per streamed batch (filters, sorts, compressed CSV)
+CSV_PARSE_OPTIONS = {"newlines_in_values": True}  # Quoted values may span lines
+PREVIEW_OPERATORS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+                     ">": operator.gt, ">=": operator.ge, "contains": None}
+
+
+# --- CSV Row Index ---
+
+def build_csv_row_index(path, page_rows=PAGE_ROWS):
+    """
+    Byte offsets of data rows 0, page_rows, 2 * page_rows, ... of a plain CSV, plus the row count.
+    Newlines inside quoted fields are skipped (quote parity). Returns None for compressed CSVs.
+    """
+    file_format, compression = detect_format(path)
+    if file_format != "csv" or compression:
+        return None
+    offsets, n_ends, n_quotes, position, last_byte = [], 0, 0, 0, b"\n"
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(INDEX_READ_SIZE)
+            if not chunk:
+                break
+            data = np.frombuffer(chunk, dtype=np.uint8)
+            quotes = np.cumsum(data == ord('"')) + n_quotes
+            ends = np.flatnonzero((data == ord("\n")) & (quotes % 2 == 0))
+            # The record ending at ends[k] is record n_ends + k (record 0 is the header), so data row n_ends + k starts after it
+            rows = n_ends + np.arange(len(ends))
+            offsets.extend((position + ends[rows % page_rows == 0] + 1).tolist())
+            n_ends += len(ends)
+            n_quotes = int(quotes[-1])
+            position += len(chunk)
+            last_byte = chunk[-1:]
+    n_rows = max(n_ends - 1 + (last_byte != b"\n"), 0)  # Last record may lack a trailing newline
+    return {"page_rows": page_rows, "offsets": [o for o in offsets if o < position], "n_rows": n_rows, "size": position}
+
+def _csv_index_page(path, index, schema, page):
+    """Parses one page of a plain CSV from its byte range in the row index, with the types of `schema`."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    offsets = index["offsets"]
+    if page >= len(offsets):
+        return None
+    start = offsets[page]
+    end = offsets[page + 1] if page + 1 < len(offsets) else index["size"]
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pa_csv.read_csv(pa.py_buffer(data), read_options=pa_csv.ReadOptions(column_names=schema.names),
+                           parse_options=pa_csv.ParseOptions(**CSV_PARSE_OPTIONS),
+                           convert_options=pa_csv.ConvertOptions(strings_can_be_null=True, column_types=schema))
+
+
+# --- Streaming ---
+
+def _arrow_type(dtype_name):
+    """pyarrow type of a pandas dtype name from a schema sidecar; text, categories and unknown names read as strings."""
+    import pandas as pd
+    import pyarrow as pa
+    try:
+        dtype = pd.api.types.pandas_dtype(dtype_name)
+        return pa.from_numpy_dtype(getattr(dtype, "numpy_dtype", dtype))  # Nullable Int64/boolean as int64/bool
+    except (TypeError, ValueError, pa.ArrowNotImplementedError):
+        return pa.string()
+
+def dataset_schema(path):
+    """
+    pyarrow schema of a dataset. For CSV, the types come from the schema sidecar (inferred over the
+    whole file by the profiler) when there is one, else as inferred from the first block.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    file_format, compression = detect_format(path)
+    if file_format == "parquet":
+        schema = pq.read_schema(path)
+        return pa.schema([field for field in schema if not field.name.startswith("__index_level_")])
+    if file_format == "feather":
+        with pa.memory_map(str(path)) as source:
+            return pa.ipc.open_file(source).schema
+    sidecar = read_schema_sidecar(path)
+    column_types = {name: _arrow_type(spec.get("dtype")) for name, spec in sidecar["columns"].items()} if sidecar else {}
+    with pa_csv.open_csv(pa.input_stream(str(path), compression=compression),
+                         parse_options=pa_csv.ParseOptions(**CSV_PARSE_OPTIONS),
+                         convert_options=pa_csv.ConvertOptions(column_types=column_types)) as reader:
+        return reader.schema
+
+def iter_batches(path, columns=None):
+    """Streams a dataset as pyarrow RecordBatches (compressed CSVs are decompressed on the fly)."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    file_format, compression = detect_format(path)
+    if file_format == "parquet":
+        yield from pq.ParquetFile(path).iter_batches(batch_size=BATCH_ROWS, columns=columns)
+    elif file_format == "feather":
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                yield batch.select(columns) if columns else batch
+    else:
+        convert_options = pa_csv.ConvertOptions(strings_can_be_null=True, include_columns=columns,
+                                                column_types=dataset_schema(path))
+        with pa_csv.open_csv(pa.input_stream(str(path), compression=compression), convert_options=convert_options,
+                             parse_options=pa_csv.ParseOptions(**CSV_PARSE_OPTIONS)) as reader:
+            yield from reader
+
+def filter_expression(schema, column, op, value):
+    """pyarrow filter expression for `column op value`, with the text `value` cast to the column's type."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    field_type = schema.field(column).type
+    if pa.types.is_dictionary(field_type):
+        field_type = field_type.value_type  # Compare categoricals on their values
+    field = pc.field(column).cast(field_type)
+    if op == "contains":
+        return pc.match_substring(field.cast(pa.string()), str(value), ignore_case=True)
+    if op not in PREVIEW_OPERATORS:
+        raise ValueError(f"Unsupported filter operator: {op}")
+    return PREVIEW_OPERATORS[op](field, pa.scalar(str(value)).cast(field_type))
+
+def _decode(table, column):
+    """Replaces a dictionary-encoded (categorical) column by its values, so it can be sorted."""
+    import pyarrow as pa
+    i = table.schema.get_field_index(column)
+    if not pa.types.is_dictionary(table.schema.field(i).type):
+        return table
+    return table.set_column(i, column, table.column(i).cast(table.schema.field(i).type.value_type))
+
+
+# --- Pages ---
+
+def _direct_page(path, offset, page_rows):
+    """Rows [offset, offset + page_rows) of a Parquet/Feather file, reading only the overlapping row groups/batches."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    file_format, _ = detect_format(path)
+    if file_format == "parquet":
+        parquet_file = pq.ParquetFile(path)
+        metadata = parquet_file.metadata
+        groups, start, first_start = [], 0, None
+        for r in range(metadata.num_row_groups):
+            n = metadata.row_group(r).num_rows
+            if start + n > offset and start < offset + page_rows:
+                groups.append(r)
+                first_start = start if first_start is None else first_start
+            start += n
+        if not groups:
+            return parquet_file.schema_arrow.empty_table()
+        return parquet_file.read_row_groups(groups).slice(offset - first_start, page_rows)
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        batches, start, first_start = [], 0, None
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if start + batch.num_rows > offset and start < offset + page_rows:
+                batches.append(batch)
+                first_start = start if first_start is None else first_start
+            start += batch.num_rows
+        if not batches:
+            return reader.schema.empty_table()
+        return pa.Table.from_batches(batches).slice(offset - first_start, page_rows)
+
+def read_page(path, page=0, page_rows=PAGE_ROWS, sort_by=None, descending=False, filter_expr=None, csv_index=None):
+    """
+    Page `page` (0-based) of a dataset as a pyarrow Table, optionally filtered by `filter_expr`
+    (see filter_expression) and sorted by `sort_by`. A `csv_index` from build_csv_row_index
+    makes unfiltered, unsorted pages of a plain CSV a single seek.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    offset = page * page_rows
+    if sort_by is None and filter_expr is None:
+        file_format, _ = detect_format(path)
+        if file_format != "csv":
+            return _direct_page(path, offset, page_rows)
+        if csv_index is not None and csv_index["page_rows"] == page_rows:
+            table = _csv_index_page(path, csv_index, dataset_schema(path), page)
+            if table is not None:
+                return table
+
+    order = "descending" if descending else "ascending"
+    keep = offset + page_rows  # Rows that can still end up on the page
+    kept, seen, collected, result = None, 0, 0, []
+    for batch in iter_batches(path):
+        table = pa.Table.from_batches([batch])
+        if filter_expr is not None:
+            table = table.filter(filter_expr)
+        if not table.num_rows:
+            continue
+        if sort_by is None:
+            start = max(offset - seen, 0)  # Matching rows before the page are skipped
+            seen += table.num_rows
+            if start < table.num_rows:
+                result.append(table.slice(start, page_rows - collected))
+                collected += result[-1].num_rows
+                if collected >= page_rows:
+                    break
+            continue
+        table = _decode(table, sort_by)
+        kept = table if kept is None else pa.concat_tables([kept, table], promote_options="permissive")
+        if kept.num_rows > keep:
+            kept = kept.take(pc.select_k_unstable(kept, keep, [(sort_by, order)]))
+
+    if sort_by is None:
+        return pa.concat_tables(result) if result else dataset_schema(path).empty_table()
+    if kept is None:
+        return dataset_schema(path).empty_table()
+    return kept.sort_by([(sort_by, order)]).slice(offset, page_rows)
+
+def count_rows(path, filter_expr=None, csv_index=None):
+    """Number of rows of a dataset (matching `filter_expr`), from metadata or the row index when possible."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if filter_expr is None:
+        file_format, _ = detect_format(path)
+        if file_format == "parquet":
+            return pq.ParquetFile(path).metadata.num_rows
+        if csv_index is not None:
+            return csv_index["n_rows"]
+    n_rows = 0
+    for batch in iter_batches(path):
+        n_rows += pa.Table.from_batches([batch]).filter(filter_expr).num_rows if filter_expr is not None else batch.num_rows
+    return n_rows
@@ -0,0 +1,224 @@
+"""
+Filter / group / aggregate queries over the processed dataset for the drill-down panel of main3.py.
+
+A query is a plain dict, so the UI can cache results by it:
+
+    {"group_by": ["Platform"], "metrics": [("Order Value", "sum"), ("*", "count")],
+     "filters": [("Product Category", "in", ["Books", "Toys"]), ("Order Date", "between", ("2024-01-01", "2024-03-31"))],
+     "time_column": "Order Date", "time_grain": "month", "limit": 500}
+
+Queries the precomputed aggregate cube can answer (see aggregate_cube.py) never touch the
+rows. The rest run as SQL on DuckDB (see duckdb_backend.py) when installed, reading only the
+columns the query needs from the Parquet file, multithreaded. Without DuckDB, pyarrow scans the
+file with the filters pushed down and aggregates with `Table.group_by`.
+"""
+import numpy as np
+import pandas as pd
+
+from data_loader import FILTER_OPERATORS
+from duckdb_backend import DUCKDB_VIEW_NAME, connect_dataset, duckdb_available
+
+# --- Configuration ---
+AGGREGATIONS = {  # name -> (DuckDB SQL function, pyarrow group_by aggregation)
+    "count": ("COUNT", "count"),
+    "sum": ("SUM", "sum"),
+    "mean": ("AVG", "mean"),
+    "min": ("MIN", "min"),
+    "max": ("MAX", "max"),
+    "median": ("MEDIAN", None),  # pyarrow only has approximate_median: computed exactly in _exact_medians
+    "count_distinct": ("COUNT(DISTINCT", "count_distinct"),
+}
+TIME_GRAINS = ("day", "week", "month", "quarter", "year")
+DEFAULT_LIMIT = 500
+DISTINCT_VALUES_LIMIT = 200
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def filter_text(value):
+    """A value as text the way DuckDB and pyarrow cast it ('in' filters compare as text): True -> 'true'."""
+    return str(value).lower() if isinstance(value, (bool, np.bool_)) else str(value)
+
+def metric_name(column, agg):
+    """Result column name of a metric, e.g. 'sum(Order Value)' or 'count(*)'."""
+    return f"{agg}({column})"
+
+
+# --- DuckDB ---
+
+def _time_key(query):
+    column = query.get("time_column")
+    if not column or not query.get("time_grain"):
+        return None, None
+    return f"date_trunc('{query['time_grain']}', {_quote(column)})", f"{column} ({query['time_grain']})"
+
+def build_sql(query, view_name=DUCKDB_VIEW_NAME):
+    """(SQL, parameters) for a drill-down query; filter values are bound as parameters."""
+    if query.get("time_grain") and query["time_grain"] not in TIME_GRAINS:
+        raise ValueError(f"Unsupported time grain: {query['time_grain']}")
+    keys = [(_quote(col), col) for col in query.get("group_by", [])]
+    time_expr, time_label = _time_key(query)
+    if time_expr:
+        keys.append((time_expr, time_label))
+
+    selects = [f"{expr} AS {_quote(label)}" for expr, label in keys]
+    for column, agg in query.get("metrics") or [("*", "count")]:
+        function = AGGREGATIONS[agg][0]
+        argument = "*" if column == "*" else _quote(column)
+        call = f"{function} {argument})" if function.endswith("DISTINCT") else f"{function}({argument})"
+        selects.append(f"{call} AS {_quote(metric_name(column, agg))}")
+
+    conditions, params = [], []
+    for column, op, value in query.get("filters", []):
+        if op == "in":
+            conditions.append(f"CAST({_quote(column)} AS VARCHAR) IN ({', '.join('?' * len(value))})")
+            params.extend(filter_text(v) for v in value)
+        elif op == "between":
+            conditions.append(f"{_quote(column)} BETWEEN ? AND ?")
+            params.extend(value)
+        elif op in FILTER_OPERATORS:
+            conditions.append(f"{_quote(column)} {'=' if op == '==' else op} ?")
+            params.append(value)
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+
+    sql = f"SELECT {', '.join(selects)} FROM {_quote(view_name)}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if keys:
+        positions = ", ".join(str(i + 1) for i in range(len(keys)))
+        sql += f" GROUP BY {positions}"
+        # Time series read in time order; otherwise largest groups first
+        sql += f" ORDER BY {len(keys)}" if time_expr and len(keys) == 1 else f" ORDER BY {len(keys) + 1} DESC"
+    sql += f" LIMIT {int(query.get('limit') or DEFAULT_LIMIT)}"
+    return sql, params
+
+
+# --- pyarrow Fallback ---
+
+def _arrow_filter(filters, schema):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    expression = None
+    for column, op, value in filters:
+        field = pc.field(column)
+        field_type = schema.field(column).type
+        if pa.types.is_dictionary(field_type):
+            field_type = field_type.value_type
+        if op == "in":
+            condition = field.cast(pa.string()).isin([filter_text(v) for v in value])
+        elif op == "between":
+            low, high = (pa.scalar(pd.Timestamp(v).to_pydatetime() if pa.types.is_temporal(field_type) else v).cast(field_type) for v in value)
+            condition = (field >= low) & (field <= high)
+        elif op in FILTER_OPERATORS:
+            condition = FILTER_OPERATORS[op](field, value)
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def _run_arrow(path, query):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    from data_loader import detect_format
+
+    dataset = ds.dataset(str(path), format="ipc" if detect_format(path)[0] == "feather" else "parquet")
+    metrics = query.get("metrics") or [("*", "count")]
+    group_by = list(query.get("group_by", []))
+    time_column, time_grain = query.get("time_column"), query.get("time_grain")
+    needed = set(group_by) | {c for c, _ in metrics if c != "*"} | {c for c, _, _ in query.get("filters", [])}
+    if time_column and time_grain:
+        needed.add(time_column)
+    table = dataset.to_table(columns=sorted(needed) or None, filter=_arrow_filter(query.get("filters", []), dataset.schema))
+
+    keys = list(group_by)
+    if time_column and time_grain:
+        _, time_label = _time_key(query)
+        table = table.append_column(time_label, pc.floor_temporal(table[time_column], unit=time_grain, week_starts_monday=True))
+        keys.append(time_label)
+    for key in keys:  # Aggregate categoricals on their values
+        i = table.schema.get_field_index(key)
+        if pa.types.is_dictionary(table.schema.field(i).type):
+            table = table.set_column(i, key, table.column(i).cast(table.schema.field(i).type.value_type))
+
+    if not keys:
+        row = {}
+        for column, agg in metrics:
+            if column == "*":
+                row[metric_name(column, agg)] = table.num_rows
+            elif agg == "median":
+                row[metric_name(column, agg)] = pc.quantile(table[column], q=0.5)[0].as_py()
+            else:
+                row[metric_name(column, agg)] = getattr(pc, AGGREGATIONS[agg][1])(table[column]).as_py()
+        return pd.DataFrame([row])
+
+    aggregations, names = [], {}
+    for column, agg in metrics:
+        if agg == "median" and column != "*":
+            continue
+        # count(*) counts rows: count the first key with nulls included
+        spec = (keys[0], "count", pc.CountOptions(mode="all")) if column == "*" else (column, AGGREGATIONS[agg][1])
+        aggregations.append(spec)
+        names[f"{spec[0]}_{spec[1]}"] = metric_name(column, agg)  # pyarrow names aggregates "<column>_<function>"
+    result = table.group_by(keys).aggregate(aggregations).to_pandas().rename(columns=names)
+    result = _exact_medians(table, keys, metrics, result)
+    result = result[keys + [metric_name(c, a) for c, a in metrics]]
+    time_only = time_column and time_grain and len(keys) == 1
+    result = result.sort_values(keys[0] if time_only else result.columns[len(keys)], ascending=bool(time_only))
+    return result.head(int(query.get("limit") or DEFAULT_LIMIT)).reset_index(drop=True)
+
+
+def _exact_medians(table, keys, metrics, result):
+    """Adds the grouped median metrics to `result`, computed exactly with pandas on just the columns involved."""
+    for column in dict.fromkeys(c for c, a in metrics if a == "median" and c != "*"):
+        medians = (table.select(keys + [column]).to_pandas()
+                   .groupby(keys, observed=True, dropna=False)[column].median()
+                   .rename(metric_name(column, "median")).reset_index())
+        result = result.merge(medians, on=keys, how="left")
+    return result
+
+
+# --- Queries ---
+
+def run_drilldown(path, query, con=None, use_cube=True):
+    """
+    Runs a drill-down query against the dataset at `path` and returns the result as a DataFrame,
+    from its aggregate cube when that can answer (`use_cube=False` always reads the rows).
+    """
+    if use_cube:
+        from aggregate_cube import load_cube, query_cube
+
+        cube = load_cube(path)
+        result = query_cube(cube, query) if cube is not None else None
+        if result is not None:
+            return result
+    if con is not None or duckdb_available():
+        con = con or connect_dataset(path)
+        sql, params = build_sql(query)
+        return con.execute(sql, params).df()
+    return _run_arrow(path, query)
+
+def distinct_values(path, column, limit=DISTINCT_VALUES_LIMIT, con=None):
+    """Most frequent values of a column (for filter pickers), as strings."""
+    from aggregate_cube import load_cube
+
+    cube = load_cube(path)
+    if cube is not None and column in cube["dimensions"]:
+        result = run_drilldown(path, {"group_by": [column], "metrics": [("*", "count")], "limit": limit})
+        return [filter_text(v) for v in result[column] if pd.notna(v)]
+    if con is not None or duckdb_available():
+        con = con or connect_dataset(path)
+        sql = (f"SELECT CAST({_quote(column)} AS VARCHAR) AS value FROM {_quote(DUCKDB_VIEW_NAME)} "
+               f"WHERE {_quote(column)} IS NOT NULL GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT {int(limit)}")
+        return [row[0] for row in con.execute(sql).fetchall()]
+    result = _run_arrow(path, {"group_by": [column], "metrics": [("*", "count")], "limit": limit})
+    return [filter_text(v) for v in result[column] if v is not None]
+
+def value_range(path, column, con=None):
+    """(min, max) of a column, e.g. the date range offered by the panel."""
+    result = run_drilldown(path, {"metrics": [(column, "min"), (column, "max")]}, con)
+    return result.iloc[0, 0], result.iloc[0, 1]
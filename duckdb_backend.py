@@ -0,0 +1,84 @@
+"""
+Optional DuckDB backend for the generated analysis scripts.
+
+The cleaned dataset is exposed as a DuckDB view (`data`) over the Parquet/CSV file itself, so
+aggregations run as SQL in-process: multithreaded, reading only the columns a query needs, and
+spilling to disk when a query doesn't fit in memory. Results are printed through tabulate in
+the same format as the pandas analysis scripts, so `analysis_output.md` looks the same.
+
+Enabled with `ANALYSIS_BACKEND = "duckdb"` in aianalyst.py (falls back to pandas if duckdb isn't installed).
+"""
+import os
+
+from data_loader import detect_format
+
+try:
+    from tabulate import tabulate
+except ImportError:
+    tabulate = None
+
+# --- Configuration ---
+DUCKDB_VIEW_NAME = "data"
+DUCKDB_TEMP_DIRNAME = "duckdb_tmp"  # Spill directory, created next to the dataset
+RESULT_ROWS = 10  # Rows printed per query result (like the pandas template's `.head(10)`)
+
+
+def duckdb_available():
+    """True if the duckdb package is installed."""
+    try:
+        import duckdb  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _sql_string(value):
+    return "'" + str(value).replace("\\", "/").replace("'", "''") + "'"
+
+def source_sql(path):
+    """DuckDB table function reading `path` in place (format detected from the content)."""
+    file_format, compression = detect_format(path)
+    if file_format == "parquet":
+        return f"read_parquet({_sql_string(path)})"
+    if file_format == "csv":
+        compression_arg = f", compression={_sql_string(compression)}" if compression else ""
+        return f"read_csv_auto({_sql_string(path)}{compression_arg})"
+    return None  # Feather is registered as an Arrow table instead (see connect_dataset)
+
+def connect_dataset(path, view_name=DUCKDB_VIEW_NAME, threads=None, memory_limit=None, temp_dir=None):
+    """
+    Opens an in-memory DuckDB connection with `path` available as the view `view_name`.
+    `threads` defaults to all cores; `memory_limit` (e.g. '4GB') caps memory before spilling to `temp_dir`.
+    """
+    import duckdb
+
+    if temp_dir is None:
+        temp_dir = os.path.join(os.path.dirname(os.path.abspath(path)), DUCKDB_TEMP_DIRNAME)
+    os.makedirs(temp_dir, exist_ok=True)
+    con = duckdb.connect(database=":memory:")
+    con.execute(f"SET threads TO {int(threads or os.cpu_count() or 1)}")
+    con.execute(f"SET temp_directory = {_sql_string(temp_dir)}")
+    if memory_limit:
+        con.execute(f"SET memory_limit = {_sql_string(memory_limit)}")
+
+    source = source_sql(path)
+    if source is not None:
+        con.execute(f'CREATE VIEW "{view_name}" AS SELECT * FROM {source}')
+    else:
+        import pyarrow.feather as feather
+        con.register(view_name, feather.read_table(path, memory_map=True))
+    return con
+
+def run_query(con, sql, max_rows=RESULT_ROWS):
+    """Runs `sql`, prints the first `max_rows` rows as a psql table and returns the full result as a DataFrame."""
+    result = con.execute(sql).df()
+    if result.empty:
+        print("No results found for this analysis.")
+        return result
+    shown = result.head(max_rows)
+    if tabulate is not None:
+        print(tabulate(shown, headers='keys', tablefmt='psql', showindex=False))
+    else:
+        print(shown.to_string(index=False))
+    if len(result) > max_rows:
+        print(f"(Showing {max_rows} of {len(result)} rows)")
+    return result
@@ -0,0 +1,172 @@
+"""
+Execution engine selection for the generated scripts.
+
+Before code is generated for a stage, the planner compares the dataset's estimated in-memory
+size (from its cached profile, else from the file itself) with the machine's available memory:
+
+- "pandas":  the dataset fits comfortably; the usual `df = load_dataset(...)` templates.
+- "polars":  too big for pandas; a Polars LazyFrame (multithreaded, streaming `.collect()`).
+- "dask":    too big for pandas and Polars isn't installed; partitioned Dask DataFrame on a
+             local multi-process scheduler.
+- "chunked": too big and neither is available (or the file can't be split, e.g. gzip CSV);
+             pandas over `iter_dataset_chunks(...)`, combining per-chunk partial results.
+
+The chosen engine adapts the template's load step and tells the LLM which API to write against.
+"""
+import os
+from functools import lru_cache
+
+from data_loader import CHUNK_ROWS, detect_format
+from profiler import PROFILE_DIR, fingerprint_file, load_profile
+
+# --- Configuration ---
+MEMORY_HEADROOM = 0.6  # Share of available memory a pandas script may use
+PANDAS_WORKING_SET_FACTOR = 3.0  # Peak memory of a pandas script relative to the loaded frame (copies, groupbys, plots)
+CSV_MEMORY_FACTOR = 2.0  # In-memory size relative to an uncompressed CSV on disk (no profile available)
+COMPRESSED_CSV_MEMORY_FACTOR = 10.0  # ... relative to a gzip/zstd CSV on disk
+CHUNK_MEMORY_SHARE = 0.1  # Target memory per chunk for the chunked engine
+MIN_CHUNK_ROWS = 10_000
+ENGINE_PREFERENCE = ("polars", "dask", "chunked")  # Out-of-core engines, best first
+
+
+# --- Estimates ---
+
+def available_memory_bytes():
+    """Currently available RAM in bytes (psutil if installed, else sysconf), or None if unknown."""
+    try:
+        import psutil
+        return int(psutil.virtual_memory().available)
+    except ImportError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+@lru_cache(maxsize=32)
+def _signature_fingerprint(path, size, mtime_ns):
+    """Content hash of a file, recomputed only when its size or mtime changes (every stage plans the same file)."""
+    return fingerprint_file(path)
+
+def estimate_dataset(path, profile_dir=PROFILE_DIR, fingerprint=None):
+    """
+    (estimated in-memory bytes, row count or None, source of the estimate) for a dataset file.
+    Pass the file's `fingerprint` if known; otherwise it is hashed once per (size, mtime) of the file.
+    """
+    try:
+        if fingerprint is None:
+            stat = os.stat(path)
+            fingerprint = _signature_fingerprint(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        profile = load_profile(fingerprint, profile_dir)
+    except OSError:
+        profile = None
+    if profile is not None:
+        return profile["memory_bytes"], profile["n_rows"], "profile"
+
+    file_format, compression = detect_format(path)
+    size = os.path.getsize(path)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        metadata = pq.ParquetFile(path).metadata
+        uncompressed = sum(metadata.row_group(r).total_byte_size for r in range(metadata.num_row_groups))
+        return uncompressed, metadata.num_rows, "parquet metadata"
+    if file_format == "feather":
+        return size, None, "file size"
+    factor = COMPRESSED_CSV_MEMORY_FACTOR if compression else CSV_MEMORY_FACTOR
+    return int(size * factor), None, "file size"
+
+def _module_available(name):
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+def _engine_supports(engine, path):
+    """Polars scans and Dask partitions need a splittable file (no gzip/zstd CSV)."""
+    if engine == "chunked":
+        return True
+    file_format, compression = detect_format(path)
+    if compression:
+        return False
+    if engine == "dask" and file_format == "feather":
+        return False
+    return _module_available("polars" if engine == "polars" else "dask.dataframe")
+
+
+# --- Planning ---
+
+def choose_engine(path, profile_dir=PROFILE_DIR, fingerprint=None):
+    """
+    Picks the execution engine for scripts processing `path` (`fingerprint`: its content hash, if known).
+    Returns a dict with "engine", "estimated_bytes", "available_bytes", "chunk_rows" and a human-readable "reason".
+    """
+    estimated, n_rows, source = estimate_dataset(path, profile_dir, fingerprint)
+    available = available_memory_bytes()
+    plan = {"engine": "pandas", "estimated_bytes": estimated, "available_bytes": available, "chunk_rows": CHUNK_ROWS}
+    if available is None:
+        plan["reason"] = "available memory unknown; using pandas"
+        return plan
+
+    budget = available * MEMORY_HEADROOM
+    needed = estimated * PANDAS_WORKING_SET_FACTOR
+    if needed <= budget:
+        plan["reason"] = f"~{needed / 1024 ** 3:.2f} GB working set fits in {budget / 1024 ** 3:.2f} GB ({source})"
+        return plan
+
+    plan["engine"] = next(engine for engine in ENGINE_PREFERENCE if _engine_supports(engine, path))
+    if n_rows:
+        bytes_per_row = max(estimated / n_rows, 1)
+        plan["chunk_rows"] = max(MIN_CHUNK_ROWS, int(available * CHUNK_MEMORY_SHARE / bytes_per_row))
+    plan["reason"] = (f"~{needed / 1024 ** 3:.2f} GB working set exceeds {budget / 1024 ** 3:.2f} GB "
+                      f"of available memory ({source})")
+    return plan
+
+
+# --- Template Adaptation ---
+
+PANDAS_LOAD_LINE = "    df = load_dataset(input_csv_path, optimize=True)"
+
+ENGINE_LOAD_BLOCKS = {
+    "polars": """    import polars as pl
+    from data_loader import scan_dataset_polars
+    lf = scan_dataset_polars(input_csv_path) # Polars LazyFrame: nothing is loaded until .collect()
+    print(f"Opened {input_csv_path} lazily with Polars. Columns: {lf.collect_schema().names()}")""",
+    "dask": """    import dask
+    from data_loader import load_dataset_dask
+    dask.config.set(scheduler="processes") # Local multi-process execution
+    ddf = load_dataset_dask(input_csv_path) # Partitioned Dask DataFrame: nothing is computed until .compute()
+    print(f"Opened {input_csv_path} with Dask. Partitions: {ddf.npartitions}")""",
+    "chunked": """    from data_loader import iter_dataset_chunks
+    CHUNK_ROWS = {chunk_rows} # Rows per chunk (sized by the execution planner to fit in memory)
+    # The dataset is too large to load at once: iterate with `for chunk in iter_dataset_chunks(input_csv_path, CHUNK_ROWS, columns=[...]):`
+    print(f"Processing {input_csv_path} in chunks of {CHUNK_ROWS} rows")""",
+}
+
+ENGINE_INSTRUCTIONS = {
+    "polars": """
+*   The dataset is **larger than memory**, so this script uses **Polars lazy** instead of pandas: the base structure defines `lf` (a `pl.LazyFrame`). Build each result with lazy expressions (`lf.filter(...)`, `lf.group_by(...).agg(...)`, `pl.col(...)`) and call `.collect()` only on aggregated/small results. Convert small results with `.to_pandas()` for `tabulate` or Plotly. Never collect the full table.""",
+    "dask": """
+*   The dataset is **larger than memory**, so this script uses **Dask** instead of pandas: the base structure defines `ddf` (a partitioned `dask.dataframe.DataFrame`, pandas-like API). Compute only aggregated/small results with `.compute()` and use those pandas results for `tabulate` or Plotly. Never compute the full table.""",
+    "chunked": """
+*   The dataset is **larger than memory**, so this script processes it **in chunks** with pandas: iterate `for chunk in iter_dataset_chunks(input_csv_path, CHUNK_ROWS, columns=[...])` (request only the needed columns), accumulate partial results per chunk (counts, sums, value counts, min/max, sampled rows for plots) and combine them after the loop. Never concatenate all chunks into one DataFrame.""",
+}
+
+
+def adapt_template(template, plan):
+    """Replaces the pandas load step of a formatted stage template with the chosen engine's load step."""
+    engine = plan["engine"]
+    if engine == "pandas":
+        return template
+    lines = template.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith(PANDAS_LOAD_LINE):
+            block = ENGINE_LOAD_BLOCKS[engine].replace("{chunk_rows}", str(plan["chunk_rows"]))
+            # Drop the pandas "Successfully loaded ... Shape" line that follows the load
+            end = i + 2 if i + 1 < len(lines) and "df.shape" in lines[i + 1] else i + 1
+            return "\n".join(lines[:i] + block.splitlines() + lines[end:])
+    return template
+
+def engine_instructions(plan):
+    """Prompt instructions telling the LLM which API the script is written against ('' for pandas)."""
+    return ENGINE_INSTRUCTIONS.get(plan["engine"], "")
@@ -0,0 +1,151 @@
+"""
+Streaming ingestion of uploaded datasets for the Streamlit UI (main3.py).
+
+The upload is copied to disk chunk by chunk. In the same pass it is hashed (the same
+fingerprint as `profiler.fingerprint_file`, so the profile cache key needs no second read)
+and parsed by pyarrow's streaming CSV reader into a quick profile: row count, columns,
+their types and null counts. The UI shows that straight away instead of parsing the file again.
+
+gzip/zstd CSV uploads are stored as uploaded (compressed) and decompressed only for that parse.
+Parquet/Feather uploads are profiled from their metadata and per-batch null counts after the copy.
+"""
+import io
+import os
+import tempfile
+
+from data_loader import columnar_available, format_from_magic
+from profiler import FINGERPRINT_CHUNK_SIZE, new_fingerprint_hasher
+
+# --- Configuration ---
+INGEST_CHUNK_SIZE = FINGERPRINT_CHUNK_SIZE
+CSV_BLOCK_SIZE = 4 * 1024 * 1024  # pyarrow CSV block size (column types are inferred from the first block)
+
+
+class _TeeReader(io.RawIOBase):
+    """Read-only stream over `source` that copies every chunk it hands out to `sink` and `hasher`."""
+
+    def __init__(self, source, sink, hasher):
+        self.source = source
+        self.sink = sink
+        self.hasher = hasher
+        self.n_bytes = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.source.read(min(len(buffer), INGEST_CHUNK_SIZE))
+        if not chunk:
+            return 0
+        self.sink.write(chunk)
+        self.hasher.update(chunk)
+        self.n_bytes += len(chunk)
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def drain(self):
+        """Copies whatever the parser did not read (e.g. after a parse error)."""
+        while self.read(INGEST_CHUNK_SIZE):
+            pass
+
+
+def _stream_csv_profile(stream, compression=None):
+    """Row count, column types and null counts from pyarrow's streaming CSV reader."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    reader = pa_csv.open_csv(
+        pa.input_stream(stream, compression=compression),
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(strings_can_be_null=True),  # Empty cells count as missing, like pandas
+    )
+    names = reader.schema.names
+    columns = {name: {"dtype": str(reader.schema.field(name).type), "nulls": 0} for name in names}
+    n_rows = 0
+    for batch in reader:
+        n_rows += batch.num_rows
+        for name, array in zip(names, batch.columns):
+            columns[name]["nulls"] += array.null_count
+    return n_rows, columns
+
+def _columnar_profile(path, file_format):
+    """Row count, column types and null counts of a Parquet (from its metadata) or Feather file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if file_format == "parquet":
+        parquet_file = pq.ParquetFile(path)
+        metadata = parquet_file.metadata
+        schema = parquet_file.schema_arrow
+        columns = {name: {"dtype": str(schema.field(name).type), "nulls": 0} for name in schema.names
+                   if not name.startswith("__index_level_")}
+        for r in range(metadata.num_row_groups):
+            row_group = metadata.row_group(r)
+            for c in range(row_group.num_columns):
+                chunk = row_group.column(c)
+                col = columns.get(chunk.path_in_schema)
+                if col is None or col["nulls"] is None:
+                    continue
+                stats = chunk.statistics
+                if stats is not None and stats.has_null_count:
+                    col["nulls"] += stats.null_count
+                else:
+                    col["nulls"] = None  # Unknown without row group statistics
+        return metadata.num_rows, columns
+
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        names = reader.schema.names
+        columns = {name: {"dtype": str(reader.schema.field(name).type), "nulls": 0} for name in names}
+        n_rows = 0
+        for i in range(reader.num_record_batches):  # One batch at a time (batches may be compressed)
+            batch = reader.get_batch(i)
+            n_rows += batch.num_rows
+            for name, array in zip(names, batch.columns):
+                columns[name]["nulls"] += array.null_count
+    return n_rows, columns
+
+def ingest_upload(uploaded_file, dest_path):
+    """
+    Streams an uploaded file (any binary file-like object, e.g. Streamlit's UploadedFile) to
+    `dest_path`, fingerprinting and quick-profiling it on the way. Returns the quick profile:
+    {"fingerprint", "source", "format", "compression", "size_bytes", "n_rows",
+    "columns": {name: {"dtype", "nulls"}}} (nulls is None when unknown).
+    `n_rows`/`columns` are None if the content could not be profiled in that pass.
+    """
+    dest_dir = os.path.dirname(os.path.abspath(dest_path))
+    hasher = new_fingerprint_hasher()
+    n_rows, columns = None, None
+    uploaded_file.seek(0)
+    file_format, compression = format_from_magic(uploaded_file.read(8)) or ("csv", None)
+    uploaded_file.seek(0)
+    # Write next to the destination and rename at the end, so a half-written file is never profiled
+    with tempfile.NamedTemporaryFile(dir=dest_dir, suffix=".part", delete=False) as sink:
+        tee = _TeeReader(uploaded_file, sink, hasher)
+        try:
+            if file_format == "csv" and columnar_available():
+                try:
+                    n_rows, columns = _stream_csv_profile(tee, compression)
+                except Exception as e:
+                    print(f"Warning: Quick profile of the upload failed ({repr(e)}). Saving it without one.")
+            tee.drain()
+        except BaseException:
+            sink.close()
+            os.remove(sink.name)
+            raise
+    os.replace(sink.name, dest_path)
+    if file_format != "csv":
+        try:
+            n_rows, columns = _columnar_profile(dest_path, file_format)
+        except Exception as e:
+            print(f"Warning: Quick profile of the upload failed ({repr(e)}).")
+
+    return {
+        "fingerprint": hasher.hexdigest(),
+        "source": str(dest_path).replace("\\", "/"),
+        "format": file_format,
+        "compression": compression,
+        "size_bytes": tee.n_bytes,
+        "n_rows": n_rows,
+        "columns": columns,
+    }
@@ -0,0 +1,187 @@
+"""
+Instant report: deterministic charts and aggregates shown right after upload, without the LLM.
+
+Column roles come from the cached profile when there is one (kinds, relevance scores, top
+values, detected date formats), else from the file's Arrow schema. Only the chosen columns
+are read, and every chart is aggregated on the server (see plot_utils), so the report takes
+seconds while the agent pipeline refines the analysis in the background:
+
+- a binned distribution per numeric column,
+- top-k value counts per categorical column,
+- rows (and the main measure's mean) over time per datetime column,
+- standard aggregates (count, mean, sum) of the main measures per low-cardinality dimension.
+"""
+import re
+import time
+
+import pandas as pd
+import plotly.express as px
+
+from data_loader import load_dataset
+from plot_utils import binned_histogram
+
+# --- Configuration ---
+MAX_NUMERIC_CHARTS = 6
+MAX_CATEGORICAL_CHARTS = 6
+MAX_TIME_SERIES = 2
+TOP_K = 15  # Bars per categorical chart / rows per aggregate table
+MAX_DIMENSION_CARDINALITY = 30  # Categorical columns with at most this many values are grouped by
+MAX_AGGREGATE_DIMENSIONS = 2
+MAX_AGGREGATE_MEASURES = 3
+ID_LIKE_UNIQUE_RATIO = 0.95  # Integer/text columns this unique are identifiers, not measures or categories
+# Columns with more than MAX_DIMENSION_CARDINALITY values are identifiers too when their name says so
+# ('Customer ID') or when text values look like codes ('C539', 'SKU-0042')
+CODE_PATTERN = re.compile(r"[A-Za-z]{1,4}[-_ ]?\d+")
+CODE_SHARE = 0.9  # Share of sampled values matching CODE_PATTERN
+ID_SAMPLE_SIZE = 200
+
+
+# --- Column Roles ---
+
+def _schema_kinds(path):
+    """{column: kind} from the Arrow schema (CSV types as inferred from its first block)."""
+    import pyarrow as pa
+
+    from data_preview import dataset_schema
+
+    kinds = {}
+    for field in dataset_schema(path):
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type):
+            kinds[field.name] = "numeric"
+        elif pa.types.is_timestamp(field.type) or pa.types.is_date(field.type):
+            kinds[field.name] = "datetime"
+        else:
+            kinds[field.name] = "categorical"
+    return kinds
+
+def column_roles(path, profile=None):
+    """
+    Columns to chart, most relevant first: {"numeric", "categorical", "datetime"} lists plus
+    {"datetime_formats": {column: format}} for text columns the profile detected as dates.
+    """
+    formats = {}
+    if profile is not None:
+        from profiler import score_columns
+
+        scores = score_columns(profile)
+        kinds = {}
+        for name, col in profile["columns"].items():
+            if col["n_unique"] <= 1:
+                continue  # Constant or empty
+            if col["kind"] == "categorical" and col.get("potential_datetime"):
+                kinds[name] = "datetime"
+                formats[name] = col.get("datetime_format")
+            elif col["kind"] == "categorical" and _looks_like_identifier(
+                    name, col["n_unique"], col["non_null"], col.get("unique_values") or []):
+                continue
+            else:
+                kinds[name] = col["kind"]
+        ranked = sorted(kinds, key=lambda name: -scores.get(name, 0))
+    else:
+        kinds = _schema_kinds(path)
+        ranked = list(kinds)
+    return {
+        "numeric": [c for c in ranked if kinds[c] == "numeric"][:MAX_NUMERIC_CHARTS],
+        "categorical": [c for c in ranked if kinds[c] == "categorical"][:MAX_CATEGORICAL_CHARTS],
+        "datetime": [c for c in ranked if kinds[c] == "datetime"][:MAX_TIME_SERIES],
+        "datetime_formats": formats,
+    }
+
+
+def _looks_like_identifier(name, n_unique, n_values, sample):
+    """
+    Identifier-like: (almost) all values distinct, or more distinct values than a dimension has and
+    either an ID-like name or text values that look like codes (`sample`: some of the values).
+    """
+    if n_unique >= ID_LIKE_UNIQUE_RATIO * max(n_values, 1):
+        return True
+    if n_unique <= MAX_DIMENSION_CARDINALITY:
+        return False
+    from profiler import IRRELEVANT_NAME_TOKENS, name_tokens
+
+    if name_tokens(name) & IRRELEVANT_NAME_TOKENS:
+        return True
+    sample = [value for value in sample if isinstance(value, str)][:ID_SAMPLE_SIZE]
+    return bool(sample) and sum(bool(CODE_PATTERN.fullmatch(value.strip())) for value in sample) >= CODE_SHARE * len(sample)
+
+
+# --- Charts and Aggregates ---
+
+def _is_identifier(series):
+    """True for integer or text columns that look like identifiers (see _looks_like_identifier)."""
+    if pd.api.types.is_float_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return False
+    values = series.dropna()
+    sample = values.head(ID_SAMPLE_SIZE).astype(str).tolist() if not pd.api.types.is_numeric_dtype(series) else []
+    return _looks_like_identifier(series.name, values.nunique(), len(values), sample)
+
+def _period(span):
+    """Resampling frequency giving a readable number of points for a time span."""
+    if span <= pd.Timedelta(days=2):
+        return "h", "hour"
+    if span <= pd.Timedelta(days=120):
+        return "D", "day"
+    if span <= pd.Timedelta(days=3 * 365):
+        return "W", "week"
+    return "MS", "month"
+
+def _time_series_charts(df, column, measure):
+    values = df[[column] + ([measure] if measure else [])].dropna(subset=[column])
+    if values.empty:
+        return []
+    freq, label = _period(values[column].max() - values[column].min())
+    resampled = values.set_index(column).resample(freq)
+    counts = resampled.size().rename("Rows").reset_index()
+    charts = [(f"Rows per {label} ({column})", px.line(counts, x=column, y="Rows", title=f"Rows per {label} ({column})"))]
+    if measure:
+        means = resampled[measure].mean().reset_index()
+        title = f"Average {measure} per {label} ({column})"
+        charts.append((title, px.line(means, x=column, y=measure, title=title)))
+    return charts
+
+def _aggregate_table(df, dimension, measures):
+    grouped = df.groupby(dimension, observed=True, dropna=False)
+    table = grouped.size().rename("Rows").to_frame()
+    for measure in measures:
+        table[f"Mean {measure}"] = grouped[measure].mean()
+    if measures:
+        table[f"Total {measures[0]}"] = grouped[measures[0]].sum()
+    return table.sort_values("Rows", ascending=False).head(TOP_K).reset_index()
+
+def build_instant_report(path, profile=None):
+    """
+    Builds the instant report for a dataset: {"n_rows", "charts": [(title, figure)],
+    "tables": [(title, DataFrame)], "seconds"}. `profile` (optional) guides the column choice.
+    """
+    start = time.time()
+    roles = column_roles(path, profile)
+    columns = roles["numeric"] + roles["categorical"] + roles["datetime"]
+    df = load_dataset(path, columns=columns, optimize=True) if columns else pd.DataFrame()
+    for column in roles["datetime"]:
+        if not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column].astype(str), format=roles["datetime_formats"].get(column), errors="coerce")
+
+    # Without a profile, identifiers (order numbers, text keys) are only recognisable once loaded
+    numeric = [c for c in roles["numeric"] if not _is_identifier(df[c])]
+    categorical = [c for c in roles["categorical"] if not _is_identifier(df[c])]
+    measures = numeric[:MAX_AGGREGATE_MEASURES]
+    charts, tables = [], []
+
+    for column in numeric:
+        charts.append((f"Distribution of {column}", binned_histogram(df, x=column, title=f"Distribution of {column}")))
+    for column in categorical:
+        top_values = profile["columns"][column].get("top_values") if profile is not None else None
+        if top_values:
+            counts = pd.Series({str(value): count for value, count in top_values[:TOP_K]})
+        else:
+            counts = df[column].astype(str).where(df[column].notna()).value_counts().head(TOP_K)
+        title = f"Top {len(counts)} values of {column}"
+        charts.append((title, px.bar(x=counts.index, y=counts.to_numpy(), title=title, labels={"x": column, "y": "Rows"})))
+    for column in roles["datetime"]:
+        charts.extend(_time_series_charts(df, column, measures[0] if measures else None))
+
+    dimensions = [c for c in categorical if df[c].nunique() <= MAX_DIMENSION_CARDINALITY][:MAX_AGGREGATE_DIMENSIONS]
+    for dimension in dimensions:
+        tables.append((f"By {dimension}", _aggregate_table(df, dimension, measures)))
+
+    return {"n_rows": int(len(df)), "charts": charts, "tables": tables, "seconds": round(time.time() - start, 2)}
@@ -1,17 +1,16 @@
 import streamlit as st
 import os
-import pandas as pd
-import numpy as np
 import time
+import threading
 from pathlib import Path
-import plotly.io as pio # Used for potentially validating html if needed, mainly for robust display
-from aianalyst import run_agent  # Import LangGraph AI agent
-from pathlib import Path
+# pandas, plotly and the project helpers (which pull in pyarrow/duckdb) are imported inside the functions
+# that use them, so the first page load before an upload doesn't pay for them.
 
 # --- Configuration ---
 # Define standard file names and directories used/created by the agent
-ORIGINAL_DATA_FILE = "data.csv"
-PROCESSED_DATA_FILE = "output/data_processed.csv"
+ORIGINAL_DATA_FILE = "data.csv" # Fixed pipeline input name; the content may also be gzip/zstd CSV, Parquet or Feather
+UPLOAD_TYPES = ["csv", "gz", "zst", "parquet", "pq", "feather", "arrow"]
+PROCESSED_DATA_DIR = "output" # The cleaned dataset is written here (see processed_data_file)
 PLANS_FILES = {
     "Cleaning": "output/cleaning_plan.md",
     "Analysis": "output/analysis_plan.md",
@@ -30,9 +29,49 @@ OUTPUT_FILES = {
 }
 PLOTS_DIR = Path("output/saved_plots") # Relative path
 TRENDS_DIR = Path("output/trend_plots") # Relative path
+SUMMARY_CACHE_ENTRIES = 8 # Dataset summaries kept in memory across reruns (oldest evicted first)
+FINGERPRINT_CACHE_ENTRIES = 64
+TEXT_CACHE_ENTRIES = 32 # Plans, code and outputs read for the report
+THUMBNAIL_COLUMNS = 3 # Plot thumbnails per row
+PAGE_CACHE_ENTRIES = 64 # Data preview pages kept across reruns
+DRILLDOWN_CACHE_ENTRIES = 128 # Drill-down query results kept across reruns
+INSTANT_REPORT_CACHE_ENTRIES = 8
+INSTANT_REPORT_COLUMNS = 2 # Instant report charts per row
+AGENT_POLL_SECONDS = 2 # How often the progress of a background agent run is refreshed
 
 # --- Helper Functions ---
 
+def processed_data_file():
+    """Path of the cleaned dataset: Parquet (dtypes preserved) when pyarrow is available."""
+    from data_loader import processed_data_path
+    return processed_data_path(PROCESSED_DATA_DIR)
+
+class AgentJob:
+    """
+    A run of the AI agent in a background thread. Only that thread writes the outcome (`processed`,
+    `error`); the page reads it once `done` is set, so Streamlit state is never touched off the script thread.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.done = threading.Event()
+        self.processed = False
+        self.error = None
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            from aianalyst import run_agent
+            run_agent()
+            self.processed = Path(processed_data_file()).is_file()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
 def safe_read_file(file_path):
     """Safely reads text content from a file."""
     try:
@@ -42,55 +81,365 @@ def safe_read_file(file_path):
     except Exception as e:
         return f"Error reading file `{file_path}`: {str(e)}"
 
-def display_csv_summary(tab, file_path, title):
-    """Reads a CSV and displays a comprehensive summary in a Streamlit tab."""
+# --- Cached Computations ---
+# Streamlit reruns the whole script on every interaction. These caches survive reruns; their keys
+# change whenever the file is rewritten (size, mtime, content hash), so results are never stale.
+
+def file_signature(file_path):
+    """(path, size, mtime_ns) of a file: changes whenever the file is rewritten."""
+    stat = os.stat(file_path)
+    return str(file_path), stat.st_size, stat.st_mtime_ns
+
+@st.cache_data(max_entries=FINGERPRINT_CACHE_ENTRIES, show_spinner=False)
+def cached_fingerprint(file_path, size, mtime_ns):
+    """Content hash of a file, recomputed only when its size or mtime changes."""
+    from profiler import fingerprint_file
+    return fingerprint_file(file_path)
+
+@st.cache_data(max_entries=SUMMARY_CACHE_ENTRIES, show_spinner="Computing dataset statistics...")
+def cached_summary(file_path, fingerprint):
+    """The profile of a dataset and every table display_csv_summary shows, keyed on its content hash."""
+    from profiler import (
+        load_or_build_profile, column_info_frame, numeric_summary_frame, categorical_summary_frame,
+        outliers_series, correlation_frame, top_pairs_frame,
+    )
+    profile = load_or_build_profile(file_path, fingerprint=fingerprint)
+    numeric_summary = numeric_summary_frame(profile)
+    categorical_summary = categorical_summary_frame(profile)
+    unique_summary = {}
+    for col in categorical_summary.columns:
+        col_profile = profile["columns"][col]
+        count = col_profile["n_unique"]
+        unique_values = col_profile["unique_values"]
+        if count < 20: # Show values if fewer than 20 unique ones
+            unique_summary[col] = {'Count': count, 'Values': unique_values}
+        else:
+            unique_summary[col] = {'Count': count, 'Values': unique_values[:10] + ['...']} # Show sample
+    return {
+        "n_rows": profile["n_rows"],
+        "duplicates": profile["duplicates"],
+        "column_info": column_info_frame(profile),
+        "numeric_summary": numeric_summary,
+        "categorical_summary": categorical_summary,
+        "outliers": outliers_series(profile) if not numeric_summary.empty else None,
+        "unique_summary": unique_summary,
+        "correlation": correlation_frame(profile),
+        "associations": top_pairs_frame(profile, "association"),
+        "memory_saved": profile.get("memory_saved"),
+    }
+
+@st.cache_data(max_entries=TEXT_CACHE_ENTRIES, show_spinner=False)
+def cached_read_text(file_path, size, mtime_ns):
+    """Text content of a file, re-read only when its size or mtime changes."""
+    return safe_read_file(file_path)
+
+@st.cache_data(max_entries=TEXT_CACHE_ENTRIES, show_spinner=False)
+def cached_figure(file_path, size, mtime_ns):
+    """Plotly figure saved as JSON by plot_utils.save_figure, re-read only when the file changes."""
+    from plot_utils import load_figure
+    return load_figure(file_path)
+
+def read_file_cached(file_path):
+    """safe_read_file, memoised across reruns until the file changes."""
+    try:
+        return cached_read_text(*file_signature(file_path))
+    except OSError:
+        return safe_read_file(file_path) # Missing file: report the error without caching it
+
+@st.cache_data(max_entries=FINGERPRINT_CACHE_ENTRIES, show_spinner=False)
+def cached_preview_meta(file_path, size, mtime_ns):
+    """Schema and (for plain CSVs) row-offset index of a dataset, rebuilt only when the file changes."""
+    from data_preview import PAGE_ROWS, build_csv_row_index, dataset_schema
+    return dataset_schema(file_path), build_csv_row_index(file_path, PAGE_ROWS)
+
+def browse_signature(file_path):
+    """
+    file_signature for the data browser's caches. Once the profiler writes the CSV's schema sidecar,
+    whose column types the pages are parsed with (see data_preview.dataset_schema), its mtime is
+    paired with the file's so the cached schema and pages are rebuilt.
+    """
+    from data_loader import schema_sidecar_path
+    path, size, mtime_ns = file_signature(file_path)
+    try:
+        return path, size, (mtime_ns, os.stat(schema_sidecar_path(file_path)).st_mtime_ns)
+    except OSError:
+        return path, size, mtime_ns # No sidecar (yet), or not a CSV
+
+def _preview_filter(file_path, size, mtime_ns, filter_spec):
+    from data_preview import filter_expression
+    schema, _ = cached_preview_meta(file_path, size, mtime_ns)
+    return filter_expression(schema, *filter_spec) if filter_spec else None
+
+@st.cache_data(max_entries=PAGE_CACHE_ENTRIES, show_spinner=False)
+def cached_row_count(file_path, size, mtime_ns, filter_spec):
+    """Rows of a dataset matching `filter_spec` (column, operator, value) or all rows."""
+    from data_preview import count_rows
+    _, csv_index = cached_preview_meta(file_path, size, mtime_ns)
+    return count_rows(file_path, _preview_filter(file_path, size, mtime_ns, filter_spec), csv_index)
+
+@st.cache_data(max_entries=PAGE_CACHE_ENTRIES, show_spinner="Reading page...")
+def cached_page(file_path, size, mtime_ns, page, sort_by, descending, filter_spec):
+    """One page of a dataset as a pyarrow Table, read without loading the rest of the file."""
+    from data_preview import PAGE_ROWS, read_page
+    _, csv_index = cached_preview_meta(file_path, size, mtime_ns)
+    return read_page(file_path, page, PAGE_ROWS, sort_by, descending,
+                     _preview_filter(file_path, size, mtime_ns, filter_spec), csv_index)
+
+def display_data_browser(file_path):
+    """
+    Paginated, sortable and filterable view of a dataset, read one page at a time (see data_preview.py).
+    Returns an empty slot under the table for the memory caption, filled once the profile is known.
+    """
+    from data_preview import PAGE_ROWS, PREVIEW_OPERATORS
+    st.subheader("📄 Browse Rows")
+    memory_caption = None
+    try:
+        signature = browse_signature(file_path)
+        schema, _ = cached_preview_meta(*signature)
+        key = str(file_path)
+        c1, c2, c3, c4, c5 = st.columns([2, 1, 2, 2, 1])
+        filter_column = c1.selectbox("Filter column", ["(none)"] + schema.names, key=f"browse_filter_col_{key}")
+        filter_op = c2.selectbox("Operator", list(PREVIEW_OPERATORS), key=f"browse_filter_op_{key}")
+        filter_value = c3.text_input("Value", key=f"browse_filter_value_{key}")
+        sort_column = c4.selectbox("Sort by", ["(file order)"] + schema.names, key=f"browse_sort_{key}")
+        descending = c5.checkbox("Descending", key=f"browse_desc_{key}")
+
+        filter_spec = (filter_column, filter_op, filter_value) if filter_column != "(none)" and filter_value != "" else None
+        sort_by = sort_column if sort_column != "(file order)" else None
+        n_rows = cached_row_count(*signature, filter_spec)
+        n_pages = max((n_rows + PAGE_ROWS - 1) // PAGE_ROWS, 1)
+        page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1,
+                               key=f"browse_page_{key}_{filter_spec}_{sort_by}_{descending}") - 1 # New query starts at page 1
+        table = cached_page(*signature, page, sort_by, descending, filter_spec)
+        st.caption(f"Rows {page * PAGE_ROWS + 1:,}–{page * PAGE_ROWS + table.num_rows:,} of {n_rows:,}")
+        st.dataframe(table) # Arrow table handed to the frontend as-is
+        memory_caption = st.empty()
+    except Exception as e:
+        st.warning(f"Could not read rows of '{file_path}': {str(e)}")
+    return memory_caption
+
+def display_memory_caption(slot, memory_saved):
+    """Fills the data browser's memory caption with the savings of data_loader.optimize_dtypes."""
+    if slot is not None and memory_saved:
+        from data_loader import memory_report
+        slot.caption(f"In memory (category/int32/float32 dtypes): {memory_report(memory_saved)}")
+
+@st.cache_resource(max_entries=2)
+def cached_duckdb_connection(file_path, size, mtime_ns):
+    """DuckDB connection with the dataset as a view, reused across reruns (None without duckdb)."""
+    from duckdb_backend import connect_dataset, duckdb_available
+    return connect_dataset(file_path) if duckdb_available() else None
+
+def _drilldown_connection(file_path, size, mtime_ns):
+    con = cached_duckdb_connection(file_path, size, mtime_ns)
+    return con.cursor() if con is not None else None # A cursor per query: Streamlit sessions run in parallel threads
+
+@st.cache_data(max_entries=DRILLDOWN_CACHE_ENTRIES, show_spinner="Running query...")
+def cached_drilldown(file_path, size, mtime_ns, query):
+    """Drill-down query result (see drilldown.py), keyed on the file version and the query."""
+    from drilldown import run_drilldown
+    return run_drilldown(file_path, query, _drilldown_connection(file_path, size, mtime_ns))
+
+@st.cache_data(max_entries=DRILLDOWN_CACHE_ENTRIES, show_spinner=False)
+def cached_distinct_values(file_path, size, mtime_ns, column):
+    from drilldown import distinct_values
+    return distinct_values(file_path, column, con=_drilldown_connection(file_path, size, mtime_ns))
+
+@st.cache_data(max_entries=DRILLDOWN_CACHE_ENTRIES, show_spinner=False)
+def cached_value_range(file_path, size, mtime_ns, column):
+    from drilldown import value_range
+    return value_range(file_path, column, _drilldown_connection(file_path, size, mtime_ns))
+
+def display_drilldown(tab, file_path):
+    """Filter / group / aggregate panel over the processed dataset, answered by an embedded engine."""
+    with tab:
+        st.header("🔬 Drill-Down")
+        if not Path(file_path).is_file():
+            st.warning(f"File not found: {file_path}. Run the AI Agent first.")
+            return
+        try:
+            import pandas as pd
+            import plotly.express as px
+            import pyarrow as pa
+            from drilldown import AGGREGATIONS, TIME_GRAINS
+            from duckdb_backend import duckdb_available
+
+            signature = file_signature(file_path)
+            schema, _ = cached_preview_meta(*signature)
+            names = schema.names
+            numeric = [f.name for f in schema if pa.types.is_integer(f.type) or pa.types.is_floating(f.type)]
+            temporal = [f.name for f in schema if pa.types.is_timestamp(f.type) or pa.types.is_date(f.type)]
+            dimensions = [name for name in names if name not in numeric and name not in temporal]
+            st.caption(f"Engine: {'DuckDB' if duckdb_available() else 'pyarrow'} · results cached per query")
+
+            c1, c2 = st.columns(2)
+            group_by = c1.multiselect("Group by", dimensions, key="drill_group_by")
+            measure = c2.selectbox("Measure", ["(rows)"] + numeric, key="drill_measure")
+            aggregations = ["count"] if measure == "(rows)" else list(AGGREGATIONS)
+            aggs = c2.multiselect("Aggregations", aggregations, default=aggregations[:1] if measure == "(rows)" else ["sum"],
+                                  key=f"drill_aggs_{measure}")
+
+            filters = []
+            with st.expander("Filters", expanded=True):
+                filter_columns = st.multiselect("Filter on", dimensions, key="drill_filter_columns")
+                for column in filter_columns:
+                    values = st.multiselect(column, cached_distinct_values(*signature, column), key=f"drill_filter_{column}")
+                    if values:
+                        filters.append((column, "in", tuple(values)))
+                time_column, time_grain = None, None
+                if temporal:
+                    t1, t2, t3 = st.columns(3)
+                    time_column = t1.selectbox("Date column", ["(none)"] + temporal, key="drill_time_column")
+                    if time_column != "(none)":
+                        low, high = cached_value_range(*signature, time_column)
+                        date_range = t2.date_input("Date range", value=(pd.Timestamp(low).date(), pd.Timestamp(high).date()), key=f"drill_range_{time_column}")
+                        if isinstance(date_range, (list, tuple)) and len(date_range) == 2:
+                            filters.append((time_column, "between", (pd.Timestamp(date_range[0]),
+                                                                     pd.Timestamp(date_range[1]) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1))))
+                        grain = t3.selectbox("Group by period", ["(none)"] + list(TIME_GRAINS), key="drill_time_grain")
+                        time_grain = None if grain == "(none)" else grain
+                    else:
+                        time_column = None
+
+            metrics = tuple(("*" if measure == "(rows)" else measure, agg) for agg in aggs) or (("*", "count"),)
+            query = {"group_by": tuple(group_by), "metrics": metrics, "filters": tuple(filters),
+                     "time_column": time_column, "time_grain": time_grain}
+            start = time.time()
+            result = cached_drilldown(*signature, query)
+            st.caption(f"{len(result):,} result rows in {time.time() - start:.2f}s")
+            st.dataframe(result, hide_index=True)
+
+            keys = list(group_by) + ([f"{time_column} ({time_grain})"] if time_grain else [])
+            if len(keys) == 1 and len(result) > 1:
+                value_column = result.columns[1]
+                chart = px.line if time_grain else px.bar
+                st.plotly_chart(chart(result, x=keys[0], y=value_column, title=f"{value_column} by {keys[0]}"),
+                                use_container_width=True)
+        except Exception as e:
+            st.error(f"Drill-down query failed: {str(e)}")
+
+@st.cache_data(max_entries=INSTANT_REPORT_CACHE_ENTRIES, show_spinner="Building the instant report...")
+def cached_instant_report(file_path, fingerprint, has_profile):
+    """Instant report of a dataset, keyed on its content hash; rebuilt once its full profile exists."""
+    from instant_report import build_instant_report
+    from profiler import load_profile
+    return build_instant_report(file_path, load_profile(fingerprint) if has_profile else None)
+
+def display_instant_report(tab, file_path, quick_profile=None):
+    """Shows the deterministic charts and aggregates of instant_report.py (no LLM involved)."""
+    with tab:
+        st.header("⚡ Instant Report")
+        if not Path(file_path).is_file():
+            st.info("Please upload a data file using the sidebar.")
+            return
+        try:
+            from profiler import profile_path
+
+            if quick_profile:
+                fingerprint = quick_profile["fingerprint"]
+            else:
+                fingerprint = cached_fingerprint(*file_signature(file_path))
+            report = cached_instant_report(file_path, fingerprint, os.path.exists(profile_path(fingerprint)))
+        except Exception as e:
+            st.error(f"Could not build the instant report: {str(e)}")
+            return
+        st.caption(f"Built from {report['n_rows']:,} rows in {report['seconds']}s, without the AI Agent. "
+                   "Run the agent for the full analysis.")
+        for row_start in range(0, len(report["charts"]), INSTANT_REPORT_COLUMNS):
+            cols = st.columns(INSTANT_REPORT_COLUMNS)
+            for col, (title, fig) in zip(cols, report["charts"][row_start:row_start + INSTANT_REPORT_COLUMNS]):
+                col.plotly_chart(fig, use_container_width=True, key=f"instant_{title}")
+        for title, table in report["tables"]:
+            st.subheader(title)
+            st.dataframe(table, hide_index=True)
+        if not report["charts"] and not report["tables"]:
+            st.info("No columns suitable for automatic charts were found.")
+
+def display_quick_profile(quick_profile):
+    """Shows the quick profile computed while the upload was streamed to disk (no extra parse)."""
+    import pandas as pd
+
+    st.subheader("⚡ Quick Overview")
+    columns = quick_profile["columns"]
+    n_rows = quick_profile["n_rows"]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Rows", f"{n_rows:,}")
+    c2.metric("Columns", len(columns))
+    c3.metric("File Size", f"{quick_profile['size_bytes'] / 1024 ** 2:.1f} MB")
+    st.dataframe(pd.DataFrame({
+        "Column": list(columns),
+        "Type": [col["dtype"] for col in columns.values()],
+        "Null Count": [col["nulls"] for col in columns.values()],
+        "Null %": [round(col["nulls"] / n_rows * 100, 2) if n_rows and col["nulls"] is not None else None
+                   for col in columns.values()],
+    }), hide_index=True)
+
+def display_csv_summary(tab, file_path, title, quick_profile=None):
+    """
+    Displays a comprehensive summary of a dataset file (from its cached profile) in a Streamlit tab.
+    With a `quick_profile` from the upload, that is shown first and the full profile is only
+    computed on request (or shown directly if it is already cached).
+    """
     with tab:
         st.header(title)
         file = Path(file_path)
         if not file.is_file():
             st.warning(f"File not found: {file_path}. Please ensure the file exists.")
             # Optionally, try to provide more context based on the file path
-            if file_path == PROCESSED_DATA_FILE:
+            if file_path == processed_data_file():
                  st.info("This file is generated after running the AI Agent.")
             elif file_path == ORIGINAL_DATA_FILE:
-                 st.info("Please upload a CSV file using the sidebar.")
+                 st.info("Please upload a data file using the sidebar.")
             return # Stop execution for this tab if file not found
 
+        import pandas as pd
+        from profiler import profile_path
+
         try:
-            df = pd.read_csv(file_path)
+            memory_caption = display_data_browser(file_path)
 
-            st.subheader("📄 First 5 Rows")
-            st.dataframe(df.head())
+            # The upload's fingerprint was computed while it was saved, so the file isn't hashed again
+            if quick_profile:
+                fingerprint = quick_profile["fingerprint"]
+            else:
+                fingerprint = cached_fingerprint(*file_signature(file_path))
+            if quick_profile and quick_profile["columns"] is not None and not os.path.exists(profile_path(fingerprint)):
+                display_quick_profile(quick_profile)
+                if not st.button("🔍 Compute Detailed Statistics", key=f"profile_{file_path}"):
+                    return
+
+            # Statistics come from the cached profile artifact (output/profiles/<fingerprint>.json),
+            # computed once per dataset by profiler.py and shared with the agent's summary step;
+            # the tables built from it are memoised in-process across reruns.
+            summary = cached_summary(str(file_path), fingerprint)
+            display_memory_caption(memory_caption, summary["memory_saved"])
+            n_rows = summary["n_rows"]
 
             st.subheader("📊 Column Information")
-            st.dataframe(pd.DataFrame({
-                "Data Type": df.dtypes,
-                "Non-Null Count": df.count(),
-                "Null Count": df.isnull().sum(),
-                "Null Percentage (%)": (df.isnull().sum() / len(df) * 100).round(2)
-            }))
+            column_info = summary["column_info"]
+            st.dataframe(column_info)
 
             st.subheader("🔢 Statistical Summary (Numeric Columns)")
-            numeric_cols = df.select_dtypes(include=np.number)
-            if not numeric_cols.empty:
-                st.dataframe(numeric_cols.describe().round(2))
+            numeric_summary = summary["numeric_summary"]
+            if not numeric_summary.empty:
+                st.dataframe(numeric_summary.round(2))
             else:
                 st.write("No numeric columns found for statistical summary.")
 
             st.subheader("📜 Statistical Summary (Object/Categorical Columns)")
-            object_cols = df.select_dtypes(include=['object', 'category'])
-            if not object_cols.empty:
-                 st.dataframe(object_cols.describe())
+            categorical_summary = summary["categorical_summary"]
+            if not categorical_summary.empty:
+                 st.dataframe(categorical_summary)
             else:
                 st.write("No object/categorical columns found for statistical summary.")
 
             st.subheader("❓ Missing Values ")
             # Simple text representation if missing values exist
-            missing_values = df.isnull().sum()
+            missing_values = column_info["Null Count"]
             missing_cols = missing_values[missing_values > 0]
             if not missing_cols.empty:
                 st.write("Columns with missing values:")
-                st.dataframe(pd.DataFrame(missing_cols, columns=["Missing Count"]))
+                st.dataframe(pd.DataFrame({"Missing Count": missing_cols}))
                 # For a visual heatmap, consider using seaborn/matplotlib if heavy plotting is acceptable
                 # Or create a simple Plotly heatmap if Plotly is a core dependency
             else:
@@ -98,19 +447,13 @@ def display_csv_summary(tab, file_path, title):
 
 
             st.subheader("🔗 Duplicate Rows")
-            duplicates = df.duplicated().sum()
-            st.write(f"Total Duplicate Rows: {duplicates} ({duplicates / len(df) * 100:.2f}%)")
+            duplicates = summary["duplicates"]
+            st.write(f"Total Duplicate Rows: {duplicates} ({duplicates / n_rows * 100 if n_rows else 0:.2f}%)")
 
-            # Optional: Outliers (can be computationally intensive for large datasets)
-            # Consider making this optional or showing only for key columns
             st.subheader("📈 Outliers Count (using IQR)")
-            if not numeric_cols.empty:
-                Q1 = numeric_cols.quantile(0.25)
-                Q3 = numeric_cols.quantile(0.75)
-                IQR = Q3 - Q1
-                outliers = ((numeric_cols < (Q1 - 1.5 * IQR)) | (numeric_cols > (Q3 + 1.5 * IQR))).sum()
-                outliers_df = pd.DataFrame(outliers, columns=["Outliers Count"])
-                outliers_df = outliers_df[outliers_df["Outliers Count"] > 0]
+            if not numeric_summary.empty:
+                outliers = summary["outliers"]
+                outliers_df = pd.DataFrame({"Outliers Count": outliers[outliers > 0]})
                 if not outliers_df.empty:
                     st.dataframe(outliers_df)
                 else:
@@ -120,30 +463,29 @@ def display_csv_summary(tab, file_path, title):
 
 
             st.subheader("✨ Unique Values in Categorical Columns (Sample)")
-            if not object_cols.empty:
-                unique_summary = {}
-                for col in object_cols.columns:
-                    unique_values = df[col].dropna().unique()
-                    count = len(unique_values)
-                    if count < 20: # Show values if fewer than 20 unique ones
-                         unique_summary[col] = {'Count': count, 'Values': unique_values.tolist()}
-                    else:
-                         unique_summary[col] = {'Count': count, 'Values': unique_values[:10].tolist() + ['...']} # Show sample
-                st.json(unique_summary, expanded=False)
+            if not categorical_summary.empty:
+                st.json(summary["unique_summary"], expanded=False)
             else:
                 st.write("No categorical columns found.")
 
 
             st.subheader("↔️ Correlation Matrix (Numeric Columns)")
-            if not numeric_cols.empty and len(numeric_cols.columns) > 1:
-                corr_matrix = numeric_cols.corr().round(2)
-                st.dataframe(corr_matrix)
+            corr_matrix = summary["correlation"]
+            if len(corr_matrix.columns) > 1:
+                st.dataframe(corr_matrix.round(2))
                 # Consider adding a heatmap here using st.plotly_chart or st.pyplot
-            elif len(numeric_cols.columns) <= 1 :
+            elif len(numeric_summary.columns) <= 1 :
                  st.write("Need at least two numeric columns to compute correlation.")
             else:
                 st.write("No numeric columns found for correlation analysis.")
 
+            st.subheader("🧩 Strongest Categorical Associations (Cramér's V)")
+            associations = summary["associations"]
+            if not associations.empty:
+                st.dataframe(associations, hide_index=True)
+            else:
+                st.write("Need at least two low-cardinality categorical columns to compute associations.")
+
         except pd.errors.EmptyDataError:
             st.error(f"Error: The file '{file_path}' is empty.")
         except Exception as e:
@@ -156,7 +498,7 @@ def display_markdown_files(tab, files_dict):
         st.header("📝 Agent Plans")
         for name, filepath in files_dict.items():
             st.subheader(f"{name} Plan")
-            content = safe_read_file(filepath)
+            content = read_file_cached(filepath)
             if content.startswith("Error:"):
                 st.warning(content)
             else:
@@ -168,7 +510,7 @@ def display_code_files(tab, files_dict):
         st.header("🐍 Generated Code")
         for name, filepath in files_dict.items():
             st.subheader(f"{name} Code")
-            content = safe_read_file(filepath)
+            content = read_file_cached(filepath)
             if content.startswith("Error:"):
                 st.warning(content)
             else:
@@ -180,7 +522,7 @@ def display_markdown_outputs(tab, files_dict):
         st.header("📊 Analysis Outputs")
         for name, filepath in files_dict.items():
             st.subheader(f"{name} Output")
-            contents = safe_read_file(filepath)
+            contents = read_file_cached(filepath)
             # Ensure new lines are properly formatted
             #contents = content.replace("\n", "\n\n")  # Adds extra line breaks for Markdown rendering
 
@@ -216,7 +558,7 @@ def display_markdown_outputs(tab, files_dict):
 #             except Exception as e:
 #                 st.error(f"Error displaying plot `{file_path.name}`: {str(e)}")
 def display_plots(tab, title, plot_dir):
-    """Displays various plot types found in a specified directory (HTML, PNG, JPG, etc.)."""
+    """Displays various plot types found in a specified directory (Plotly JSON, HTML, PNG, JPG)."""
     with tab:
         st.header(title)
 
@@ -224,14 +566,43 @@ def display_plots(tab, title, plot_dir):
             st.warning(f"Plot directory not found: `{plot_dir}`. Run the agent to generate plots.")
             return
 
-        # Supported plot types
-        html_files = sorted(plot_dir.glob("*.html"))  # Plotly
-        image_files = sorted(plot_dir.glob("*.png")) + sorted(plot_dir.glob("*.jpg"))  # Matplotlib, Seaborn
+        from plot_utils import FIGURE_SUFFIX
+        from thumbnails import THUMBNAIL_SUFFIX, thumbnail_path
 
-        if not html_files and not image_files:
-            st.info(f"No supported plots (`.html`, `.png`, `.jpg`) found in `{plot_dir}`.")
+        # Supported plot types
+        figure_files = sorted(plot_dir.glob(f"*{FIGURE_SUFFIX}"))  # Plotly figure JSON (plot_utils.save_figure)
+        figure_stems = {file_path.stem for file_path in figure_files}
+        # Standalone HTML from older runs (or HTML copies of a JSON figure, which is shown instead)
+        html_files = [file_path for file_path in sorted(plot_dir.glob("*.html")) if file_path.stem not in figure_stems]
+        image_files = [file_path for file_path in sorted(plot_dir.glob("*.png")) + sorted(plot_dir.glob("*.jpg"))
+                       if not file_path.name.endswith(THUMBNAIL_SUFFIX)]  # Matplotlib, Seaborn (not our thumbnails)
+
+        if not figure_files and not html_files and not image_files:
+            st.info(f"No supported plots (`{FIGURE_SUFFIX}`, `.html`, `.png`, `.jpg`) found in `{plot_dir}`.")
             return
 
+        # Grid of static thumbnails (rendered in the background by thumbnails.py); a figure is only
+        # loaded and rendered interactively once its toggle is switched on
+        opened_figures = []
+        grid = st.columns(THUMBNAIL_COLUMNS)
+        for i, file_path in enumerate(figure_files):
+            with grid[i % THUMBNAIL_COLUMNS]:
+                thumbnail = Path(thumbnail_path(file_path))
+                if thumbnail.is_file():
+                    st.image(str(thumbnail), caption=file_path.stem, use_column_width=True)
+                else:
+                    st.caption(f"📈 {file_path.stem} (no preview yet)")
+                if st.toggle("Open interactive", key=f"open_plot_{file_path}"):
+                    opened_figures.append(file_path)
+
+        # Display opened Plotly figures through st.plotly_chart (plotly.js is loaded once by the page, not per plot)
+        for file_path in opened_figures:
+            st.subheader(f"Plot: {file_path.stem}")
+            try:
+                st.plotly_chart(cached_figure(*file_signature(file_path)), use_container_width=True)
+            except Exception as e:
+                st.error(f"Error displaying Plotly plot `{file_path.name}`: {str(e)}")
+
         # Display Plotly HTML files
         for file_path in html_files:
             st.subheader(f"Plot: {file_path.stem}")  # Removes .html, .png, .jpg, etc.
@@ -248,12 +619,20 @@ def display_plots(tab, title, plot_dir):
             st.subheader(f"Plot: {file_path.stem}")  # Removes .html, .png, .jpg, etc.
 
             try:
-                image = Image.open(file_path)
-                st.image(image, use_column_width=True)
+                st.image(str(file_path), use_column_width=True)
             except Exception as e:
                 st.error(f"Error displaying image `{file_path.name}`: {str(e)}")
 
 
+@st.fragment(run_every=AGENT_POLL_SECONDS)
+def display_agent_progress(job):
+    """Progress of a background agent run, refreshed on its own; reruns the whole page once the run has finished."""
+    if job.done.is_set():
+        st.rerun() # The controls and report sections depend on the outcome
+    st.info(f"🤖 AI Agent is analyzing the data in the background ({time.time() - job.started:.0f}s so far). "
+            "The instant report is available meanwhile.")
+
+
 # --- Streamlit App Layout ---
 
 st.set_page_config(page_title="AI Data Analysis Agent", layout="wide")
@@ -269,20 +648,32 @@ with st.sidebar:
     st.title("⚙️ Controls")
 
     st.header("1. Upload Data")
-    uploaded_file = st.file_uploader("Choose a CSV file", type=["csv"], key="file_uploader")
+    # The format is detected from the content; compressed CSVs are stored compressed and streamed when read
+    agent_job = st.session_state.get("agent_job")
+    agent_running = agent_job is not None and not agent_job.done.is_set()
+    # The agent reads the original data file while it runs, so it can't be replaced meanwhile
+    uploaded_file = st.file_uploader("Choose a data file (CSV, .csv.gz, .csv.zst, Parquet or Feather)",
+                                     type=UPLOAD_TYPES, key="file_uploader", disabled=agent_running)
 
     if uploaded_file is not None:
-        # Save the uploaded file to the designated original data file path
-        try:
-            with open(ORIGINAL_DATA_FILE, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+        # Streamlit reruns this script on every interaction; only ingest an upload once
+        upload_id = getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
+        if st.session_state.get("ingested_upload_id") != upload_id:
+            # Stream the upload to the designated original data file path, fingerprinting and quick-profiling it on the way
+            try:
+                from ingest import ingest_upload
+                with st.spinner(f"Saving '{uploaded_file.name}'..."):
+                    st.session_state.upload_profile = ingest_upload(uploaded_file, ORIGINAL_DATA_FILE)
+                st.session_state.ingested_upload_id = upload_id
+                st.session_state.data_uploaded = True
+                # Reset agent run status if new data is uploaded
+                st.session_state.agent_run_complete = False
+            except Exception as e:
+                st.error(f"Error saving uploaded file: {e}")
+                st.session_state.pop("upload_profile", None)
+                st.session_state.data_uploaded = False
+        if st.session_state.get("ingested_upload_id") == upload_id:
             st.success(f"File '{uploaded_file.name}' uploaded and saved as `{ORIGINAL_DATA_FILE}`.")
-            st.session_state.data_uploaded = True
-            # Reset agent run status if new data is uploaded
-            st.session_state.agent_run_complete = False
-        except Exception as e:
-            st.error(f"Error saving uploaded file: {e}")
-            st.session_state.data_uploaded = False
     elif Path(ORIGINAL_DATA_FILE).exists():
         # If file exists from previous session but wasn't uploaded now
         st.session_state.data_uploaded = True
@@ -291,14 +682,14 @@ with st.sidebar:
     st.header("2. Run AI Agent")
     st.info("The agent will process the uploaded data, generate plans, code, analysis, and visualizations.")
 
-    # Only enable the button if data has been uploaded
-    run_button_disabled = not st.session_state.data_uploaded
+    # Only enable the button if data has been uploaded and no run is in progress
+    run_button_disabled = not st.session_state.data_uploaded or agent_running
     if st.button("🚀 Run AI Agent", disabled=run_button_disabled, type="primary"):
         # --- Import and Run Agent ---
         # We import here to avoid potential issues if aiagent has heavy imports
         # and the user hasn't uploaded a file yet.
         try:
-            from aianalyst import run_agent
+            from aianalyst import run_agent  # noqa: F401
         except ImportError:
             st.error("Fatal Error: Could not import `run_agent` from `aiagent.py`. Ensure the file exists and is configured correctly.")
             st.stop() # Stop execution if agent can't be imported
@@ -311,61 +702,57 @@ with st.sidebar:
         except Exception as e:
              st.warning(f"Could not create output directories: {e}. The agent might fail if it cannot write files.")
 
-        with st.spinner("🤖 AI Agent is analyzing the data... Please wait."):
-            try:
-                # --- Execute the LangGraph AI agent ---
-                run_agent()
-                # --- Agent execution finished ---
-
-                # Verify expected output files (optional but recommended)
-                if Path(PROCESSED_DATA_FILE).is_file():
-                    st.session_state.agent_run_complete = True
-                    st.success("✅ AI Agent finished successfully!")
-                    # Use st.experimental_rerun() if you *really* need to force a full refresh
-                    # but session state should handle updates correctly now.
-                    # st.experimental_rerun()
-                else:
-                    st.error(f"Agent run seemed to complete, but the processed data file (`{PROCESSED_DATA_FILE}`) was not found. Please check agent logs.")
-                    st.session_state.agent_run_complete = False
-
-            except Exception as e:
-                st.error(f"An error occurred during AI agent execution: {str(e)}")
-                st.exception(e) # Shows traceback for debugging
-                st.session_state.agent_run_complete = False
+        # --- Execute the LangGraph AI agent in the background ---
+        # The instant report stays usable meanwhile; the agent's sections appear once it has finished
+        agent_job = AgentJob().start()
+        st.session_state.agent_job = agent_job
+        st.session_state.agent_run_complete = False
+        agent_running = True
+
+    if agent_running:
+        display_agent_progress(agent_job)
+    elif agent_job is not None:
+        # --- Agent execution finished --- (reported once, then the job is dropped)
+        del st.session_state.agent_job
+        if agent_job.error is not None:
+            st.error(f"An error occurred during AI agent execution: {str(agent_job.error)}")
+            st.exception(agent_job.error) # Shows traceback for debugging
+            st.session_state.agent_run_complete = False
+        elif agent_job.processed:
+            st.session_state.agent_run_complete = True
+            st.success("✅ AI Agent finished successfully!")
+        else:
+            st.error(f"Agent run seemed to complete, but the processed data file (`{processed_data_file()}`) was not found. Please check agent logs.")
+            st.session_state.agent_run_complete = False
 
-    if run_button_disabled:
-        st.warning("Please upload a CSV file first to enable the AI Agent.")
+    if not st.session_state.data_uploaded:
+        st.warning("Please upload a data file first to enable the AI Agent.")
 
 
 # --- Main Area Tabs ---
 st.title("📊 AI Data Analysis Report")
 
-tab_titles = [
-    "📄 Original Data",
-    "✨ Processed Data",
-    "📝 Plans",
-    "🐍 Code",
-    "💡 Outputs",
-    "📈 Visualizations",
-    "📉 Trends"
-]
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(tab_titles)
-
-# Tab 1: Original Data Summary
-display_csv_summary(tab1, ORIGINAL_DATA_FILE, "Original Data Summary")
-
-# Tabs 2-7: Display results only if the agent has run successfully
-if st.session_state.get('agent_run_complete', False):
-    display_csv_summary(tab2, PROCESSED_DATA_FILE, "Processed Data Summary")
-    display_markdown_files(tab3, PLANS_FILES)
-    display_code_files(tab4, CODE_FILES)
-    display_markdown_outputs(tab5, OUTPUT_FILES)
-    display_plots(tab6, "📊 Generated Visualizations", PLOTS_DIR)
-    display_plots(tab7, "📉 Trend Analysis Plots", TRENDS_DIR)
+# Sections are built lazily: st.tabs would compute and render every tab on each rerun,
+# so a selector picks one and only that section's content is read and rendered.
+REPORT_SECTIONS = {
+    "⚡ Instant Report": lambda tab: display_instant_report(tab, ORIGINAL_DATA_FILE, st.session_state.get("upload_profile")),
+    "📄 Original Data": lambda tab: display_csv_summary(tab, ORIGINAL_DATA_FILE, "Original Data Summary", st.session_state.get("upload_profile")),
+    "✨ Processed Data": lambda tab: display_csv_summary(tab, processed_data_file(), "Processed Data Summary"),
+    "📝 Plans": lambda tab: display_markdown_files(tab, PLANS_FILES),
+    "🐍 Code": lambda tab: display_code_files(tab, CODE_FILES),
+    "💡 Outputs": lambda tab: display_markdown_outputs(tab, OUTPUT_FILES),
+    "📈 Visualizations": lambda tab: display_plots(tab, "📊 Generated Visualizations", PLOTS_DIR),
+    "📉 Trends": lambda tab: display_plots(tab, "📉 Trend Analysis Plots", TRENDS_DIR),
+    "🔬 Drill-Down": lambda tab: display_drilldown(tab, processed_data_file()),
+}
+selected_section = st.radio("Report section", list(REPORT_SECTIONS), horizontal=True,
+                            key="report_section", label_visibility="collapsed")
+section_container = st.container()
+
+# The instant report and the original data are always available; every other section only once the agent has run successfully
+if selected_section in ("⚡ Instant Report", "📄 Original Data") or st.session_state.get('agent_run_complete', False):
+    REPORT_SECTIONS[selected_section](section_container)
 else:
-    # Show placeholders in tabs 2-7 if agent hasn't run
-    tabs_to_inform = [tab2, tab3, tab4, tab5, tab6, tab7]
-    for tab in tabs_to_inform:
-        with tab:
-            st.info("Run the AI Agent from the sidebar to generate content for this tab.")
+    with section_container:
+        st.info("Run the AI Agent from the sidebar to generate content for this section.")
 
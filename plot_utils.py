@@ -0,0 +1,157 @@
+"""
+Saving and loading of the Plotly figures produced by the generated visualisation/trends scripts.
+
+`fig.write_html` inlines the whole plotly.js bundle (~4 MB) into every plot file. Figures are
+saved instead as Plotly figure JSON (data and layout only, typically a few KB) and rendered by
+the Streamlit UI with `st.plotly_chart`, which ships plotly.js once. A standalone HTML copy can
+still be written; it then references a single plotly.min.js next to it instead of inlining it.
+
+The plotting helpers aggregate on the server, so a figure's size does not grow with the row
+count: histograms are pre-binned, large scatters become a 2D density grid (datashader-style) or
+a stratified sample, and box plots are drawn from per-group quartiles.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# --- Configuration ---
+FIGURE_SUFFIX = ".json"
+PLOT_SUFFIXES = (FIGURE_SUFFIX, ".html", ".png", ".jpg")  # Everything the UI knows how to show
+HISTOGRAM_BINS = 50
+MAX_BAR_CATEGORIES = 50  # Histogram of a text column: most frequent values shown
+MAX_SCATTER_POINTS = 5_000  # Above this, scatters are aggregated
+SCATTER_GRID_BINS = 120  # Density grid resolution (per axis)
+MAX_BOX_GROUPS = 50  # Largest groups shown in a box plot
+
+
+def figure_path(path):
+    """`path` with the figure JSON suffix (e.g. plot1_age.html -> plot1_age.json)."""
+    return os.path.splitext(str(path))[0] + FIGURE_SUFFIX
+
+def save_figure(fig, path, html=False):
+    """
+    Saves a Plotly figure as compact figure JSON (the extension of `path` is replaced with .json).
+    With `html=True` a standalone HTML copy is written too, sharing one plotly.min.js per directory.
+    Returns the path of the JSON file.
+    """
+    json_path = figure_path(path)
+    dir_name = os.path.dirname(json_path)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    pio.write_json(fig, json_path)
+    if html:
+        fig.write_html(os.path.splitext(json_path)[0] + ".html", include_plotlyjs="directory", full_html=True)
+    return json_path
+
+def load_figure(path):
+    """Reads a figure saved by save_figure back into a plotly Figure."""
+    return pio.read_json(path)
+
+
+# --- Server-Side Aggregation ---
+
+def _numeric_values(series):
+    """(float values, is_datetime) for a numeric or datetime Series (as nanoseconds), or None for other dtypes."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # The int64 of a datetime counts its own unit (us from Parquet/pandas 3, s, ms, ...): normalise to ns first
+        return series.dropna().dt.as_unit("ns").astype("int64").to_numpy(dtype=float), True
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        values = series.dropna().to_numpy(dtype=float)
+        return values[np.isfinite(values)], False
+    return None
+
+def _axis_values(values, is_datetime):
+    return pd.to_datetime(values.astype("int64"), unit="ns") if is_datetime else values
+
+def binned_histogram(df, x, color=None, nbins=HISTOGRAM_BINS, title=None):
+    """
+    Histogram of column `x` with the bin counts computed here (one bar per bin, not per row).
+    `color` splits the counts by a grouping column over shared bins. Text columns are shown as
+    counts of their most frequent values.
+    """
+    series = df[x]
+    numeric = _numeric_values(series)
+    if numeric is None:
+        counts = series.astype(str).where(series.notna()).value_counts().head(MAX_BAR_CATEGORIES)
+        fig = px.bar(x=counts.index, y=counts.to_numpy(), title=title, labels={"x": x, "y": "Count"})
+        return fig
+
+    values, is_datetime = numeric
+    edges = np.histogram_bin_edges(values, bins=nbins) if len(values) else np.array([0.0, 1.0])
+    centers = _axis_values((edges[:-1] + edges[1:]) / 2, is_datetime)
+    widths = np.diff(edges) / 1e6 if is_datetime else np.diff(edges)  # Datetime axes are in milliseconds, edges in ns
+    groups = [(x, series)] if color is None else df.groupby(color, observed=True, sort=True)[x]
+    fig = go.Figure()
+    for name, group in groups:
+        group_values = values if color is None else _numeric_values(group)[0]
+        counts, _ = np.histogram(group_values, bins=edges)
+        fig.add_bar(x=centers, y=counts, width=widths, name=str(name), opacity=0.75 if color else None)
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title="Count", bargap=0,
+                      barmode="overlay" if color else None, legend_title_text=color, showlegend=color is not None)
+    return fig
+
+def aggregated_scatter(df, x, y, color=None, max_points=MAX_SCATTER_POINTS, bins=SCATTER_GRID_BINS, title=None, **kwargs):
+    """
+    Scatter of `y` against `x` that stays small for any row count. Up to `max_points` rows it is a
+    plain `px.scatter` (extra `kwargs` such as `trendline` are passed on). Above that, numeric x/y
+    without `color` become a 2D density heatmap of row counts; otherwise a stratified sample of
+    `max_points` rows (per `color` group) is plotted.
+    """
+    data = df[[c for c in dict.fromkeys([x, y, color]) if c is not None]].dropna(subset=[x, y])
+    if len(data) <= max_points:
+        return px.scatter(data, x=x, y=y, color=color, title=title, **kwargs)
+
+    x_numeric, y_numeric = _numeric_values(data[x]), _numeric_values(data[y])
+    if color is None and x_numeric is not None and y_numeric is not None and len(x_numeric[0]) == len(y_numeric[0]):
+        counts, x_edges, y_edges = np.histogram2d(x_numeric[0], y_numeric[0], bins=bins)
+        fig = go.Figure(go.Heatmap(
+            x=_axis_values((x_edges[:-1] + x_edges[1:]) / 2, x_numeric[1]),
+            y=_axis_values((y_edges[:-1] + y_edges[1:]) / 2, y_numeric[1]),
+            z=np.where(counts.T > 0, counts.T, np.nan),  # Empty cells stay transparent
+            colorscale="Viridis", colorbar={"title": "Rows"},
+            hovertemplate=f"{x}: %{{x}}<br>{y}: %{{y}}<br>Rows: %{{z}}<extra></extra>",
+        ))
+        fig.update_layout(title=f"{title or ''} (density of {len(data):,} rows)".strip(), xaxis_title=x, yaxis_title=y)
+        return fig
+
+    fraction = max_points / len(data)
+    if color is None:
+        sample = data.sample(n=max_points, random_state=0)
+    else:
+        sample = data.groupby(color, observed=True, group_keys=False).sample(frac=fraction, random_state=0)
+    fig = px.scatter(sample, x=x, y=y, color=color, title=title, **kwargs)
+    fig.update_layout(title=f"{title or ''} (sample of {len(sample):,} of {len(data):,} rows)".strip())
+    return fig
+
+def box_from_stats(df, y, x=None, title=None):
+    """
+    Box plot of numeric column `y` (per group of `x`) drawn from precomputed quartiles, whiskers
+    at the furthest values within 1.5 IQR, and the mean; individual outlier points are not sent.
+    """
+    groups = [(y, df[y])] if x is None else df.groupby(x, observed=True, sort=False)[y]
+    rows = []
+    for name, group in groups:
+        values = _numeric_values(group)
+        if values is None:
+            raise TypeError(f"box_from_stats needs a numeric column, got {group.dtype} for '{y}'")
+        values = values[0]
+        if not len(values):
+            continue
+        q1, median, q3 = np.percentile(values, [25, 50, 75])
+        iqr = q3 - q1
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        rows.append({"name": str(name), "n": len(values), "q1": q1, "median": median, "q3": q3, "mean": values.mean(),
+                     "lowerfence": inside.min(), "upperfence": inside.max()})
+    stats = pd.DataFrame(rows, columns=["name", "n", "q1", "median", "q3", "mean", "lowerfence", "upperfence"])
+    if x is not None:
+        stats = stats.nlargest(MAX_BOX_GROUPS, "n").sort_values("name")
+    fig = go.Figure(go.Box(
+        x=stats["name"], q1=stats["q1"], median=stats["median"], q3=stats["q3"], mean=stats["mean"],
+        lowerfence=stats["lowerfence"], upperfence=stats["upperfence"], name=y, boxpoints=False,
+    ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y, showlegend=False)
+    return fig
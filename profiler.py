@@ -0,0 +1,783 @@
+"""
+Dataset profiling shared by the agent summary scripts (datanew.py, datanewcleaned.py)
+and the Streamlit UI (main3.py).
+
+The profile is computed once per dataset and stored as JSON under
+`output/profiles/<fingerprint>.json`. Every consumer (printed summary for the LLM,
+Streamlit tabs) reads that artifact instead of recomputing the statistics.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+
+from data_loader import MEMORY_SAVED_ATTR, SOURCE_DTYPES_ATTR, detect_format, load_dataset, read_schema_sidecar, write_schema_sidecar
+from correlation import MAX_ASSOCIATION_CATEGORIES, blockwise_correlation, cramers_v_matrix, top_pairs
+
+try:
+    from pandas.tseries.api import guess_datetime_format  # pandas >= 2.2
+except ImportError:
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+# --- Configuration ---
+PROFILE_DIR_ENV = "AI_ANALYST_PROFILE_DIR"  # Set by aianalyst so the summary scripts it runs share its profile directory
+PROFILE_DIR = os.environ.get(PROFILE_DIR_ENV, "output/profiles")
+PROFILE_VERSION = 7
+FINGERPRINT_CHUNK_SIZE = 1024 * 1024  # 1 MB reads while hashing
+PREVIEW_ROWS = 5
+UNIQUE_VALUES_LIMIT = 20  # Store the distinct values of a categorical column up to this count
+TOP_VALUES_LIMIT = 10
+LOW_VARIANCE_THRESHOLD = 0.1
+TOP_PAIRS_LIMIT = 10  # Strongest correlation/association pairs kept in the prompt; full matrices are saved as CSV artifacts
+MATRIX_KEYS = ("correlation", "association")
+PROMPT_TOKEN_BUDGET = 1500  # Default budget of the compact summary sent to the planning prompts
+CHARS_PER_TOKEN = 4  # Rough token estimate for budgeting (no tokenizer dependency)
+PARALLEL_MIN_COLUMNS = 100  # Auto mode only uses the process pool for tables at least this wide
+SHARED_MEMORY_KINDS = "biufmM"  # numpy dtype kinds that can be shared with workers as raw buffers
+SHARED_MEMORY_ALIGNMENT = 64
+TASKS_PER_WORKER = 4  # Smaller column slices balance cheap numeric and expensive text columns
+
+
+# --- Fingerprinting ---
+
+def new_fingerprint_hasher():
+    """Returns the hash object used for dataset fingerprints (so callers can hash while streaming)."""
+    return hashlib.blake2b(digest_size=16)
+
+def fingerprint_file(path):
+    """Returns a content fingerprint (hex digest) for the file at `path`."""
+    hasher = new_fingerprint_hasher()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(FINGERPRINT_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# --- JSON helpers ---
+
+def _to_builtin(value):
+    """Converts numpy/pandas scalars to JSON-safe Python values (NaN -> None)."""
+    if isinstance(value, dict):
+        return {str(k): _to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(v) for v in value]
+    if isinstance(value, (np.bool_, bool)):
+        return bool(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) or np.isinf(value) else float(value)
+    if value is None or isinstance(value, (int, str)):
+        return value
+    if value is pd.NaT:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+# --- Profile Computation ---
+
+def column_hash(series):
+    """Content hash of a column; equal hashes mean the column is unchanged between two datasets."""
+    try:
+        hashed = pd.util.hash_pandas_object(series, index=False)
+    except TypeError:  # Unhashable cells (dicts, lists)
+        hashed = pd.util.hash_pandas_object(series.astype(str), index=False)
+    hasher = new_fingerprint_hasher()
+    hasher.update(str(series.dtype).encode("utf-8"))
+    hasher.update(hashed.values.tobytes())
+    return hasher.hexdigest()
+
+def _is_numeric(series):
+    """Numeric in the `select_dtypes(include='number')` sense (booleans excluded)."""
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+def _is_text(series):
+    """Object/string columns, and categoricals of strings (see data_loader.optimize_dtypes)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return pd.api.types.is_object_dtype(series.cat.categories) or pd.api.types.is_string_dtype(series.cat.categories)
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+def _guess_datetime_format(values):
+    """
+    strftime format of a datetime-like text column, if one format parses every value and contains
+    a calendar date (time-only strings like '19:29.5' are left alone).
+    """
+    sample = str(values.iloc[0])
+    for dayfirst in (False, True):  # '01/02/2024' is ambiguous; try month-first, then day-first
+        fmt = guess_datetime_format(sample, dayfirst=dayfirst)
+        if not fmt or not any(token in fmt for token in ("%Y", "%y", "%d", "%b", "%B")):
+            continue
+        if pd.to_datetime(values, format=fmt, errors='coerce').notna().all():
+            return fmt
+    return None
+
+def profile_column(series):
+    """Computes the statistics for a single column."""
+    n_rows = len(series)
+    nulls = int(series.isnull().sum())
+    col = {
+        "dtype": str(series.dtype),
+        "non_null": n_rows - nulls,
+        "nulls": nulls,
+        "null_pct": round(nulls / n_rows * 100, 2) if n_rows else 0.0,
+    }
+
+    if _is_numeric(series):
+        values = series.dropna()
+        col["kind"] = "numeric"
+        col["n_unique"] = int(values.nunique())
+        q1, q2, q3 = values.quantile([0.25, 0.5, 0.75]).tolist() if len(values) else [np.nan] * 3
+        iqr = q3 - q1
+        variance = values.var()
+        col["stats"] = {
+            "mean": values.mean(), "std": values.std(), "min": values.min(),
+            "25%": q1, "50%": q2, "75%": q3, "max": values.max(),
+        }
+        col["outliers"] = int(((values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)).sum())
+        col["low_variance"] = bool(variance < LOW_VARIANCE_THRESHOLD) if pd.notna(variance) else False
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        values = series.dropna()
+        col["kind"] = "datetime"
+        col["n_unique"] = int(values.nunique())
+        col["stats"] = {"min": values.min(), "max": values.max()}
+    else:
+        # Dicts are unhashable, so stringify them before counting (same fix as the summary scripts)
+        values = series.dropna().apply(lambda x: str(x) if isinstance(x, dict) else x)
+        counts = values.value_counts()
+        counts = counts[counts > 0]  # Categorical columns also list categories that no longer occur
+        col["kind"] = "categorical"
+        col["n_unique"] = int(len(counts))
+        col["top"] = counts.index[0] if len(counts) else None
+        col["freq"] = int(counts.iloc[0]) if len(counts) else 0
+        col["top_values"] = [[v, int(c)] for v, c in counts.head(TOP_VALUES_LIMIT).items()]
+        col["unique_values"] = values.unique()[:UNIQUE_VALUES_LIMIT].tolist()
+        col["potential_datetime"] = False
+        col["datetime_format"] = None
+        if _is_text(series) and len(values):
+            try:
+                # A single format that parses every value (also catches day-first dates), else generic parsing;
+                # pandas warns when it falls back to per-value parsing, which is expected for non-date text
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", category=UserWarning)
+                    col["datetime_format"] = _guess_datetime_format(values)
+                    col["potential_datetime"] = bool(col["datetime_format"]) or bool(pd.to_datetime(series, errors='coerce').notna().all())
+            except Exception:
+                pass
+    return _to_builtin(col)
+
+def _profile_or_reuse(series, baseline_hash):
+    """Profiles a column, or returns None if its content hash matches the baseline (stats can be reused)."""
+    digest = column_hash(series)
+    if baseline_hash is not None and baseline_hash == digest:
+        return None
+    return {**profile_column(series), "hash": digest}
+
+
+# --- Parallel Column Profiling (process pool over column slices) ---
+
+def _profile_column_slice(shm_name, shared_specs, other_columns, baseline_hashes):
+    """
+    Worker: profiles one slice of columns.
+    `shared_specs` are (name, dtype, offset, length) views into the shared memory segment,
+    `other_columns` are pickled Series (text/extension dtypes that have no flat buffer).
+    """
+    results = {}
+    for series in other_columns:
+        results[series.name] = _profile_or_reuse(series, baseline_hashes.get(series.name))
+    if not shared_specs:
+        return results
+
+    # Pool workers share the parent's resource tracker, so attaching does not leak a registration
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        for name, dtype, offset, length in shared_specs:
+            values = np.ndarray(length, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            results[name] = _profile_or_reuse(pd.Series(values, name=name, copy=False), baseline_hashes.get(name))
+        del values
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            pass  # A lingering view still references the buffer; it is released when the worker exits
+    return results
+
+def _profile_columns_parallel(df, baseline_hashes, n_jobs):
+    """Splits the columns across a process pool; numeric/datetime columns are shared via shared memory."""
+    names = [str(c) for c in df.columns]
+    layout, other_columns, offset = {}, {}, 0
+    for col, name in zip(df.columns, names):
+        dtype = df[col].dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in SHARED_MEMORY_KINDS:
+            layout[name] = (col, dtype.str, offset, len(df))
+            offset += -(-dtype.itemsize * len(df) // SHARED_MEMORY_ALIGNMENT) * SHARED_MEMORY_ALIGNMENT
+        else:
+            other_columns[name] = df[col].rename(name)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1)) if layout else None
+    try:
+        for name, (col, dtype, col_offset, length) in layout.items():
+            np.ndarray(length, dtype=np.dtype(dtype), buffer=shm.buf, offset=col_offset)[:] = df[col].to_numpy()
+
+        slice_size = max(1, -(-len(names) // (n_jobs * TASKS_PER_WORKER)))
+        tasks = []
+        for start in range(0, len(names), slice_size):
+            chunk = names[start:start + slice_size]
+            tasks.append((
+                shm.name if shm else None,
+                [(name, *layout[name][1:]) for name in chunk if name in layout],
+                [other_columns[name] for name in chunk if name in other_columns],
+                {name: baseline_hashes[name] for name in chunk if name in baseline_hashes},
+            ))
+
+        results = {}
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            for partial in pool.map(_profile_column_slice, *zip(*tasks)):
+                results.update(partial)
+        return results
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+def build_profile(df, fingerprint=None, source=None, baseline=None, n_jobs=1):
+    """
+    Builds the full profile dictionary for a DataFrame.
+    If a `baseline` profile is given, columns whose content hash is unchanged reuse its statistics.
+    `n_jobs` > 1 profiles the columns in a process pool; None picks it automatically from the table width.
+    Columns that data_loader.optimize_dtypes downcast report their source dtype as "dtype" and the
+    in-memory one as "optimized_dtype".
+    """
+    baseline_columns = baseline["columns"] if baseline else {}
+    baseline_hashes = {name: col.get("hash") for name, col in baseline_columns.items()}
+    if n_jobs is None:
+        n_jobs = (os.cpu_count() or 1) if df.shape[1] >= PARALLEL_MIN_COLUMNS else 1
+
+    if n_jobs > 1:
+        profiled = _profile_columns_parallel(df, baseline_hashes, n_jobs)
+    else:
+        profiled = {str(col): _profile_or_reuse(df[col], baseline_hashes.get(str(col))) for col in df.columns}
+
+    source_dtypes = df.attrs.get(SOURCE_DTYPES_ATTR, {})
+    for name, col in profiled.items():
+        if col is not None and name in source_dtypes:
+            col["optimized_dtype"], col["dtype"] = col["dtype"], source_dtypes[name]
+
+    # Merge in column order; None means "unchanged since the baseline"
+    columns = {}
+    reused = []
+    for col in df.columns:
+        name = str(col)
+        if profiled[name] is None:
+            columns[name] = baseline_columns[name]
+            reused.append(name)
+        else:
+            columns[name] = profiled[name]
+
+    numeric = df[[c for c in df.columns if columns[str(c)]["kind"] == "numeric"]]
+    categorical = df[[c for c in df.columns if columns[str(c)]["kind"] == "categorical"]]
+    corr = blockwise_correlation(numeric) if numeric.shape[1] > 1 else pd.DataFrame()
+    assoc = cramers_v_matrix(categorical) if categorical.shape[1] > 1 else pd.DataFrame()
+    preview = json.loads(df.head(PREVIEW_ROWS).to_json(orient="split", date_format="iso", default_handler=str))
+
+    profile = {
+        "version": PROFILE_VERSION,
+        "fingerprint": fingerprint,
+        "source": source,
+        "n_rows": int(len(df)),
+        "n_cols": int(df.shape[1]),
+        "memory_bytes": int(df.memory_usage(deep=True).sum()),
+        "memory_saved": df.attrs.get(MEMORY_SAVED_ATTR),  # Before/after optimize_dtypes, when it was applied
+        "duplicates": int(df.duplicated().sum()),
+        "columns": columns,
+        "reused_columns": reused,
+        # Full matrices stay in memory until save_profile() writes them out as CSV artifacts
+        "correlation": {
+            "method": "pearson",
+            "columns": [str(c) for c in corr.columns],
+            "top_pairs": top_pairs(corr, TOP_PAIRS_LIMIT),
+            "matrix": corr.round(4),
+        },
+        "association": {
+            "method": "cramers_v",
+            "columns": [str(c) for c in assoc.columns],
+            "top_pairs": top_pairs(assoc, TOP_PAIRS_LIMIT),
+            "matrix": assoc.round(4),
+        },
+        "preview": {"columns": [str(c) for c in preview["columns"]], "data": preview["data"]},
+    }
+    return profile
+
+
+# --- Artifact Storage ---
+
+def profile_path(fingerprint, profile_dir=PROFILE_DIR):
+    """Path of the profile artifact for a fingerprint."""
+    return os.path.join(profile_dir, f"{fingerprint}.json").replace("\\", "/")
+
+def save_profile(profile, profile_dir=PROFILE_DIR):
+    """
+    Writes the profile artifact and returns its path.
+    Full correlation/association matrices are written next to it as CSV and replaced by their paths.
+    """
+    os.makedirs(profile_dir, exist_ok=True)
+    path = profile_path(profile["fingerprint"], profile_dir)
+    for key in MATRIX_KEYS:
+        matrix = profile[key].pop("matrix", None)
+        if isinstance(matrix, pd.DataFrame):
+            matrix_path = os.path.join(profile_dir, f"{profile['fingerprint']}.{key}.csv").replace("\\", "/")
+            matrix.to_csv(matrix_path)
+            profile[key]["matrix_path"] = matrix_path
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, default=str)
+    os.replace(tmp_path, path)  # Atomic swap so readers never see a half-written profile
+    return path
+
+def load_profile(fingerprint, profile_dir=PROFILE_DIR):
+    """Loads a cached profile, or returns None if missing, unreadable or from an older version."""
+    path = profile_path(fingerprint, profile_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if profile.get("version") != PROFILE_VERSION:
+        return None
+    return profile
+
+def schema_from_profile(profile):
+    """Schema sidecar content (dtypes, categorical candidates, datetime formats) derived from a profile."""
+    columns = {}
+    for name, col in profile["columns"].items():
+        columns[name] = {
+            "dtype": col["dtype"],
+            "categorical": bool(col["kind"] == "categorical" and col["n_unique"] <= MAX_ASSOCIATION_CATEGORIES
+                                and col["n_unique"] < 0.5 * col["non_null"]),
+            "datetime_format": col.get("datetime_format"),
+        }
+    return {"fingerprint": profile["fingerprint"], "columns": columns}
+
+def _ensure_schema_sidecar(data_path, profile):
+    """Writes the CSV schema sidecar used by data_loader for typed pyarrow reads (CSV sources only)."""
+    if detect_format(data_path)[0] == "csv" and read_schema_sidecar(data_path) is None:
+        write_schema_sidecar(data_path, schema_from_profile(profile))
+
+def load_or_build_profile(data_path, profile_dir=PROFILE_DIR, fingerprint=None, baseline=None, n_jobs=1):
+    """
+    Returns the profile for `data_path`, computing and caching it only if it is not cached yet.
+    `baseline` (another profile) lets unchanged columns reuse their cached statistics.
+    """
+    if fingerprint is None:
+        fingerprint = fingerprint_file(data_path)
+    profile = load_profile(fingerprint, profile_dir)
+    if profile is not None:
+        _ensure_schema_sidecar(data_path, profile)
+        return profile
+    df = load_dataset(data_path, optimize=True)
+    profile = build_profile(df, fingerprint=fingerprint, source=str(data_path).replace("\\", "/"), baseline=baseline, n_jobs=n_jobs)
+    save_profile(profile, profile_dir)
+    _ensure_schema_sidecar(data_path, profile)
+    return profile
+
+
+# --- Views (shared by the printed report and the Streamlit UI) ---
+
+def _columns_of_kind(profile, kind):
+    return [name for name, col in profile["columns"].items() if col["kind"] == kind]
+
+def preview_frame(profile):
+    """First rows of the dataset as a DataFrame."""
+    return pd.DataFrame(profile["preview"]["data"], columns=profile["preview"]["columns"])
+
+def column_info_frame(profile):
+    """Data type and null counts per column."""
+    cols = profile["columns"]
+    return pd.DataFrame({
+        "Data Type": {name: col["dtype"] for name, col in cols.items()},
+        "Non-Null Count": {name: col["non_null"] for name, col in cols.items()},
+        "Null Count": {name: col["nulls"] for name, col in cols.items()},
+        "Null Percentage (%)": {name: col["null_pct"] for name, col in cols.items()},
+    })
+
+def numeric_summary_frame(profile):
+    """Equivalent of `df.describe()` for the numeric columns."""
+    cols = profile["columns"]
+    data = {name: {"count": cols[name]["non_null"], **cols[name]["stats"]} for name in _columns_of_kind(profile, "numeric")}
+    return pd.DataFrame(data)
+
+def categorical_summary_frame(profile):
+    """Equivalent of `df.describe()` for the object/categorical columns."""
+    cols = profile["columns"]
+    data = {
+        name: {"count": cols[name]["non_null"], "unique": cols[name]["n_unique"], "top": cols[name]["top"], "freq": cols[name]["freq"]}
+        for name in _columns_of_kind(profile, "categorical")
+    }
+    return pd.DataFrame(data)
+
+def outliers_series(profile):
+    """IQR outlier count per numeric column."""
+    cols = profile["columns"]
+    return pd.Series({name: cols[name]["outliers"] for name in _columns_of_kind(profile, "numeric")}, dtype="int64")
+
+def correlation_frame(profile, key="correlation"):
+    """
+    Full correlation ("correlation") or Cramér's V ("association") matrix, read from its artifact.
+    Empty if there were fewer than two eligible columns.
+    """
+    entry = profile[key]
+    if isinstance(entry.get("matrix"), pd.DataFrame):
+        return entry["matrix"]
+    try:
+        return pd.read_csv(entry["matrix_path"], index_col=0)
+    except (KeyError, FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame()
+
+def top_pairs_frame(profile, key="correlation"):
+    """Strongest pairs of a matrix as a DataFrame."""
+    value_name = "Correlation" if key == "correlation" else "Cramér's V"
+    return pd.DataFrame(profile[key]["top_pairs"], columns=["Column A", "Column B", value_name])
+
+
+# --- Before/After Diff ---
+
+def diff_profiles(before, after):
+    """Compact delta between two profiles (e.g. raw vs cleaned data)."""
+    before_cols, after_cols = before["columns"], after["columns"]
+    common = [name for name in after_cols if name in before_cols]
+    changed = [name for name in common if before_cols[name].get("hash") != after_cols[name].get("hash")]
+    diff = {
+        "rows_before": before["n_rows"],
+        "rows_after": after["n_rows"],
+        "rows_dropped": before["n_rows"] - after["n_rows"],
+        "duplicates_before": before["duplicates"],
+        "duplicates_after": after["duplicates"],
+        "columns_added": [name for name in after_cols if name not in before_cols],
+        "columns_removed": [name for name in before_cols if name not in after_cols],
+        "columns_changed": changed,
+        "columns_unchanged": [name for name in common if name not in changed],
+        "dtype_changes": [], "nulls_filled": [], "outliers_capped": [], "cardinality_changes": [],
+    }
+    for name in changed:
+        old, new = before_cols[name], after_cols[name]
+        if old["dtype"] != new["dtype"]:
+            diff["dtype_changes"].append([name, old["dtype"], new["dtype"]])
+        if old["nulls"] != new["nulls"]:
+            diff["nulls_filled"].append([name, old["nulls"], new["nulls"]])
+        if "outliers" in old and "outliers" in new and old["outliers"] != new["outliers"]:
+            diff["outliers_capped"].append([name, old["outliers"], new["outliers"]])
+        if old["n_unique"] != new["n_unique"]:
+            diff["cardinality_changes"].append([name, old["n_unique"], new["n_unique"]])
+    return diff
+
+def print_profile_diff(diff):
+    """Prints the before/after delta report."""
+    _section("Changes Made by Cleaning")
+    print(f"Rows: {diff['rows_before']} -> {diff['rows_after']} ({diff['rows_dropped']} dropped)")
+    print(f"Duplicate rows: {diff['duplicates_before']} -> {diff['duplicates_after']}")
+    if diff["columns_added"]:
+        print(f"Columns added: {diff['columns_added']}")
+    if diff["columns_removed"]:
+        print(f"Columns removed: {diff['columns_removed']}")
+    print(f"Columns unchanged: {len(diff['columns_unchanged'])}, changed: {len(diff['columns_changed'])}")
+
+    for key, title, headers in [
+        ("dtype_changes", "Data type changes", ["Column", "Before", "After"]),
+        ("nulls_filled", "Missing values", ["Column", "Nulls Before", "Nulls After"]),
+        ("outliers_capped", "IQR outliers", ["Column", "Outliers Before", "Outliers After"]),
+        ("cardinality_changes", "Distinct values", ["Column", "Unique Before", "Unique After"]),
+    ]:
+        if diff[key]:
+            print(f"\n{title}:")
+            print(tabulate(diff[key], headers=headers, tablefmt='psql'))
+
+
+# --- Printed Report (stdout of the summary scripts, used as LLM context) ---
+
+def _section(title):
+    print("\n" + "="*50 + f"\n {title}\n" + "="*50)
+
+REPORT_SECTIONS = ["preview", "dtypes", "missing", "statistics", "duplicates", "outliers", "unique_values", "correlation", "datetime", "low_variance"]
+# In diff mode the delta report replaces the preview and the per-column counts it already covers
+DIFF_REPORT_SECTIONS = ["dtypes", "statistics", "unique_values", "correlation", "datetime", "low_variance"]
+
+def print_profile_report(profile, sections=REPORT_SECTIONS):
+    """Prints the profile in the same section layout the summary scripts always used."""
+    cols = profile["columns"]
+
+    # Section 1: Preview of Data
+    if "preview" in sections:
+        _section("First Few Rows of Data")
+        print(preview_frame(profile).to_string())
+
+    # Section 2: Column Names and Data Types
+    if "dtypes" in sections:
+        _section("Column Names and Data Types")
+        print(pd.Series({name: col["dtype"] for name, col in cols.items()}).to_string())
+
+    # Section 3: Missing Values Per Column
+    if "missing" in sections:
+        _section("Missing Values Per Column")
+        print(pd.Series({name: col["nulls"] for name, col in cols.items()}).to_string())
+
+    # Section 4: Statistical Summary
+    if "statistics" in sections:
+        _section("Statistical Summary")
+        summary = pd.concat([categorical_summary_frame(profile), numeric_summary_frame(profile)], axis=1)
+        summary = summary.reindex(
+            index=["count", "unique", "top", "freq", "mean", "std", "min", "25%", "50%", "75%", "max"],
+            columns=[name for name in cols if name in summary.columns],
+        )
+        print(summary.dropna(how="all").to_string())
+
+    # Section 5: Duplicate Rows
+    if "duplicates" in sections:
+        _section("Duplicate Rows Count")
+        print(f"Total Duplicate Rows: {profile['duplicates']}")
+
+    # Section 6: Outliers Using IQR
+    if "outliers" in sections:
+        _section("Outliers Count Per Column")
+        print(outliers_series(profile).to_string())
+
+    # Section 7: Unique Values for Categorical Columns
+    if "unique_values" in sections:
+        _section("Unique Values in Categorical Columns")
+        for name in _columns_of_kind(profile, "categorical"):
+            col = cols[name]
+            if col["n_unique"] < 10:  # Print only if count is less than 10
+                print(f"\n{name}:", json.dumps(col["unique_values"], indent=2, default=str))
+            else:
+                print(f"\n{name}: [About {col['n_unique']} unique values, to large to be displayed]")
+
+    # Section 9: Strongest Correlations / Associations (full matrices are kept as artifacts)
+    if "correlation" in sections:
+        _section(f"Strongest Correlations (top {TOP_PAIRS_LIMIT} numeric pairs)")
+        print(tabulate(top_pairs_frame(profile, "correlation"), headers='keys', tablefmt='grid', showindex=False))
+        _section(f"Strongest Categorical Associations (Cramér's V, top {TOP_PAIRS_LIMIT} pairs)")
+        print(tabulate(top_pairs_frame(profile, "association"), headers='keys', tablefmt='grid', showindex=False))
+
+    # Section 10: Detecting Potential Datetime Columns
+    if "datetime" in sections:
+        _section("Potential Datetime Columns")
+        for name, col in cols.items():
+            if col["kind"] == "datetime" or col.get("potential_datetime"):
+                print(f" {name}: Potential datetime column")
+
+    # Section 11: Detecting Low Variance Columns
+    if "low_variance" in sections:
+        _section("Low Variance Columns")
+        print([name for name, col in cols.items() if col.get("low_variance")])
+
+
+# --- Prompt Helpers ---
+
+def estimate_tokens(text):
+    """Rough token count of a prompt fragment."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _format_number(value):
+    if value is None:
+        return "NA"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.4g}"
+
+def _column_line(name, col, top_values):
+    """One fixed-schema line per column: name | dtype | null% | unique | range or top values."""
+    if col["kind"] == "numeric":
+        stats = col["stats"]
+        detail = (f"range {_format_number(stats['min'])}..{_format_number(stats['max'])}, "
+                  f"mean {_format_number(stats['mean'])}, median {_format_number(stats['50%'])}")
+        if col.get("outliers"):
+            detail += f", {col['outliers']} IQR outliers"
+    elif col["kind"] == "datetime":
+        detail = f"range {col['stats']['min']}..{col['stats']['max']}"
+    elif col["n_unique"] > TOP_VALUES_LIMIT and col["n_unique"] >= 0.95 * col["non_null"]:
+        sample = col["top_values"][0][0] if col["top_values"] else ""
+        detail = f"identifier-like, e.g. {str(sample)[:40]}"
+        if col.get("potential_datetime"):
+            detail += " [parseable as datetime]"
+    else:
+        values = [f"{str(v)[:40]} ({c})" for v, c in col["top_values"][:top_values]]
+        more = ", ..." if col["n_unique"] > len(values) else ""
+        detail = ("top: " if col["n_unique"] > len(values) else "values: ") + ", ".join(values) + more
+        if col.get("potential_datetime"):
+            detail += " [parseable as datetime]"
+    return f"{name} | {col['dtype']} | {col['null_pct']}% null | {col['n_unique']} unique | {detail}"
+
+def _diff_lines(diff):
+    lines = [f"Cleaning changes: rows {diff['rows_before']} -> {diff['rows_after']}, "
+             f"duplicates {diff['duplicates_before']} -> {diff['duplicates_after']}"]
+    for key, label in [("dtype_changes", "dtype"), ("nulls_filled", "nulls"), ("outliers_capped", "outliers")]:
+        if diff[key]:
+            lines.append(f"{label} changes: " + "; ".join(f"{name} {old}->{new}" for name, old, new in diff[key]))
+    if diff["columns_added"] or diff["columns_removed"]:
+        lines.append(f"columns added: {diff['columns_added']}, removed: {diff['columns_removed']}")
+    return lines
+
+# --- Column Relevance Selection (bounded prompts on very wide schemas) ---
+
+RELEVANT_NAME_TOKENS = {
+    "date", "time", "timestamp", "month", "year", "day", "amount", "price", "value", "revenue", "sales",
+    "cost", "profit", "qty", "quantity", "rating", "score", "category", "type", "status", "region",
+    "country", "city", "state", "platform", "segment", "channel", "customer", "product", "delivery",
+}
+IRRELEVANT_NAME_TOKENS = {"id", "uuid", "guid", "hash", "url", "uri", "token", "key", "index", "unnamed"}
+
+def name_tokens(name):
+    """Lower-case word tokens of a column name ('OrderDate (UTC)' -> {'order', 'date', 'utc'})."""
+    spaced = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(name))
+    return set(re.findall(r"[a-z]+", spaced.lower()))
+
+def score_columns(profile):
+    """
+    Relevance score per column for prompt selection, combining null rate, variance,
+    cardinality, correlation/association strength and name heuristics (higher is better).
+    """
+    strength = {}
+    for key in MATRIX_KEYS:
+        matrix = correlation_frame(profile, key)
+        if matrix.shape[0] > 1:
+            values = matrix.abs().to_numpy(dtype="float64", copy=True)
+            np.fill_diagonal(values, np.nan)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", category=RuntimeWarning)  # All-NaN rows
+                strength.update(zip(matrix.columns, np.nanmax(values, axis=1)))
+
+    scores = {}
+    for name, col in profile["columns"].items():
+        n_unique, non_null = col["n_unique"], max(col["non_null"], 1)
+        if n_unique <= 1:
+            scores[name] = 0.0  # Constant or empty column: nothing to analyse
+            continue
+        score = 1.0 - col["null_pct"] / 100
+        if col["kind"] == "numeric":
+            score += 0.2 if col.get("low_variance") else 1.0
+        elif col["kind"] == "datetime" or col.get("potential_datetime"):
+            score += 1.2
+        elif n_unique <= MAX_ASSOCIATION_CATEGORIES:
+            score += 1.0  # Good grouping dimension
+        elif n_unique >= 0.95 * non_null:
+            score += 0.1  # Identifier-like
+        else:
+            score += 0.5
+        corr = strength.get(name)
+        if corr is not None and not np.isnan(corr):
+            score += float(corr)
+        tokens = name_tokens(name)
+        if tokens & RELEVANT_NAME_TOKENS:
+            score += 0.5
+        if tokens & IRRELEVANT_NAME_TOKENS:
+            score -= 0.5
+        scores[name] = round(score, 4)
+    return scores
+
+def select_columns(profile, max_columns):
+    """Names of the `max_columns` most relevant columns, in their original order."""
+    names = list(profile["columns"])
+    if max_columns is None or len(names) <= max_columns:
+        return names
+    scores = score_columns(profile)
+    keep = set(sorted(names, key=lambda name: -scores[name])[:max_columns])
+    return [name for name in names if name in keep]
+
+def _rollup_line(profile, names):
+    """One-line summary of the columns left out of the prompt."""
+    cols = [profile["columns"][name] for name in names]
+    kinds = {}
+    for col in cols:
+        kinds[col["kind"]] = kinds.get(col["kind"], 0) + 1
+    mean_null = sum(col["null_pct"] for col in cols) / len(cols)
+    sample = ", ".join(names[:8]) + (", ..." if len(names) > 8 else "")
+    breakdown = ", ".join(f"{count} {kind}" for kind, count in sorted(kinds.items()))
+    return f"+ {len(names)} less relevant columns not listed ({breakdown}; mean null {mean_null:.1f}%): {sample}"
+
+
+# --- Compact Serializer (planning prompts) ---
+
+def serialize_profile(profile, token_budget=PROMPT_TOKEN_BUDGET, diff=None, max_columns=None):
+    """
+    Renders the profile as a compact, fixed-schema text block for LLM prompts, within `token_budget`.
+    With `max_columns`, only the most relevant columns (see score_columns) get a line and the rest
+    are rolled up into one line. Detail is reduced first (fewer top values, fewer pairs); if it still
+    does not fit, the least relevant remaining columns move into the roll-up.
+    """
+    header = [f"Dataset: {profile['n_rows']} rows x {profile['n_cols']} columns, {profile['duplicates']} duplicate rows"]
+    if diff:
+        header += _diff_lines(diff)
+    header.append("Columns (name | dtype | null% | unique | range or top values):")
+
+    all_names = list(profile["columns"])
+    selected = select_columns(profile, max_columns)
+    rollup = [_rollup_line(profile, [n for n in all_names if n not in set(selected)])] if len(selected) < len(all_names) else []
+
+    for top_values, n_pairs in [(5, 5), (3, 3), (1, 0)]:
+        footer = []
+        for key, label in [("correlation", "Strongest correlations"), ("association", "Strongest associations (Cramér's V)")]:
+            pairs = profile[key]["top_pairs"][:n_pairs]
+            if pairs:
+                footer.append(f"{label}: " + "; ".join(f"{a} ~ {b}: {v}" for a, b, v in pairs))
+        lines = {name: _column_line(name, profile["columns"][name], top_values) for name in selected}
+        text = "\n".join(header + list(lines.values()) + rollup + footer)
+        if estimate_tokens(text) <= token_budget:
+            return text
+
+    # Still over budget with minimal detail: keep the most relevant column lines that fit
+    scores = score_columns(profile)
+    budget_chars = token_budget * CHARS_PER_TOKEN - len("\n".join(header + footer)) - 300  # Room for the roll-up
+    keep = set()
+    for name in sorted(selected, key=lambda name: -scores[name]):
+        budget_chars -= len(lines[name]) + 1
+        if budget_chars < 0:
+            break
+        keep.add(name)
+    kept = [name for name in selected if name in keep]
+    rollup = [_rollup_line(profile, [n for n in all_names if n not in keep])] if len(kept) < len(all_names) else []
+    return "\n".join(header + [lines[name] for name in kept] + rollup + footer)
+
+
+# --- Entry Point ---
+
+def run_summary(data_path, baseline_path=None, profile_dir=PROFILE_DIR, n_jobs=None):
+    """
+    Profiles `data_path` and prints the summary report.
+    With `baseline_path` (diff mode) the baseline profile is reused for unchanged columns and
+    a compact before/after delta report is printed instead of the full summary.
+    `n_jobs` controls the column process pool (None = automatic for wide tables, 1 = serial).
+    Call it under `if __name__ == "__main__":` so the pool also works with the spawn start method.
+    """
+    if baseline_path is None:
+        profile = load_or_build_profile(data_path, profile_dir, n_jobs=n_jobs)
+        print_profile_report(profile)
+        return profile
+
+    baseline = load_or_build_profile(baseline_path, profile_dir, n_jobs=n_jobs)
+    profile = load_or_build_profile(data_path, profile_dir, baseline=baseline, n_jobs=n_jobs)
+    print(f"Profiled {data_path} against baseline {baseline_path} "
+          f"(reused statistics for {len(profile.get('reused_columns', []))}/{profile['n_cols']} columns)")
+    print_profile_diff(diff_profiles(baseline, profile))
+    print_profile_report(profile, sections=DIFF_REPORT_SECTIONS)
+    return profile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile a dataset (CSV or Parquet/Feather) and print its summary.")
+    parser.add_argument("data_path", help="Dataset file to profile")
+    parser.add_argument("--baseline", default=None, help="Profile of this file is the 'before' side of a diff report")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR, help="Directory for cached profile artifacts")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for column profiling (default: automatic)")
+    args = parser.parse_args()
+    run_summary(args.data_path, baseline_path=args.baseline, profile_dir=args.profile_dir, n_jobs=args.jobs)
@@ -0,0 +1,394 @@
+"""
+Projection and predicate pushdown for the generated analysis/visualisation/trends scripts.
+
+Before a script runs, its AST is inspected to find which columns the loaded DataFrame is
+actually used with, and which simple row filters are applied right after loading. The
+`load_dataset(...)` call is then rewritten to `load_dataset(..., columns=[...], filters=[...])`,
+so only those columns (and, for Parquet, only the matching row groups) are read.
+
+The analysis is deliberately conservative: any use of the DataFrame that could depend on
+columns not named literally in the script (`df.columns`, `df.describe()`, `print(df.head())`,
+passing `df` to an arbitrary function, `df[some_variable]`, ...) disables the pushdown and the
+script loads the full table as before. Cleaning scripts (which save the dataset) are never rewritten.
+The pushed filters are kept in the script itself, so re-applying them is a no-op.
+"""
+import ast
+
+from data_loader import dataset_columns
+
+# --- Configuration ---
+LOADER_FUNCTION = "load_dataset"
+SAVER_FUNCTION = "save_dataset"  # Scripts that save the dataset need every column
+PLOT_MODULES = ("px",)  # plotly.express: only the columns named in the call are used
+ROW_ONLY_ATTRIBUTES = ("shape", "empty", "index")  # Don't depend on which columns are loaded
+FRAME_METHODS = ("copy", "reset_index")  # Return the same columns
+SUBSET_METHODS = {"dropna": "subset", "drop_duplicates": "subset", "sort_values": "by", "nlargest": "columns", "nsmallest": "columns"}
+GROUPBY_RESULT_METHODS = ("size", "ngroups", "groups")
+MASK_METHODS = ("isin", "between", "notna", "notnull", "isna", "isnull", "contains", "startswith", "endswith", "duplicated")
+# Plotly Express falls back to "wide form" (every column) unless the columns are named, so require them:
+ONE_AXIS_PLOTS = ("histogram", "box", "violin", "strip", "ecdf")  # x or y
+PART_OF_WHOLE_PLOTS = ("pie", "treemap", "sunburst", "icicle", "funnel_area")  # names, values or path
+DIMENSION_PLOTS = ("scatter_matrix", "parallel_coordinates", "parallel_categories")  # dimensions
+# Any other px function needs both x and y
+PLOT_HELPERS = {"binned_histogram": "histogram", "aggregated_scatter": "scatter", "box_from_stats": "box"}  # plot_utils, px-like signatures
+COMPARE_OPERATORS = {ast.Eq: "==", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">="}
+REVERSED_OPERATORS = {"==": "==", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+class _Unsupported(Exception):
+    """A use of the DataFrame whose column needs can't be derived statically."""
+
+
+# --- Literal Helpers ---
+
+def _literal_strings(node):
+    """A string constant or a list/tuple of them as a list of strings, else None."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    if isinstance(node, (ast.List, ast.Tuple)) and all(isinstance(e, ast.Constant) and isinstance(e.value, str) for e in node.elts):
+        return [e.value for e in node.elts]
+    return None
+
+def _literal_value(node):
+    """A str/int/float/bool constant (negative numbers included), else raises ValueError."""
+    value = ast.literal_eval(node)
+    if value is None or not isinstance(value, (str, int, float, bool)):
+        raise ValueError("unsupported literal")
+    return value
+
+def _all_strings(node):
+    """Every string constant inside an expression (used for plot calls: x='Age', hover_data=[...])."""
+    return [n.value for n in ast.walk(node) if isinstance(n, ast.Constant) and isinstance(n.value, str)]
+
+def _is_mask(node):
+    """Boolean row masks: comparisons, `&`/`|`/`~` combinations and methods like `.isin(...)`/`.str.contains(...)`."""
+    if isinstance(node, ast.Call):
+        return isinstance(node.func, ast.Attribute) and node.func.attr in MASK_METHODS
+    return isinstance(node, (ast.Compare, ast.BoolOp, ast.UnaryOp)) or (
+        isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr)))
+
+def _names_plot_columns(plot, keywords):
+    """True if a px call names the columns it plots (see ONE_AXIS_PLOTS and friends)."""
+    if plot in ONE_AXIS_PLOTS:
+        return bool(keywords & {"x", "y"})
+    if plot in PART_OF_WHOLE_PLOTS:
+        return bool(keywords & {"names", "values", "path"})
+    if plot in DIMENSION_PLOTS:
+        return "dimensions" in keywords
+    return {"x", "y"} <= keywords
+
+
+# --- Column Usage ---
+
+class _UsageAnalyzer:
+    """Collects the literal columns used with the tracked DataFrame names; raises _Unsupported otherwise."""
+
+    def __init__(self, tree, frame_names, known_columns):
+        self.parents = {}
+        for node in ast.walk(tree):
+            for child in ast.iter_child_nodes(node):
+                self.parents[child] = node
+        self.tree = tree
+        self.frame_names = set(frame_names)
+        self.known_columns = set(known_columns)
+        self.columns = set()
+
+    def run(self):
+        checked = set()
+        while self.frame_names - checked:  # Aliases (df2 = df[mask]) are tracked as they are found
+            name = (self.frame_names - checked).pop()
+            checked.add(name)
+            for node in ast.walk(self.tree):
+                if isinstance(node, ast.Name) and node.id == name and isinstance(node.ctx, ast.Load):
+                    self._frame_use(node)
+        return self.columns
+
+    def _frame_use(self, node):
+        """`node` evaluates to a DataFrame with the loaded columns; check how its parent uses it."""
+        parent = self.parents.get(node)
+        if isinstance(parent, ast.Subscript) and parent.value is node:
+            names = _literal_strings(parent.slice)
+            if names is not None:
+                self.columns.update(names)  # df['a'] / df[['a', 'b']] (also as assignment target)
+            elif _is_mask(parent.slice):
+                self._frame_use(parent)  # df[mask] keeps every column
+            else:
+                raise _Unsupported("non-literal column selection")
+        elif isinstance(parent, ast.Attribute) and parent.value is node:
+            self._attribute_use(parent)
+        elif isinstance(parent, ast.Call) and node in parent.args:
+            self._call_use(parent)
+        elif isinstance(parent, ast.keyword) and parent.arg == "data_frame":
+            self._call_use(self.parents[parent])
+        elif isinstance(parent, ast.Assign) and parent.value is node:
+            for target in parent.targets:
+                if not isinstance(target, ast.Name):
+                    raise _Unsupported("frame assigned to a non-name target")
+                self.frame_names.add(target.id)
+        else:
+            raise _Unsupported(f"frame used in {type(parent).__name__}")
+
+    def _attribute_use(self, attr):
+        parent = self.parents.get(attr)
+        is_call = isinstance(parent, ast.Call) and parent.func is attr
+        if attr.attr in ROW_ONLY_ATTRIBUTES:
+            return
+        if attr.attr in self.known_columns and not is_call:
+            self.columns.add(attr.attr)  # df.Age
+        elif attr.attr == "loc" and isinstance(parent, ast.Subscript):
+            self._loc_use(parent)
+        elif attr.attr in FRAME_METHODS and is_call:
+            self._frame_use(parent)
+        elif attr.attr in SUBSET_METHODS and is_call:
+            self._subset_call(parent, SUBSET_METHODS[attr.attr])
+            self._frame_use(parent)
+        elif attr.attr == "groupby" and is_call:
+            self._groupby_use(parent)
+        else:
+            raise _Unsupported(f"frame attribute '{attr.attr}'")
+
+    def _loc_use(self, subscript):
+        """df.loc[mask] keeps every column; df.loc[mask, 'a'] / df.loc[mask, ['a', 'b']] selects columns."""
+        index = subscript.slice
+        if isinstance(index, ast.Tuple) and len(index.elts) == 2:
+            names = _literal_strings(index.elts[1])
+            if names is None:
+                raise _Unsupported("non-literal .loc column selection")
+            self.columns.update(names)
+        elif _is_mask(index) or isinstance(index, ast.Slice):
+            self._frame_use(subscript)
+        else:
+            raise _Unsupported("unsupported .loc selection")
+
+    def _subset_call(self, call, keyword):
+        """Methods that only look at the columns named in `subset=`/`by=` (or the first positional argument)."""
+        arg = next((kw.value for kw in call.keywords if kw.arg == keyword), None)
+        if arg is None and call.args and keyword != "subset":
+            arg = call.args[0] if keyword == "by" else call.args[-1]
+        names = _literal_strings(arg) if arg is not None else None
+        if names is None:
+            raise _Unsupported(f"call without a literal '{keyword}'")
+        self.columns.update(names)
+
+    def _groupby_use(self, call):
+        keys = _literal_strings(call.args[0]) if call.args else None
+        keys = keys or _literal_strings(next((kw.value for kw in call.keywords if kw.arg == "by"), ast.Constant(None)))
+        if keys is None:
+            raise _Unsupported("groupby without literal keys")
+        self.columns.update(keys)
+        parent = self.parents.get(call)
+        if isinstance(parent, ast.Subscript) and parent.value is call:
+            names = _literal_strings(parent.slice)
+            if names is None:
+                raise _Unsupported("non-literal groupby column selection")
+            self.columns.update(names)
+        elif isinstance(parent, ast.Attribute) and parent.attr in GROUPBY_RESULT_METHODS:
+            return
+        elif isinstance(parent, ast.Attribute) and parent.attr in ("agg", "aggregate"):
+            self._agg_use(self.parents.get(parent))
+        else:
+            raise _Unsupported("groupby result used on every column")
+
+    def _agg_use(self, call):
+        """.agg({'col': 'sum'}) or named aggregation .agg(total=('col', 'sum'))."""
+        if not isinstance(call, ast.Call):
+            raise _Unsupported("groupby .agg not called")
+        for arg in call.args:
+            if not isinstance(arg, ast.Dict) or any(_literal_strings(k) is None for k in arg.keys if k is not None):
+                raise _Unsupported("groupby .agg without a literal column mapping")
+            for key in arg.keys:
+                self.columns.update(_literal_strings(key))
+        for kw in call.keywords:
+            if not (isinstance(kw.value, ast.Tuple) and kw.value.elts and _literal_strings(kw.value.elts[0])):
+                raise _Unsupported("groupby .agg keyword without a literal column")
+            self.columns.update(_literal_strings(kw.value.elts[0]))
+
+    def _call_use(self, call):
+        func = call.func
+        if isinstance(func, ast.Name) and func.id == "len":
+            return
+        plot = None
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id in PLOT_MODULES:
+            plot = func.attr
+        elif isinstance(func, ast.Name) and func.id in PLOT_HELPERS:
+            plot = PLOT_HELPERS[func.id]
+        if plot is not None:
+            positional = [arg for arg in call.args if _literal_strings(arg) is not None]  # px.scatter(df, 'x', 'y')
+            keywords = {kw.arg for kw in call.keywords} | set(("x", "y")[:len(positional)])
+            if not _names_plot_columns(plot, keywords):
+                raise _Unsupported(f"{ast.unparse(func)} without explicit columns")
+            for arg in list(call.args) + [kw.value for kw in call.keywords]:
+                self.columns.update(_all_strings(arg))
+            return
+        raise _Unsupported("frame passed to a function")
+
+
+# --- Predicate Extraction ---
+
+def _column_of(node, frame_name):
+    """'a' for df['a'] or df.a (with df being `frame_name`), else None."""
+    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id == frame_name:
+        names = _literal_strings(node.slice)
+        return names[0] if names and len(names) == 1 and isinstance(node.slice, ast.Constant) else None
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == frame_name:
+        return node.attr
+    return None
+
+def _conditions(node, frame_name):
+    """(column, op, value) filters equivalent to a mask expression, or None if any part can't be pushed."""
+    try:
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd):
+            left, right = _conditions(node.left, frame_name), _conditions(node.right, frame_name)
+            return left + right if left is not None and right is not None else None
+        if isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in COMPARE_OPERATORS:
+            op = COMPARE_OPERATORS[type(node.ops[0])]
+            col = _column_of(node.left, frame_name)
+            if col is not None:
+                return [(col, op, _literal_value(node.comparators[0]))]
+            col = _column_of(node.comparators[0], frame_name)
+            if col is not None:
+                return [(col, REVERSED_OPERATORS[op], _literal_value(node.left))]
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "isin"
+                and len(node.args) == 1 and not node.keywords and isinstance(node.args[0], (ast.List, ast.Tuple))):
+            col = _column_of(node.func.value, frame_name)
+            if col is not None:
+                return [(col, "in", [_literal_value(e) for e in node.args[0].elts])]
+    except ValueError:
+        pass
+    return None
+
+def _is_print(stmt):
+    return (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call)
+            and isinstance(stmt.value.func, ast.Name) and stmt.value.func.id == "print")
+
+def _leading_filters(body, load_index, frame_name):
+    """Filters of `df = df[mask]` statements directly after the load (only print() calls may come between)."""
+    filters = []
+    for stmt in body[load_index + 1:]:
+        if _is_print(stmt):
+            continue
+        if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name)
+                and stmt.targets[0].id == frame_name and isinstance(stmt.value, ast.Subscript)
+                and isinstance(stmt.value.value, ast.Name) and stmt.value.value.id == frame_name):
+            break
+        conditions = _conditions(stmt.value.slice, frame_name)
+        if conditions is None:
+            break
+        filters.extend(conditions)
+    return filters
+
+
+# --- Load Call Discovery ---
+
+def _is_call_to(node, name):
+    return isinstance(node, ast.Call) and (
+        (isinstance(node.func, ast.Name) and node.func.id == name)
+        or (isinstance(node.func, ast.Attribute) and node.func.attr == name))
+
+def _string_assignments(tree):
+    """Module-level `name = '...'` assignments (the templates define input paths this way)."""
+    values = {}
+    for stmt in tree.body:
+        if isinstance(stmt, ast.Assign) and isinstance(stmt.value, ast.Constant) and isinstance(stmt.value.value, str):
+            for target in stmt.targets:
+                if isinstance(target, ast.Name):
+                    values[target.id] = stmt.value.value
+    return values
+
+def _find_load(tree):
+    """(body, index, assign) of the single `df = load_dataset(path, ...)` statement, or None."""
+    found = []
+    for node in ast.walk(tree):
+        for field in ("body", "orelse", "finalbody"):
+            body = getattr(node, field, None)
+            if not isinstance(body, list):
+                continue
+            for index, stmt in enumerate(body):
+                if (isinstance(stmt, ast.Assign) and _is_call_to(stmt.value, LOADER_FUNCTION)
+                        and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name)):
+                    found.append((body, index, stmt))
+    return found[0] if len(found) == 1 else None
+
+
+# --- Planning and Rewriting ---
+
+def plan_pushdown(code):
+    """
+    Works out the pushdown for a generated script. Returns a dict with the load `call` node,
+    the dataset `path`, and the `columns`/`filters` to push, or None if the script is not eligible.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    if any(_is_call_to(node, SAVER_FUNCTION) for node in ast.walk(tree)):
+        return None
+    load = _find_load(tree)
+    if load is None:
+        return None
+    body, index, assign = load
+    call = assign.value
+    if not call.args or any(kw.arg in ("columns", "filters") for kw in call.keywords):
+        return None
+    path_node = call.args[0]
+    if isinstance(path_node, ast.Constant) and isinstance(path_node.value, str):
+        path = path_node.value
+    elif isinstance(path_node, ast.Name):
+        path = _string_assignments(tree).get(path_node.id)
+    else:
+        path = None
+    if path is None:
+        return None
+
+    try:
+        known_columns = dataset_columns(path)
+    except Exception as e:
+        print(f"Pushdown skipped: could not read the columns of {path}: {repr(e)}")
+        return None
+    frame_name = assign.targets[0].id
+    try:
+        used = _UsageAnalyzer(tree, [frame_name], known_columns).run()
+    except _Unsupported as e:
+        print(f"Pushdown skipped: {e}.")
+        return None
+
+    filters = [f for f in _leading_filters(body, index, frame_name) if f[0] in known_columns]
+    columns = [col for col in known_columns if col in used]
+    if not columns or len(columns) == len(known_columns):
+        columns = None
+    if columns is None and not filters:
+        return None
+    return {"call": call, "path": path, "columns": columns, "filters": filters, "n_columns": len(known_columns)}
+
+def _insert_keywords(code, call, keywords):
+    """Inserts `, key=value` arguments right after the last argument of `call` in the source text."""
+    last = max(list(call.args) + list(call.keywords), key=lambda node: (node.end_lineno, node.end_col_offset))
+    lines = code.splitlines(keepends=True)
+    line = lines[last.end_lineno - 1].encode("utf-8")  # AST offsets are UTF-8 byte offsets
+    arguments = "".join(f", {key}={value!r}" for key, value in keywords.items()).encode("utf-8")
+    lines[last.end_lineno - 1] = (line[:last.end_col_offset] + arguments + line[last.end_col_offset:]).decode("utf-8")
+    return "".join(lines)
+
+def apply_pushdown(code):
+    """
+    Returns `code` with the columns and leading filters the script uses pushed into its
+    `load_dataset(...)` call, or `code` unchanged if the script is not eligible.
+    """
+    plan = plan_pushdown(code)
+    if plan is None:
+        return code
+    keywords = {}
+    if plan["columns"]:
+        keywords["columns"] = plan["columns"]
+    if plan["filters"]:
+        keywords["filters"] = plan["filters"]
+    rewritten = _insert_keywords(code, plan["call"], keywords)
+    try:
+        ast.parse(rewritten)
+    except SyntaxError:
+        print("Pushdown skipped: rewritten load call did not parse.")
+        return code
+    n_loaded = len(plan["columns"]) if plan["columns"] else plan["n_columns"]
+    print(f"Pushdown: loading {n_loaded}/{plan['n_columns']} columns of {plan['path']}"
+          + (f" with filters {plan['filters']}" if plan["filters"] else ""))
+    return rewritten
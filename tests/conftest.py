@@ -0,0 +1,85 @@
+import gzip
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+# The project modules are flat files at the repository root
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+# Stand-ins for streamlit/langchain_core, importable only where the real package is missing
+IMPORT_STUBS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_stubs")
+
+
+def make_sales_frame(n_rows=2_000, seed=0):
+    """Small e-commerce style dataset with the column kinds the pipeline deals with."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Order ID": [f"O{i:06d}" for i in range(n_rows)],
+        "Platform": rng.choice(["Web", "App", "Store"], n_rows),
+        "Product Category": rng.choice(["Books", "Toys", "Home", "Garden", "Sports"], n_rows),
+        "Order Value (INR)": rng.gamma(2.0, 500.0, n_rows).round(2),
+        "Quantity": rng.integers(1, 10, n_rows),
+        "Service Rating": rng.integers(1, 6, n_rows),
+        "Delivery Time": rng.normal(50, 10, n_rows).round(1),
+        "Order Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24, n_rows), unit="h"),
+    })
+    df.loc[rng.choice(n_rows, n_rows // 20, replace=False), "Delivery Time"] = np.nan
+    return df
+
+
+def make_wide_frame(n_cols=60, n_rows=300, seed=2):
+    """Wide table of noise metrics plus an ID, a low-cardinality segment and a date column."""
+    rng = np.random.default_rng(seed)
+    data = {f"metric_{i}": rng.normal(size=n_rows) for i in range(n_cols)}
+    data["row_id"] = np.arange(n_rows)
+    data["segment"] = rng.choice(["a", "b", "c"], n_rows)
+    data["order date"] = pd.date_range("2024-01-01", periods=n_rows, freq="D")
+    return pd.DataFrame(data)
+
+
+def write_all_formats(df, tmp_path):
+    """The same data as plain/gzip/zstd CSV, Parquet and Feather, all under a misleading .csv name."""
+    csv_text = df.to_csv(index=False).encode("utf-8")
+    paths = {}
+    paths["csv"] = tmp_path / "plain.csv"
+    paths["csv"].write_bytes(csv_text)
+    paths["gzip"] = tmp_path / "gzip.csv"
+    paths["gzip"].write_bytes(gzip.compress(csv_text))
+    paths["zstd"] = tmp_path / "zstd.csv"
+    with pa.CompressedOutputStream(str(paths["zstd"]), "zstd") as stream:
+        stream.write(csv_text)
+    paths["parquet"] = tmp_path / "parquet.csv"
+    df.to_parquet(paths["parquet"], index=False)
+    paths["feather"] = tmp_path / "feather.csv"
+    df.to_feather(paths["feather"])
+    return paths
+
+
+@pytest.fixture
+def sales_df():
+    return make_sales_frame()
+
+
+@pytest.fixture
+def aianalyst(monkeypatch):
+    """The aianalyst module, importable without langchain installed (see IMPORT_STUBS_DIR)."""
+    monkeypatch.setattr(sys, "path", sys.path + [IMPORT_STUBS_DIR])
+    import aianalyst
+    return aianalyst
+
+
+@pytest.fixture
+def main3(monkeypatch, tmp_path):
+    """The Streamlit app module, imported afresh (rendering the page once) in an empty working directory."""
+    monkeypatch.setattr(sys, "path", sys.path + [IMPORT_STUBS_DIR])
+    monkeypatch.chdir(tmp_path)
+    import streamlit as st
+    st.session_state.clear()
+    sys.modules.pop("main3", None)
+    import main3
+    return main3
@@ -0,0 +1 @@
+"""Stand-in for langchain_core used by test_import_time.py when it is not installed."""
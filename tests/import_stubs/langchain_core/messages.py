@@ -0,0 +1,16 @@
+class _Message:
+    def __init__(self, content="", **kwargs):
+        self.content = content
+        self.__dict__.update(kwargs)
+
+
+class HumanMessage(_Message):
+    pass
+
+
+class SystemMessage(_Message):
+    pass
+
+
+class ToolMessage(_Message):
+    pass
@@ -0,0 +1,5 @@
+def tool(*args, **kwargs):
+    """`@tool` and `@tool(...)` leave the function as it is."""
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+        return args[0]
+    return lambda function: function
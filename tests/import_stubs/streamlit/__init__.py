@@ -0,0 +1,90 @@
+"""
+Stand-in for streamlit used by the tests when streamlit is not installed: every call is a no-op,
+widgets return their empty value (no upload, no click, first option), and cache_data/cache_resource
+memoise by argument values with `max_entries`, like the real caches.
+"""
+from collections import OrderedDict
+from functools import wraps
+
+
+class _Element:
+    """Any page element or container: attributes and calls give more elements, `with` works."""
+
+    def __getattr__(self, name):
+        return _WIDGETS.get(name) or _Element()
+
+    def __call__(self, *args, **kwargs):
+        return _Element()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        del self[name]
+
+
+def _cache(function=None, *, max_entries=None, **kwargs):
+    """cache_data / cache_resource: results kept per argument values, oldest evicted beyond `max_entries`."""
+    def decorate(function):
+        results = OrderedDict()
+
+        @wraps(function)
+        def cached(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            if key not in results:
+                results[key] = function(*args, **kwargs)
+                if max_entries is not None and len(results) > max_entries:
+                    results.popitem(last=False)
+            return results[key]
+
+        cached.clear = results.clear
+        return cached
+
+    return decorate(function) if callable(function) else decorate
+
+
+def _decorator(function=None, **kwargs):
+    return function if callable(function) else (lambda function: function)
+
+
+def _first_option(label, options=(), *args, **kwargs):
+    options = list(options)
+    return options[kwargs.get("index", 0)] if options else None
+
+
+def _elements(spec, *args, **kwargs):
+    return [_Element() for _ in range(spec if isinstance(spec, int) else len(spec))]
+
+
+session_state = _SessionState()
+sidebar = _Element()
+cache_data = cache_resource = _cache
+fragment = _decorator
+file_uploader = lambda *args, **kwargs: None
+button = checkbox = toggle = lambda *args, **kwargs: False
+text_input = lambda *args, **kwargs: kwargs.get("value", "")
+number_input = lambda *args, **kwargs: kwargs.get("value", kwargs.get("min_value", 0))
+radio = selectbox = _first_option
+multiselect = lambda *args, **kwargs: []
+columns = tabs = _elements
+_WIDGETS = {"file_uploader": file_uploader, "button": button, "checkbox": checkbox, "toggle": toggle,
+            "text_input": text_input, "number_input": number_input, "radio": radio, "selectbox": selectbox,
+            "multiselect": multiselect, "columns": columns, "tabs": tabs}
+
+
+def __getattr__(name):
+    return _Element()
@@ -0,0 +1,130 @@
+import pandas as pd
+import pytest
+
+from aggregate_cube import build_cube, cube_path, load_cube, query_cube
+from drilldown import run_drilldown
+
+MEASURE = "Order Value (INR)"
+
+
+@pytest.fixture
+def dataset(sales_df, tmp_path):
+    path = tmp_path / "clean.parquet"
+    sales_df.to_parquet(path, index=False)
+    build_cube(path)
+    return path, sales_df
+
+def _sorted(result, keys):
+    return result.sort_values(keys).reset_index(drop=True) if keys else result
+
+
+# --- Building ---
+
+def test_cube_dimensions_and_measures(dataset):
+    path, _ = dataset
+    cube = load_cube(path)
+    assert cube_path(path) == str(path.parent / "aggregate_cube.parquet")
+    assert set(cube["dimensions"]) == {"Platform", "Product Category"}  # Order ID is too unique, dates aren't dimensions
+    assert {MEASURE, "Delivery Time", "Quantity"} <= set(cube["measures"])
+    assert frozenset({"Platform", "Product Category"}) in cube["groupings"].values()
+
+
+# --- Queries ---
+
+@pytest.mark.parametrize("query", [
+    {"metrics": [(MEASURE, "sum"), (MEASURE, "mean"), ("*", "count")]},
+    {"group_by": ["Platform"], "metrics": [(MEASURE, "mean"), (MEASURE, "min"), (MEASURE, "max"), ("*", "count")]},
+    {"group_by": ["Product Category"], "metrics": [("Delivery Time", "count"), ("Delivery Time", "mean")]},  # Nulls
+    {"group_by": ["Platform"], "metrics": [(MEASURE, "sum")],
+     "filters": [("Product Category", "in", ["Books", "Toys"])]},  # Answered from the pair cells
+    {"group_by": ["Platform", "Product Category"], "metrics": [("*", "count"), ("Quantity", "sum")],
+     "filters": [("Platform", "==", "App")]},
+])
+def test_cube_answers_match_the_rows(dataset, query):
+    path, _ = dataset
+    from_cube = query_cube(load_cube(path), query)
+    assert from_cube is not None
+    from_rows = run_drilldown(path, query, use_cube=False)
+    keys = query.get("group_by", [])
+    pd.testing.assert_frame_equal(_sorted(from_cube, keys), _sorted(from_rows, keys),
+                                  check_dtype=False, check_exact=False, rtol=1e-9)
+
+def test_cube_matches_pandas(dataset):
+    path, df = dataset
+    result = run_drilldown(path, {"group_by": ["Platform"], "metrics": [(MEASURE, "mean"), ("*", "count")]})
+    expected = df.groupby("Platform")[MEASURE].agg(["mean", "size"])
+    result = result.set_index("Platform")
+    assert result[f"count(*)"].to_dict() == expected["size"].to_dict()
+    assert result[f"mean({MEASURE})"].to_dict() == pytest.approx(expected["mean"].to_dict())
+
+@pytest.mark.parametrize("query", [
+    {"group_by": ["Platform"], "metrics": [(MEASURE, "median")]},
+    {"metrics": [(MEASURE, "median")]},
+    {"group_by": ["Platform"], "metrics": [(MEASURE, "count_distinct")]},
+    {"group_by": ["Order ID"], "metrics": [("*", "count")]},
+    {"metrics": [("*", "count")], "filters": [(MEASURE, ">", 100)]},
+    {"metrics": [("*", "count")], "filters": [("Platform", "!=", "App")]},  # Rejected by the row path too
+    {"metrics": [("*", "count")], "time_column": "Order Date", "time_grain": "month"},
+])
+def test_queries_the_cube_cannot_answer_exactly(dataset, query):
+    path, _ = dataset
+    assert query_cube(load_cube(path), query) is None
+
+def test_medians_are_exact(dataset):
+    path, df = dataset
+    result = run_drilldown(path, {"group_by": ["Platform"], "metrics": [(MEASURE, "median")]}).set_index("Platform")
+    assert result[f"median({MEASURE})"].to_dict() == pytest.approx(df.groupby("Platform")[MEASURE].median().to_dict())
+    total = run_drilldown(path, {"metrics": [(MEASURE, "median")]})
+    assert total.iloc[0, 0] == pytest.approx(df[MEASURE].median())
+
+
+@pytest.fixture
+def flagged(sales_df, tmp_path):
+    df = sales_df.assign(Returned=sales_df["Quantity"] > 4)
+    path = tmp_path / "clean.parquet"
+    df.to_parquet(path, index=False)
+    build_cube(path)
+    return path, df
+
+@pytest.mark.parametrize("query", [
+    {"group_by": ["Platform"], "metrics": [(MEASURE, "sum")], "filters": [("Returned", "==", True)]},
+    {"group_by": ["Platform"], "metrics": [("*", "count")], "filters": [("Returned", "in", [False])]},
+    {"group_by": ["Returned"], "metrics": [(MEASURE, "mean"), ("*", "count")]},
+    {"group_by": ["Returned", "Platform"], "metrics": [("*", "count")]},
+])
+def test_boolean_dimensions_match_the_rows(flagged, query):
+    path, df = flagged
+    assert "Returned" in load_cube(path)["dimensions"]
+    from_cube = query_cube(load_cube(path), query)
+    from_rows = run_drilldown(path, query, use_cube=False)
+    assert len(from_cube) > 0
+    keys = query.get("group_by", [])
+    pd.testing.assert_frame_equal(_sorted(from_cube, keys), _sorted(from_rows, keys),
+                                  check_dtype=False, check_exact=False, rtol=1e-9)
+    if "Returned" in keys:
+        assert set(from_cube["Returned"]) == {True, False}  # Booleans, not 'true'/'false'
+
+def test_boolean_filter_values_round_trip(flagged):
+    from drilldown import distinct_values
+
+    path, df = flagged
+    values = distinct_values(path, "Returned")
+    assert sorted(values) == ["false", "true"]
+    result = run_drilldown(path, {"metrics": [("*", "count")], "filters": [("Returned", "in", values[:1])]})
+    assert result.iloc[0, 0] == (df["Returned"].astype(str).str.lower() == values[0]).sum()
+
+
+# --- Staleness ---
+
+def test_rewritten_dataset_ignores_the_old_cube(dataset):
+    path, df = dataset
+    smaller = df[df["Platform"] == "App"]
+    smaller.to_parquet(path, index=False)
+    assert load_cube(path) is None
+    result = run_drilldown(path, {"group_by": ["Platform"], "metrics": [("*", "count")]})
+    assert result.to_dict("records") == [{"Platform": "App", "count(*)": len(smaller)}]
+
+def test_missing_cube_loads_as_none(sales_df, tmp_path):
+    path = tmp_path / "clean.parquet"
+    sales_df.to_parquet(path, index=False)
+    assert load_cube(path) is None
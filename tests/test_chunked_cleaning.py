@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import chunked_cleaning
+from chunked_cleaning import StreamingStats, compute_global_stats, run_chunked_cleaning
+from conftest import make_sales_frame
+from data_loader import load_dataset, optimize_dtypes
+
+STATS_COLUMNS = ["Delivery Time", "Order Value (INR)", "Platform"]
+
+
+def _summary(df, chunk_rows=300):
+    summary = StreamingStats(df.columns)
+    for start in range(0, len(df), chunk_rows):
+        summary.update(df.iloc[start:start + chunk_rows])
+    return summary
+
+def compute_stats(summary):
+    return {
+        "delivery_median": summary.median("Delivery Time"),
+        "value_cap": summary.quantile("Order Value (INR)", 0.95),
+        "platform_mode": summary.mode("Platform"),
+    }
+
+def clean_chunk(chunk, stats):
+    chunk["Delivery Time"] = chunk["Delivery Time"].fillna(stats["delivery_median"])
+    chunk["Order Value (INR)"] = chunk["Order Value (INR)"].clip(upper=stats["value_cap"])
+    chunk["Platform"] = chunk["Platform"].str.upper()
+    return chunk
+
+def clean_in_memory(df):
+    df = df.copy()
+    stats = {
+        "delivery_median": df["Delivery Time"].median(),
+        "value_cap": df["Order Value (INR)"].quantile(0.95),
+        "platform_mode": df["Platform"].mode()[0],
+    }
+    return clean_chunk(df, stats), stats
+
+
+# --- Streaming Statistics ---
+
+def test_streaming_stats_match_pandas(sales_df):
+    summary = _summary(sales_df)
+    for col in ["Order Value (INR)", "Quantity", "Delivery Time"]:
+        series = sales_df[col]
+        assert summary.count(col) == series.count()
+        assert summary.nulls(col) == series.isna().sum()
+        assert summary.sum(col) == pytest.approx(series.sum())
+        assert summary.mean(col) == pytest.approx(series.mean())
+        assert summary.std(col) == pytest.approx(series.std())
+        assert summary.min(col) == series.min() and summary.max(col) == series.max()
+        for q in (0.0, 0.01, 0.25, 0.5, 0.9, 0.99, 1.0):
+            assert summary.quantile(col, q) == pytest.approx(series.quantile(q))  # Exact below SKETCH_SIZE values
+    assert summary.mode("Platform") == sales_df["Platform"].mode()[0]
+    assert summary.value_counts("Product Category").to_dict() == sales_df["Product Category"].value_counts().to_dict()
+
+def test_compressed_sketch_stays_close(monkeypatch):
+    monkeypatch.setattr(chunked_cleaning, "SKETCH_SIZE", 200)
+    values = pd.Series(np.random.default_rng(3).lognormal(size=50_000), name="x")
+    summary = _summary(values.to_frame(), chunk_rows=4_000)
+    assert len(summary._sketch("x").centroids) <= 200
+    for q in (0.1, 0.5, 0.9):
+        assert abs((values <= summary.quantile("x", q)).mean() - q) < 0.01  # Rank error
+    assert summary.std("x") == pytest.approx(values.std())
+
+def test_text_numbers_are_coerced_like_to_numeric():
+    df = pd.DataFrame({"age": ["31", "n/a", "40", None, "35.5"]})
+    summary = _summary(df, chunk_rows=2)
+    expected = pd.to_numeric(df["age"], errors="coerce")
+    assert summary.median("age") == expected.median()
+    assert summary.count("age") == expected.count()
+    assert summary.mode("age") == df["age"].mode()[0]
+
+def test_too_many_distinct_values_have_no_mode(monkeypatch, sales_df):
+    monkeypatch.setattr(chunked_cleaning, "MAX_TRACKED_VALUES", 100)
+    summary = _summary(sales_df[["Order ID", "Platform"]])
+    with pytest.raises(ValueError):
+        summary.mode("Order ID")
+    assert summary.mode("Platform") == sales_df["Platform"].mode()[0]
+    assert summary.nulls("Order ID") == 0
+
+def test_pre_pass_reads_only_the_stats_columns(sales_df, tmp_path, monkeypatch):
+    path = tmp_path / "raw.csv"
+    sales_df.to_csv(path, index=False)
+    requested = []
+    original = chunked_cleaning.iter_dataset_chunks
+    def iter_chunks(input_path, chunk_rows, columns=None):
+        requested.append(columns)
+        return original(input_path, chunk_rows, columns=columns)
+    monkeypatch.setattr(chunked_cleaning, "iter_dataset_chunks", iter_chunks)
+    stats = compute_global_stats(path, compute_stats, STATS_COLUMNS, chunk_rows=500)
+    assert requested == [STATS_COLUMNS]
+    assert stats == pytest.approx(clean_in_memory(sales_df)[1])
+
+
+# --- Chunked Run ---
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_chunked_cleaning_matches_in_memory_cleaning(tmp_path, n_jobs):
+    raw = make_sales_frame(5_000, seed=4)
+    raw = pd.concat([raw, raw.iloc[:50]], ignore_index=True)  # Exact duplicates across chunks
+    path = tmp_path / "raw.csv"
+    raw.to_csv(path, index=False)
+    output = tmp_path / "out" / "clean.parquet"
+    n_rows = run_chunked_cleaning(path, output, clean_chunk, compute_stats=compute_stats, stats_columns=STATS_COLUMNS,
+                                  chunk_rows=700, n_jobs=n_jobs, drop_duplicates=True)
+
+    expected, _ = clean_in_memory(pd.read_csv(path))
+    expected = expected.drop_duplicates().reset_index(drop=True)
+    result = load_dataset(output)
+    assert n_rows == len(expected) == len(raw) - 50
+    assert pq.ParquetFile(output).metadata.num_row_groups == 8  # One row group per chunk
+    pd.testing.assert_frame_equal(result.astype(expected.dtypes.to_dict()), expected)
+
+def _with_duplicates(seed=6):
+    raw = make_sales_frame(3_000, seed=seed)
+    rng = np.random.default_rng(seed)
+    repeats = raw.iloc[rng.integers(0, len(raw), 600)]  # Repeats within and across chunks, in any order
+    return pd.concat([raw, repeats], ignore_index=True).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+def _keep_rows(chunk, stats):
+    return chunk
+
+@pytest.mark.parametrize("columnar", [True, False])
+def test_duplicates_are_dropped_across_chunks(tmp_path, monkeypatch, columnar):
+    monkeypatch.setattr(chunked_cleaning, "DEDUP_PARTITIONS", 4)
+    monkeypatch.setattr(chunked_cleaning, "REWRITE_CSV_ROWS", 250)
+    monkeypatch.setattr(chunked_cleaning, "columnar_available", lambda: columnar)
+    raw = _with_duplicates()
+    path = tmp_path / "raw.csv"
+    raw.to_csv(path, index=False)
+    output = tmp_path / "out" / "clean.parquet"
+    n_rows = run_chunked_cleaning(path, output, _keep_rows, chunk_rows=400, n_jobs=1, drop_duplicates=True,
+                                  csv_copy=columnar)
+
+    expected = pd.read_csv(path).drop_duplicates().reset_index(drop=True)
+    result = pd.read_parquet(output) if columnar else pd.read_csv(output)
+    assert n_rows == len(expected) < len(raw)
+    pd.testing.assert_frame_equal(result.astype(expected.dtypes.to_dict()), expected, check_exact=False)
+    if columnar:
+        pd.testing.assert_frame_equal(pd.read_csv(output.with_suffix(".csv")), expected)
+    assert sorted(p.name for p in output.parent.iterdir()) == (["clean.csv", "clean.parquet"] if columnar else ["clean.parquet"])
+
+def test_duplicate_finder_spills_hashes(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked_cleaning, "DEDUP_PARTITIONS", 8)
+    raw = _with_duplicates(seed=7)
+    finder = chunked_cleaning._DuplicateFinder(str(tmp_path))
+    for start in range(0, len(raw), 500):
+        finder.add(raw.iloc[start:start + 500])
+    spilled = sum(p.stat().st_size for p in tmp_path.iterdir())
+    assert spilled == len(raw) * finder.RECORD.itemsize and len(list(tmp_path.iterdir())) == 8
+    assert finder.duplicate_rows().tolist() == np.flatnonzero(raw.duplicated().to_numpy()).tolist()
+
+def test_output_dtypes_match_in_memory_cleaning(tmp_path):
+    raw = make_sales_frame(5_000, seed=8)
+    path = tmp_path / "raw.csv"
+    raw.to_csv(path, index=False)
+    output = tmp_path / "clean.parquet"
+    run_chunked_cleaning(path, output, clean_chunk, compute_stats=compute_stats, stats_columns=STATS_COLUMNS,
+                         chunk_rows=700, n_jobs=1)
+
+    expected = optimize_dtypes(clean_in_memory(pd.read_csv(path))[0], report=False)
+    result = pd.read_parquet(output)
+    assert result.dtypes.astype(str).to_dict() == expected.dtypes.astype(str).to_dict()
+    assert list(result["Platform"].cat.categories) == list(expected["Platform"].cat.categories)
+    parquet_file = pq.ParquetFile(output)
+    schemas = {parquet_file.read_row_group(i).schema for i in range(parquet_file.num_row_groups)}
+    assert len(schemas) == 1 and parquet_file.num_row_groups == 8
+    pd.testing.assert_frame_equal(result, expected.astype(result.dtypes.to_dict()))
+
+def test_dtypes_fit_every_chunk(tmp_path):
+    df = pd.DataFrame({"big": np.arange(3_000, dtype="int64"), "ratio": np.full(3_000, 0.5), "text": ["a"] * 3_000})
+    df.loc[2_900, "big"] = 2 ** 40  # Only the last chunk leaves the int32 range
+    df.loc[2_950, "ratio"] = 0.1  # ... or needs float64
+    path = tmp_path / "raw.parquet"
+    df.to_parquet(path, index=False)
+    output = tmp_path / "clean.parquet"
+    run_chunked_cleaning(path, output, _keep_rows, chunk_rows=500, n_jobs=1)
+    assert pd.read_parquet(output).dtypes.astype(str).to_dict() == {"big": "int64", "ratio": "float64", "text": "category"}
+    run_chunked_cleaning(path, output, _keep_rows, chunk_rows=500, n_jobs=1, optimize_dtypes=False)
+    assert pd.read_parquet(output).dtypes.astype(str).to_dict() == {"big": "int64", "ratio": "float64", "text": "str"}
+
+def test_failed_run_leaves_no_output(sales_df, tmp_path):
+    path = tmp_path / "raw.csv"
+    sales_df.to_csv(path, index=False)
+    output = tmp_path / "clean.parquet"
+
+    def failing_clean(chunk, stats):
+        raise RuntimeError("bad chunk")
+    with pytest.raises(RuntimeError):
+        run_chunked_cleaning(path, output, failing_clean, chunk_rows=500, n_jobs=1, drop_duplicates=True)
+    assert list(tmp_path.iterdir()) == [path]
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_wide_frame
+from profiler import build_profile, estimate_tokens, score_columns, select_columns, serialize_profile
+
+
+def test_select_columns_prefers_informative_columns():
+    profile = build_profile(make_wide_frame())
+    scores = score_columns(profile)
+    assert scores["order date"] > scores["row_id"]
+    assert scores["segment"] > scores["row_id"]
+    selected = select_columns(profile, 10)
+    assert len(selected) == 10
+    assert "order date" in selected and "row_id" not in selected
+    assert selected == [c for c in profile["columns"] if c in selected]  # Original order kept
+
+def test_scores_penalise_empty_constant_and_correlated_noise():
+    rng = np.random.default_rng(5)
+    n_rows = 400
+    revenue = rng.gamma(2.0, 100.0, n_rows)
+    df = pd.DataFrame({
+        "revenue": revenue,
+        "cost": revenue * 0.6 + rng.normal(0, 5, n_rows),
+        "noise": rng.normal(size=n_rows),
+        "mostly_empty": np.where(rng.random(n_rows) < 0.9, np.nan, rng.normal(size=n_rows)),
+        "constant": 1,
+    })
+    scores = score_columns(build_profile(df))
+    assert scores["constant"] == 0.0
+    assert scores["mostly_empty"] < scores["noise"] < scores["cost"]
+    assert select_columns(build_profile(df), 2) == ["revenue", "cost"]
+
+def test_max_columns_rolls_up_the_rest(sales_df):
+    text = serialize_profile(build_profile(sales_df), token_budget=5000, max_columns=3)
+    assert sum(1 for line in text.splitlines() if " | " in line and not line.startswith("Columns")) == 3
+    assert f"+ {sales_df.shape[1] - 3} less relevant columns not listed" in text
+
+def test_thousand_column_schema_stays_bounded():
+    profile = build_profile(make_wide_frame(n_cols=1_000, n_rows=1_000))
+    text = serialize_profile(profile, token_budget=5000, max_columns=40)
+    column_lines = [line for line in text.splitlines() if " | " in line and not line.startswith("Columns")]
+    assert len(column_lines) == 40
+    assert "order date | " in text and "segment | " in text
+    assert "+ 963 less relevant columns not listed" in text
+    assert estimate_tokens(text) <= 5000
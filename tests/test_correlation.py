@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import blockwise_correlation, cramers_v_matrix, top_pairs
+
+
+def _numeric_frame(n_rows=500, n_cols=9, seed=1):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=n_rows)
+    data = {f"x{i}": base * i + rng.normal(size=n_rows) for i in range(n_cols)}
+    df = pd.DataFrame(data)
+    df.loc[rng.choice(n_rows, 60, replace=False), "x2"] = np.nan
+    df.loc[rng.choice(n_rows, 90, replace=False), "x5"] = np.nan
+    df["constant"] = 7.0
+    df["mostly_missing"] = np.nan
+    df.loc[0, "mostly_missing"] = 1.0
+    df["int_col"] = rng.integers(0, 100, n_rows)
+    return df
+
+
+# --- Numeric Correlation ---
+
+@pytest.mark.parametrize("block_size", [1, 3, 64])
+def test_blockwise_correlation_matches_pandas(block_size):
+    df = _numeric_frame()
+    result = blockwise_correlation(df, block_size=block_size, n_jobs=2)
+    pd.testing.assert_frame_equal(result, df.corr(), check_exact=False, atol=1e-10)
+
+def test_zero_variance_columns_are_nan_like_pandas():
+    df = _numeric_frame()
+    result = blockwise_correlation(df, block_size=4)
+    assert np.isnan(result.loc["constant", "constant"])
+    assert np.isnan(result.loc["mostly_missing", "mostly_missing"])
+    assert result.loc["x1", "x1"] == 1.0
+    assert result.loc["constant"].isna().all()
+
+
+# --- Categorical Association ---
+
+def _cramers_v_reference(a, b):
+    table = pd.crosstab(a, b).to_numpy(dtype="float64")
+    n = table.sum()
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / n
+    chi2 = ((table - expected) ** 2 / expected).sum()
+    return np.sqrt(chi2 / n / (min(table.shape) - 1))
+
+def test_cramers_v_matches_crosstab_reference(sales_df):
+    df = sales_df[["Platform", "Product Category"]].copy()
+    df["Derived"] = np.where(df["Platform"] == "Web", "online", "offline")  # Fully determined by Platform
+    df.loc[::13, "Product Category"] = None
+    result = cramers_v_matrix(df)
+    complete = df.dropna()
+    assert result.loc["Platform", "Product Category"] == pytest.approx(
+        _cramers_v_reference(complete["Platform"], complete["Product Category"]))
+    assert result.loc["Platform", "Derived"] == pytest.approx(1.0)
+    assert (np.diag(result) == 1.0).all()
+
+def test_cramers_v_skips_high_cardinality_columns(sales_df):
+    result = cramers_v_matrix(sales_df[["Order ID", "Platform", "Product Category"]])
+    assert list(result.columns) == ["Platform", "Product Category"]
+
+
+# --- Prompt Extraction ---
+
+def test_top_pairs_orders_by_absolute_value():
+    matrix = pd.DataFrame([[1.0, -0.9, 0.2], [-0.9, 1.0, np.nan], [0.2, np.nan, 1.0]],
+                          index=list("abc"), columns=list("abc"))
+    assert top_pairs(matrix, k=5) == [["a", "b", -0.9], ["a", "c", 0.2]]
+    assert top_pairs(matrix, k=1) == [["a", "b", -0.9]]
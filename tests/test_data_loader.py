@@ -0,0 +1,45 @@
+import logging
+
+import pandas as pd
+
+from data_loader import MEMORY_SAVED_ATTR, SOURCE_DTYPES_ATTR, memory_report, optimize_dtypes
+from profiler import load_or_build_profile
+
+
+# --- Memory Optimisation ---
+
+def test_optimize_dtypes_shrinks_without_changing_values(sales_df):
+    df = optimize_dtypes(sales_df)
+    assert isinstance(df["Platform"].dtype, pd.CategoricalDtype)
+    assert not isinstance(df["Order ID"].dtype, pd.CategoricalDtype)  # Unique per row
+    assert df["Quantity"].dtype == "int32"
+    assert df["Order Value (INR)"].dtype == "float64"  # float32 would change 2-decimal values
+    assert df.memory_usage(deep=True).sum() < sales_df.memory_usage(deep=True).sum()
+    pd.testing.assert_frame_equal(df.astype(sales_df.dtypes.to_dict()), sales_df)
+
+def test_optimize_dtypes_records_source_dtypes(sales_df):
+    df = optimize_dtypes(sales_df)
+    source = df.attrs[SOURCE_DTYPES_ATTR]
+    assert source["Quantity"] == str(sales_df["Quantity"].dtype)
+    assert source["Platform"] == str(sales_df["Platform"].dtype)
+    assert "Order Value (INR)" not in source  # Unchanged
+
+def test_optimize_dtypes_reports_memory_saved(sales_df, tmp_path):
+    df = optimize_dtypes(sales_df)
+    saved = df.attrs[MEMORY_SAVED_ATTR]
+    assert saved == {"before": sales_df.memory_usage(deep=True).sum(), "after": df.memory_usage(deep=True).sum()}
+    assert saved["after"] < saved["before"]
+    assert memory_report({"before": 4 * 1024 ** 2, "after": 1024 ** 2}) == "4.0 MB -> 1.0 MB (3.0 MB saved, 75%)"
+    assert MEMORY_SAVED_ATTR not in optimize_dtypes(sales_df, report=False).attrs
+
+    path = tmp_path / "data.parquet"
+    sales_df.to_parquet(path, index=False)
+    profile = load_or_build_profile(path, profile_dir=tmp_path / "profiles")
+    assert profile["memory_saved"]["after"] == profile["memory_bytes"] < profile["memory_saved"]["before"]
+
+def test_optimize_dtypes_logs_instead_of_printing(sales_df, capsys, caplog):
+    with caplog.at_level(logging.INFO, logger="data_loader"):
+        optimize_dtypes(sales_df)
+    assert capsys.readouterr().out == ""
+    assert any("Memory optimised" in record.getMessage() for record in caplog.records)
+
@@ -0,0 +1,126 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import write_all_formats
+from data_loader import write_schema_sidecar
+from data_preview import (
+    build_csv_row_index, count_rows, dataset_schema, filter_expression, read_page,
+)
+
+PAGE = 70
+
+
+@pytest.fixture
+def paths(sales_df, tmp_path):
+    paths = write_all_formats(sales_df, tmp_path)
+    table = pa.Table.from_pandas(sales_df, preserve_index=False)
+    pq.write_table(table, paths["parquet"], row_group_size=300)  # Pages straddle row groups
+    feather.write_feather(table, paths["feather"], chunksize=300)
+    return paths
+
+def _ids(table):
+    return table.column("Order ID").to_pylist()
+
+
+# --- Pages ---
+
+@pytest.mark.parametrize("file_format", ["csv", "gzip", "zstd", "parquet", "feather"])
+@pytest.mark.parametrize("page", [0, 4, 28, 40])
+def test_pages_match_pandas(paths, sales_df, file_format, page):
+    path = paths[file_format]
+    index = build_csv_row_index(path, page_rows=PAGE)
+    assert (index is None) == (file_format != "csv")
+    table = read_page(path, page, page_rows=PAGE, csv_index=index)
+    assert _ids(table) == sales_df["Order ID"].iloc[page * PAGE:(page + 1) * PAGE].tolist()
+    assert table.column("Order Value (INR)").to_pylist() == pytest.approx(
+        sales_df["Order Value (INR)"].iloc[page * PAGE:(page + 1) * PAGE].tolist())
+
+def test_csv_index_skips_quoted_newlines(tmp_path):
+    df = pd.DataFrame({"id": range(250), "note": [f"line one\nline two {i}" if i % 7 == 0 else f"note {i}" for i in range(250)]})
+    path = tmp_path / "notes.csv"
+    df.to_csv(path, index=False)
+    index = build_csv_row_index(path, page_rows=PAGE)
+    assert index["n_rows"] == len(df) and len(index["offsets"]) == 4
+    for page in range(4):
+        table = read_page(path, page, page_rows=PAGE, csv_index=index)
+        assert table.to_pandas().equals(df.iloc[page * PAGE:(page + 1) * PAGE].reset_index(drop=True))
+
+def test_csv_without_trailing_newline(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"a,b\n1,2\n3,4")
+    assert build_csv_row_index(path)["n_rows"] == 2
+
+def test_every_csv_page_has_the_dataset_types(tmp_path):
+    df = pd.DataFrame({
+        "id": range(210),
+        "amount": [str(i) for i in range(140)] + [f"{i}.5" for i in range(70)],  # Whole numbers on the first pages
+        "note": [""] * 70 + [f"n{i}" for i in range(140)],  # Empty on the first page
+    })
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    index = build_csv_row_index(path, page_rows=PAGE)
+    schema = dataset_schema(path)
+    assert schema.field("amount").type == pa.float64() and schema.field("note").type == pa.string()
+    for page in range(3):
+        assert read_page(path, page, page_rows=PAGE, csv_index=index).schema == schema
+
+def test_csv_types_come_from_the_schema_sidecar(tmp_path):
+    n_rows = 150_000  # Larger than pyarrow's first CSV block, which only sees whole numbers
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"id": range(n_rows), "amount": [str(i) for i in range(n_rows - 1)] + ["2.5"]}).to_csv(path, index=False)
+    assert dataset_schema(path).field("amount").type == pa.int64()
+    write_schema_sidecar(path, {"columns": {
+        "id": {"dtype": "int64", "categorical": False, "datetime_format": None},
+        "amount": {"dtype": "float64", "categorical": False, "datetime_format": None},
+    }})
+    schema = dataset_schema(path)
+    assert schema.field("amount").type == pa.float64()
+    index = build_csv_row_index(path, page_rows=PAGE)
+    last_page = read_page(path, (n_rows - 1) // PAGE, page_rows=PAGE, csv_index=index)
+    assert last_page.schema == schema and last_page.column("amount").to_pylist()[-1] == 2.5
+    assert read_page(path, 0, page_rows=PAGE, csv_index=index).schema == schema
+    assert count_rows(path, filter_expression(schema, "amount", "==", "2.5")) == 1  # Streamed with the same types
+
+
+# --- Filters and Sorting ---
+
+@pytest.mark.parametrize("file_format", ["csv", "gzip", "parquet", "feather"])
+def test_filtered_sorted_pages_match_pandas(paths, sales_df, file_format):
+    path = paths[file_format]
+    expr = filter_expression(dataset_schema(path), "Platform", "==", "App")
+    expected = sales_df[sales_df["Platform"] == "App"]
+    assert count_rows(path, expr) == len(expected)
+    assert _ids(read_page(path, 2, page_rows=PAGE, filter_expr=expr)) == expected["Order ID"].iloc[2 * PAGE:3 * PAGE].tolist()
+
+    ordered = expected.sort_values("Order Value (INR)", ascending=False, kind="stable")
+    table = read_page(path, 1, page_rows=PAGE, sort_by="Order Value (INR)", descending=True, filter_expr=expr)
+    assert table.column("Order Value (INR)").to_pylist() == pytest.approx(
+        ordered["Order Value (INR)"].iloc[PAGE:2 * PAGE].tolist())
+
+def test_text_filters_are_cast_to_the_column_type(paths, sales_df):
+    schema = dataset_schema(paths["parquet"])
+    assert count_rows(paths["parquet"], filter_expression(schema, "Quantity", ">=", "5")) == (sales_df["Quantity"] >= 5).sum()
+    contains = filter_expression(schema, "Product Category", "contains", "OO")
+    assert count_rows(paths["parquet"], contains) == sales_df["Product Category"].str.contains("oo", case=False).sum()
+    with pytest.raises(ValueError):
+        filter_expression(schema, "Quantity", "~", "5")
+
+def test_sorting_a_categorical_column(sales_df, tmp_path):
+    path = tmp_path / "data.parquet"
+    sales_df.astype({"Platform": "category"}).to_parquet(path, index=False)
+    table = read_page(path, 0, page_rows=PAGE, sort_by="Platform")
+    assert table.column("Platform").to_pylist() == sorted(sales_df["Platform"])[:PAGE]
+
+def test_page_past_the_end_is_empty(paths):
+    for file_format in ("csv", "parquet", "feather"):
+        path = paths[file_format]
+        table = read_page(path, 1_000, page_rows=PAGE, csv_index=build_csv_row_index(path, page_rows=PAGE))
+        assert table.num_rows == 0 and "Order ID" in table.column_names
+
+@pytest.mark.parametrize("file_format", ["csv", "gzip", "zstd", "parquet", "feather"])
+def test_count_rows(paths, sales_df, file_format):
+    path = paths[file_format]
+    assert count_rows(path, csv_index=build_csv_row_index(path)) == len(sales_df)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import drilldown
+from drilldown import build_sql, distinct_values, metric_name, run_drilldown, value_range
+
+METRICS = [("Order Value (INR)", "sum"), ("Delivery Time", "mean"), ("Delivery Time", "median"),
+           ("Quantity", "max"), ("Product Category", "count_distinct"), ("*", "count")]
+
+
+@pytest.fixture
+def dataset(sales_df, tmp_path):
+    path = tmp_path / "processed_data.parquet"
+    df = sales_df.astype({"Platform": "category"})
+    df.to_parquet(path, index=False)
+    return path, sales_df
+
+@pytest.fixture(params=["duckdb", "arrow"])
+def engine(request, monkeypatch):
+    if request.param == "duckdb":
+        pytest.importorskip("duckdb")
+    else:
+        monkeypatch.setattr(drilldown, "duckdb_available", lambda: False)
+    return request.param
+
+def _expected(df, keys):
+    grouped = df.groupby(keys, observed=True)
+    return pd.DataFrame({
+        metric_name("Order Value (INR)", "sum"): grouped["Order Value (INR)"].sum(),
+        metric_name("Delivery Time", "mean"): grouped["Delivery Time"].mean(),
+        metric_name("Delivery Time", "median"): grouped["Delivery Time"].median(),
+        metric_name("Quantity", "max"): grouped["Quantity"].max(),
+        metric_name("Product Category", "count_distinct"): grouped["Product Category"].nunique(),
+        metric_name("*", "count"): grouped.size(),
+    })
+
+
+# --- Queries Against the Rows ---
+
+def test_grouped_metrics_match_pandas(dataset, engine):
+    path, df = dataset
+    result = run_drilldown(path, {"group_by": ["Platform", "Service Rating"], "metrics": METRICS}, use_cube=False)
+    expected = _expected(df, ["Platform", "Service Rating"])
+    result = result.astype({"Platform": str}).set_index(["Platform", "Service Rating"]).sort_index()
+    pd.testing.assert_frame_equal(result, expected.sort_index(), check_dtype=False, check_names=False)
+    assert result[metric_name("*", "count")].sum() == len(df)
+
+def test_ungrouped_metrics_match_pandas(dataset, engine):
+    path, df = dataset
+    result = run_drilldown(path, {"metrics": METRICS}, use_cube=False).iloc[0]
+    assert result[metric_name("Order Value (INR)", "sum")] == pytest.approx(df["Order Value (INR)"].sum())
+    assert result[metric_name("Delivery Time", "median")] == df["Delivery Time"].median()
+    assert result[metric_name("Product Category", "count_distinct")] == df["Product Category"].nunique()
+    assert result[metric_name("*", "count")] == len(df)
+
+def test_filters_match_pandas(dataset, engine):
+    path, df = dataset
+    query = {"group_by": ["Product Category"], "metrics": [("Order Value (INR)", "mean"), ("*", "count")],
+             "filters": [("Platform", "in", ["Web", "App"]), ("Quantity", ">=", 4),
+                         ("Order Date", "between", ("2024-03-01", "2024-06-30"))]}
+    result = run_drilldown(path, query, use_cube=False).set_index("Product Category")
+    mask = (df["Platform"].isin(["Web", "App"]) & (df["Quantity"] >= 4)
+            & df["Order Date"].between(pd.Timestamp("2024-03-01"), pd.Timestamp("2024-06-30")))
+    expected = df[mask].groupby("Product Category")["Order Value (INR)"].agg(["mean", "size"])
+    assert result[metric_name("*", "count")].to_dict() == expected["size"].to_dict()
+    assert np.allclose(result[metric_name("Order Value (INR)", "mean")], expected["mean"].loc[result.index])
+    assert list(result[metric_name("Order Value (INR)", "mean")]) == sorted(result[metric_name("Order Value (INR)", "mean")], reverse=True)
+
+def test_time_grain_series_is_in_time_order(dataset, engine):
+    path, df = dataset
+    query = {"metrics": [("Order Value (INR)", "sum")], "time_column": "Order Date", "time_grain": "month"}
+    result = run_drilldown(path, query, use_cube=False)
+    expected = df.groupby(df["Order Date"].dt.to_period("M"))["Order Value (INR)"].sum()
+    months = pd.to_datetime(result["Order Date (month)"]).dt.to_period("M")
+    assert list(months) == list(expected.index)
+    assert np.allclose(result[metric_name("Order Value (INR)", "sum")], expected.to_numpy())
+
+def test_limit_keeps_the_largest_groups(dataset, engine):
+    path, df = dataset
+    result = run_drilldown(path, {"group_by": ["Order ID"], "metrics": [("Order Value (INR)", "sum")], "limit": 5},
+                           use_cube=False)
+    expected = df.nlargest(5, "Order Value (INR)")
+    assert list(result["Order ID"]) == list(expected["Order ID"])
+
+
+# --- Helpers ---
+
+def test_distinct_values_and_range(dataset, engine):
+    path, df = dataset
+    assert distinct_values(path, "Platform") == list(df["Platform"].value_counts().index)
+    low, high = value_range(path, "Order Date")
+    assert (pd.Timestamp(low), pd.Timestamp(high)) == (df["Order Date"].min(), df["Order Date"].max())
+
+def test_build_sql_binds_filter_values():
+    sql, params = build_sql({"group_by": ['Odd "name"'], "metrics": [("x", "sum")],
+                             "filters": [("Platform", "==", "Web'; DROP TABLE data; --")]})
+    assert '"Odd ""name"""' in sql
+    assert "DROP TABLE" not in sql
+    assert params == ["Web'; DROP TABLE data; --"]
+
+def test_unsupported_time_grain_is_rejected():
+    with pytest.raises(ValueError):
+        build_sql({"time_column": "Order Date", "time_grain": "fortnight"})
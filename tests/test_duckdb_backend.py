@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import write_all_formats
+
+pytest.importorskip("duckdb")
+
+from duckdb_backend import connect_dataset, run_query, source_sql  # noqa: E402
+
+
+# --- Connection ---
+
+@pytest.mark.parametrize("kind", ["csv", "gzip", "zstd", "parquet", "feather"])
+def test_view_aggregates_match_pandas(sales_df, tmp_path, kind):
+    path = write_all_formats(sales_df, tmp_path)[kind]
+    con = connect_dataset(path, threads=2, temp_dir=tmp_path / "spill")
+    result = con.execute(
+        'SELECT "Platform", COUNT(*) AS n, SUM("Order Value (INR)") AS total, AVG("Delivery Time") AS delivery '
+        'FROM data GROUP BY 1 ORDER BY 1').df().set_index("Platform")
+    expected = sales_df.groupby("Platform").agg(
+        n=("Order ID", "size"), total=("Order Value (INR)", "sum"), delivery=("Delivery Time", "mean"))
+    assert result["n"].tolist() == expected["n"].tolist()
+    assert np.allclose(result["total"], expected["total"])
+    assert np.allclose(result["delivery"], expected["delivery"])  # NULLs ignored like pandas NaNs
+
+def test_source_sql_reads_files_in_place(sales_df, tmp_path):
+    paths = write_all_formats(sales_df, tmp_path)
+    assert source_sql(paths["parquet"]).startswith("read_parquet(")
+    assert "compression='gzip'" in source_sql(paths["gzip"])
+    assert source_sql(paths["feather"]) is None
+
+def test_paths_with_quotes_are_escaped(sales_df, tmp_path):
+    path = tmp_path / "o'brien.parquet"
+    sales_df.to_parquet(path, index=False)
+    con = connect_dataset(path, temp_dir=tmp_path / "spill")
+    assert con.execute("SELECT COUNT(*) FROM data").fetchone()[0] == len(sales_df)
+
+def test_spill_directory_defaults_next_to_the_dataset(sales_df, tmp_path):
+    path = tmp_path / "data.parquet"
+    sales_df.to_parquet(path, index=False)
+    con = connect_dataset(path, memory_limit="1GB")
+    assert (tmp_path / "duckdb_tmp").is_dir()
+    assert con.execute("SELECT current_setting('memory_limit')").fetchone()[0] == "953.6 MiB"  # 1GB
+
+
+# --- Results ---
+
+def test_run_query_prints_a_preview_and_returns_everything(sales_df, tmp_path, capsys):
+    path = tmp_path / "data.parquet"
+    sales_df.to_parquet(path, index=False)
+    con = connect_dataset(path, temp_dir=tmp_path / "spill")
+    result = run_query(con, 'SELECT "Order ID", "Quantity" FROM data ORDER BY 1', max_rows=3)
+    out = capsys.readouterr().out
+    assert len(result) == len(sales_df)
+    assert "O000002" in out and "O000003" not in out
+    assert f"(Showing 3 of {len(sales_df)} rows)" in out
+    pd.testing.assert_series_equal(result["Quantity"], sales_df["Quantity"], check_dtype=False)
+
+def test_run_query_reports_empty_results(sales_df, tmp_path, capsys):
+    path = tmp_path / "data.parquet"
+    sales_df.to_parquet(path, index=False)
+    con = connect_dataset(path, temp_dir=tmp_path / "spill")
+    assert run_query(con, "SELECT * FROM data WHERE \"Quantity\" > 100").empty
+    assert "No results found" in capsys.readouterr().out
@@ -0,0 +1,116 @@
+import pytest
+
+import execution_planner
+from conftest import write_all_formats
+from execution_planner import (
+    PANDAS_LOAD_LINE, adapt_template, choose_engine, engine_instructions, estimate_dataset,
+)
+from profiler import fingerprint_file, load_or_build_profile
+
+TEMPLATE = f"""def main():
+{PANDAS_LOAD_LINE} # Memory-optimised dtypes
+    print(f"Successfully loaded {{input_csv_path}}. Shape: {{df.shape}}")
+    print("analysis")
+"""
+
+
+@pytest.fixture
+def counted_fingerprints(monkeypatch):
+    """Counts the files execution_planner hashes."""
+    hashed = []
+    def fingerprint(path):
+        hashed.append(path)
+        return fingerprint_file(path)
+    execution_planner._signature_fingerprint.cache_clear()
+    monkeypatch.setattr(execution_planner, "fingerprint_file", fingerprint)
+    yield hashed
+    execution_planner._signature_fingerprint.cache_clear()
+
+def _low_memory(monkeypatch, available=1024):
+    monkeypatch.setattr(execution_planner, "available_memory_bytes", lambda: available)
+
+
+# --- Estimates ---
+
+def test_estimate_uses_the_cached_profile(sales_df, tmp_path):
+    path = tmp_path / "data.csv"
+    sales_df.to_csv(path, index=False)
+    profile_dir = tmp_path / "profiles"
+    profile = load_or_build_profile(path, profile_dir=profile_dir)
+    assert estimate_dataset(path, profile_dir) == (profile["memory_bytes"], len(sales_df), "profile")
+
+def test_estimate_without_profile_reads_parquet_metadata(sales_df, tmp_path):
+    path = write_all_formats(sales_df, tmp_path)["parquet"]
+    estimated, n_rows, source = estimate_dataset(path, tmp_path / "profiles")
+    assert (n_rows, source) == (len(sales_df), "parquet metadata")
+    assert estimated > 0
+
+def test_compressed_csv_estimate_accounts_for_compression(sales_df, tmp_path):
+    paths = write_all_formats(sales_df, tmp_path)
+    estimated, _, source = estimate_dataset(paths["gzip"], tmp_path / "profiles")
+    assert source == "file size"
+    assert estimated == paths["gzip"].stat().st_size * execution_planner.COMPRESSED_CSV_MEMORY_FACTOR
+
+def test_file_is_hashed_once_per_signature(sales_df, tmp_path, counted_fingerprints):
+    path = tmp_path / "data.csv"
+    sales_df.to_csv(path, index=False)
+    for _ in range(3):
+        choose_engine(path, tmp_path / "profiles")
+    assert len(counted_fingerprints) == 1
+    sales_df.head(10).to_csv(path, index=False)  # Rewritten: new size and mtime
+    choose_engine(path, tmp_path / "profiles")
+    assert len(counted_fingerprints) == 2
+
+def test_precomputed_fingerprint_skips_hashing(sales_df, tmp_path, counted_fingerprints):
+    path = tmp_path / "data.csv"
+    sales_df.to_csv(path, index=False)
+    profile = load_or_build_profile(path, profile_dir=tmp_path / "profiles")
+    estimate = estimate_dataset(path, tmp_path / "profiles", fingerprint=profile["fingerprint"])
+    assert estimate[2] == "profile"
+    assert counted_fingerprints == []
+
+def test_missing_file_has_no_estimate(tmp_path):
+    with pytest.raises(OSError):
+        estimate_dataset(tmp_path / "missing.csv", tmp_path / "profiles")
+
+
+# --- Engine Choice ---
+
+def test_small_dataset_uses_pandas(sales_df, tmp_path):
+    path = write_all_formats(sales_df, tmp_path)["parquet"]
+    plan = choose_engine(path, tmp_path / "profiles")
+    assert plan["engine"] == "pandas"
+    assert "fits" in plan["reason"]
+
+def test_large_dataset_uses_an_out_of_core_engine(sales_df, tmp_path, monkeypatch):
+    pytest.importorskip("polars")
+    _low_memory(monkeypatch)
+    paths = write_all_formats(sales_df, tmp_path)
+    plan = choose_engine(paths["parquet"], tmp_path / "profiles")
+    assert plan["engine"] == "polars"
+    assert plan["chunk_rows"] == execution_planner.MIN_CHUNK_ROWS
+    assert "exceeds" in plan["reason"]
+    assert choose_engine(paths["gzip"], tmp_path / "profiles")["engine"] == "chunked"  # Can't be split
+
+def test_unknown_memory_falls_back_to_pandas(sales_df, tmp_path, monkeypatch):
+    monkeypatch.setattr(execution_planner, "available_memory_bytes", lambda: None)
+    path = write_all_formats(sales_df, tmp_path)["csv"]
+    assert choose_engine(path, tmp_path / "profiles")["engine"] == "pandas"
+
+
+# --- Template Adaptation ---
+
+@pytest.mark.parametrize("engine, expected", [("polars", "scan_dataset_polars"), ("dask", "load_dataset_dask"),
+                                              ("chunked", "CHUNK_ROWS = 25000")])
+def test_adapt_template_replaces_the_load_step(engine, expected):
+    plan = {"engine": engine, "chunk_rows": 25000}
+    adapted = adapt_template(TEMPLATE, plan)
+    assert expected in adapted
+    assert "load_dataset(input_csv_path" not in adapted and "df.shape" not in adapted
+    assert adapted.rstrip().endswith('print("analysis")')
+    compile(adapted, "<template>", "exec")
+    assert engine_instructions(plan).strip()
+
+def test_pandas_plan_keeps_the_template():
+    assert adapt_template(TEMPLATE, {"engine": "pandas"}) == TEMPLATE
+    assert engine_instructions({"engine": "pandas"}) == ""
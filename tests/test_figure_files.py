@@ -0,0 +1,39 @@
+import os
+
+import plotly.express as px
+import plotly.graph_objects as go
+
+from plot_utils import binned_histogram, figure_path, load_figure, save_figure
+
+
+def test_figure_path_swaps_the_suffix():
+    assert figure_path("plots/plot1_age.html") == "plots/plot1_age.json"
+    assert figure_path("plots/plot1_age.json") == "plots/plot1_age.json"
+    assert figure_path("plot1_age") == "plot1_age.json"
+
+
+def test_figures_round_trip_as_json(sales_df, tmp_path):
+    fig = binned_histogram(sales_df, "Order Value (INR)", title="Order values")
+    path = save_figure(fig, tmp_path / "plots" / "plot1_value.html", html=True)
+    assert path == figure_path(tmp_path / "plots" / "plot1_value.html")
+    assert path.endswith(".json")
+    assert (tmp_path / "plots" / "plotly.min.js").is_file()
+    assert load_figure(path).to_dict() == go.Figure(fig).to_dict()
+
+
+def test_figure_json_does_not_carry_plotly_js(sales_df, tmp_path):
+    fig = px.scatter(sales_df, x="Quantity", y="Order Value (INR)")
+    path = save_figure(fig, tmp_path / "nested" / "plots" / "plot1_scatter.json")
+    assert os.listdir(tmp_path / "nested" / "plots") == ["plot1_scatter.json"]
+    assert os.path.getsize(path) < 200_000  # The inlined plotly.js bundle alone is several MB
+    assert "plotly.js" not in open(path, encoding="utf-8").read()
+
+
+def test_html_copies_share_one_plotly_js(sales_df, tmp_path):
+    for i, column in enumerate(["Quantity", "Service Rating", "Delivery Time"]):
+        save_figure(binned_histogram(sales_df, column), tmp_path / f"plot{i}.json", html=True)
+    assert sorted(p.name for p in tmp_path.glob("*.js")) == ["plotly.min.js"]
+    js_size = (tmp_path / "plotly.min.js").stat().st_size
+    for html in tmp_path.glob("*.html"):
+        assert html.stat().st_size < js_size / 10
+        assert 'src="plotly.min.js"' in html.read_text(encoding="utf-8")
@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+import warnings
+
+import pytest
+
+from conftest import IMPORT_STUBS_DIR, PROJECT_DIR
+
+IMPORT_BUDGET_SECONDS = 1.0
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "plotly", "duckdb", "polars", "dask", "matplotlib", "langgraph",
+                 "langchain_google_genai")
+
+# Runs in a fresh interpreter: imports the module's own third-party entry points first (they are
+# needed anyway), then times `import <module>` and reports which heavy packages it pulled in.
+PROBE = """
+import json, sys, time
+sys.path.append({stubs!r})  # Framework stand-ins, after site-packages: used only when the package is missing
+for name in {preload!r}:
+    __import__(name)
+before = set(sys.modules)
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+new = sorted({{name.split(".")[0] for name in set(sys.modules) - before}})
+print(json.dumps({{"seconds": seconds, "new_modules": new}}))
+"""
+
+
+def _probe_import(module, preload, cwd):
+    env = {**os.environ, "PYTHONPATH": PROJECT_DIR}
+    code = PROBE.format(module=module, preload=list(preload), stubs=IMPORT_STUBS_DIR)
+    completed = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("module, preload", [
+    ("aianalyst", ("langchain_core.messages", "langchain_core.tools")),
+    ("main3", ("streamlit",)),
+])
+def test_import_is_fast_and_skips_heavy_packages(module, preload, tmp_path):
+    result = _probe_import(module, preload, cwd=tmp_path)  # No data.csv there: main3 renders its empty state
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS
+    assert not set(result["new_modules"]) & set(HEAVY_MODULES)
+
+def test_profiler_import_leaves_warning_filters_alone():
+    # numpy/pandas add narrow filters of their own when imported: compare with those already loaded
+    code = ("import warnings, numpy, pandas, pyarrow, tabulate; before = list(warnings.filters); import profiler; "
+            "print(warnings.filters == before)")
+    env = {**os.environ, "PYTHONPATH": PROJECT_DIR}
+    completed = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, timeout=120)
+    assert completed.stdout.strip() == "True", completed.stderr
+
+def test_date_parsing_warnings_stay_inside_the_profiler(sales_df):
+    from profiler import profile_column
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        profile_column(sales_df["Platform"])  # Text that pandas can't parse as dates with one format
+    assert not [w for w in caught if issubclass(w.category, UserWarning)]
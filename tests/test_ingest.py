@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+from conftest import write_all_formats
+from ingest import ingest_upload
+from profiler import fingerprint_file
+
+
+class _Upload(io.BytesIO):
+    """Stands in for Streamlit's UploadedFile (a seekable binary stream)."""
+
+
+def _ingest(source, tmp_path):
+    upload = _Upload(source.read_bytes())
+    upload.seek(5)  # The UI may already have peeked at the upload
+    return ingest_upload(upload, tmp_path / "upload.bin")
+
+
+# --- Copy and Fingerprint ---
+
+@pytest.mark.parametrize("kind", ["csv", "gzip", "zstd", "parquet", "feather"])
+def test_upload_is_copied_and_fingerprinted(sales_df, tmp_path, kind):
+    source = write_all_formats(sales_df, tmp_path)[kind]
+    result = _ingest(source, tmp_path)
+    dest = tmp_path / "upload.bin"
+    assert dest.read_bytes() == source.read_bytes()  # Compressed uploads are stored as uploaded
+    assert result["fingerprint"] == fingerprint_file(source)
+    assert result["size_bytes"] == source.stat().st_size
+    assert result["source"] == dest.as_posix()
+    assert not list(tmp_path.glob("*.part"))
+
+
+# --- Quick Profile ---
+
+@pytest.mark.parametrize("kind, expected_format, compression", [
+    ("csv", "csv", None), ("gzip", "csv", "gzip"), ("zstd", "csv", "zstd"),
+    ("parquet", "parquet", None), ("feather", "feather", None),
+])
+def test_quick_profile_matches_pandas(sales_df, tmp_path, kind, expected_format, compression):
+    result = _ingest(write_all_formats(sales_df, tmp_path)[kind], tmp_path)
+    assert (result["format"], result["compression"]) == (expected_format, compression)
+    assert result["n_rows"] == len(sales_df)
+    assert list(result["columns"]) == list(sales_df.columns)
+    assert {name: col["nulls"] for name, col in result["columns"].items()} == sales_df.isna().sum().to_dict()
+    assert result["columns"]["Quantity"]["dtype"] == "int64"
+    assert result["columns"]["Order Value (INR)"]["dtype"] == "double"
+
+def test_empty_csv_cells_count_as_missing(tmp_path):
+    source = tmp_path / "data.csv"
+    source.write_text("name,score\nx,1\n,\ny,3\n")
+    columns = _ingest(source, tmp_path)["columns"]
+    assert columns["name"]["nulls"] == 1
+    assert columns["score"]["nulls"] == 1
+
+def test_unparsable_csv_is_saved_without_a_profile(tmp_path, capsys):
+    source = tmp_path / "data.csv"
+    source.write_bytes(b"a,b\n1,2\n1,2,3,4\n" * 10)
+    result = _ingest(source, tmp_path)
+    assert result["n_rows"] is None and result["columns"] is None
+    assert (tmp_path / "upload.bin").read_bytes() == source.read_bytes()
+    assert result["fingerprint"] == fingerprint_file(source)
+    assert "Quick profile of the upload failed" in capsys.readouterr().out
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import write_all_formats
+from data_loader import detect_format, iter_dataset_chunks, load_dataset, load_dataset_dask, scan_dataset_polars
+from profiler import load_or_build_profile
+
+
+def test_detect_format_from_content(sales_df, tmp_path):
+    paths = write_all_formats(sales_df, tmp_path)
+    assert detect_format(paths["csv"]) == ("csv", None)
+    assert detect_format(paths["gzip"]) == ("csv", "gzip")
+    assert detect_format(paths["zstd"]) == ("csv", "zstd")
+    assert detect_format(paths["parquet"]) == ("parquet", None)
+    assert detect_format(paths["feather"]) == ("feather", None)
+
+def test_detect_format_falls_back_to_extension(tmp_path):
+    assert detect_format(tmp_path / "missing.parquet") == ("parquet", None)
+
+@pytest.mark.parametrize("kind", ["csv", "gzip", "zstd", "parquet", "feather"])
+def test_load_dataset_reads_every_format(sales_df, tmp_path, kind):
+    path = write_all_formats(sales_df, tmp_path)[kind]
+    df = load_dataset(path)
+    assert list(df.columns) == list(sales_df.columns)
+    assert len(df) == len(sales_df)
+    pd.testing.assert_series_equal(df["Order Value (INR)"], sales_df["Order Value (INR)"], check_dtype=False)
+    assert df["Platform"].astype(str).tolist() == sales_df["Platform"].tolist()
+
+@pytest.mark.parametrize("kind", ["csv", "parquet"])
+def test_load_dataset_columns_and_filters_match_pandas(sales_df, tmp_path, kind):
+    path = write_all_formats(sales_df, tmp_path)[kind]
+    filters = [("Platform", "in", ["Web", "App"]), ("Quantity", ">=", 5)]
+    df = load_dataset(path, columns=["Platform", "Quantity", "Order Value (INR)"], filters=filters)
+    expected = sales_df[sales_df["Platform"].isin(["Web", "App"]) & (sales_df["Quantity"] >= 5)]
+    assert list(df.columns) == ["Platform", "Quantity", "Order Value (INR)"]
+    assert len(df) == len(expected)
+    assert np.isclose(df["Order Value (INR)"].sum(), expected["Order Value (INR)"].sum())
+
+def test_iter_dataset_chunks_covers_the_file(sales_df, tmp_path):
+    paths = write_all_formats(sales_df, tmp_path)
+    for kind in ("csv", "gzip", "zstd", "parquet", "feather"):
+        chunks = list(iter_dataset_chunks(paths[kind], chunk_rows=500))
+        assert sum(len(chunk) for chunk in chunks) == len(sales_df)
+        assert np.isclose(pd.concat(chunks)["Quantity"].sum(), sales_df["Quantity"].sum())
+
+def test_profiles_agree_across_formats(sales_df, tmp_path):
+    profiles = {kind: load_or_build_profile(path, profile_dir=tmp_path / "profiles")
+                for kind, path in write_all_formats(sales_df, tmp_path).items()}
+    expected = profiles["csv"]
+    for kind, profile in profiles.items():
+        assert profile["n_rows"] == len(sales_df), kind
+        assert profile["columns"]["Platform"]["top_values"] == expected["columns"]["Platform"]["top_values"], kind
+        assert profile["columns"]["Quantity"]["stats"] == pytest.approx(expected["columns"]["Quantity"]["stats"]), kind
+    assert len({profile["fingerprint"] for profile in profiles.values()}) == len(profiles)  # Hashes the bytes as stored
+
+@pytest.mark.parametrize("kind", ["csv", "parquet", "feather"])
+def test_polars_scans_uncompressed_formats(sales_df, tmp_path, kind):
+    scanned = scan_dataset_polars(write_all_formats(sales_df, tmp_path)[kind]).collect()
+    assert scanned.height == len(sales_df) and scanned.columns == list(sales_df.columns)
+
+@pytest.mark.parametrize("kind", ["gzip", "zstd"])
+def test_out_of_core_engines_refuse_compressed_csv(sales_df, tmp_path, kind):
+    path = write_all_formats(sales_df, tmp_path)[kind]
+    with pytest.raises(ValueError, match=f"{kind}-compressed"):
+        scan_dataset_polars(path)
+    with pytest.raises(ValueError, match="Dask partitions"):
+        load_dataset_dask(path)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from instant_report import build_instant_report, column_roles
+from profiler import load_or_build_profile
+
+
+@pytest.fixture
+def dataset(sales_df, tmp_path):
+    rng = np.random.default_rng(5)
+    df = sales_df.copy()
+    df["Customer ID"] = [f"C{i}" for i in rng.integers(1, 800, len(df))]  # Repeats: ~1.7 orders per customer
+    df["Customer Code"] = df["Customer ID"].str.replace("C", "CU-")  # Code-like values, neutral name
+    df["Store ID"] = rng.integers(1, 400, len(df))  # Integer identifier with an ID-like name
+    path = tmp_path / "data.parquet"
+    df.to_parquet(path, index=False)
+    return path, df
+
+def _charted_columns(report):
+    return {title.split(" of ", 1)[1] for title, _ in report["charts"] if " of " in title}
+
+
+# --- Column Roles ---
+
+@pytest.mark.parametrize("with_profile", [False, True])
+def test_identifier_columns_are_not_charted(dataset, tmp_path, with_profile):
+    path, df = dataset
+    profile = load_or_build_profile(path, profile_dir=tmp_path / "profiles") if with_profile else None
+    charted = _charted_columns(build_instant_report(path, profile))
+    assert not charted & {"Order ID", "Customer ID", "Customer Code", "Store ID"}
+    assert {"Platform", "Product Category", "Order Value (INR)"} <= charted
+
+def test_profile_roles_skip_identifiers(dataset, tmp_path):
+    path, _ = dataset
+    roles = column_roles(path, load_or_build_profile(path, profile_dir=tmp_path / "profiles"))
+    assert "Customer ID" not in roles["categorical"] and "Order ID" not in roles["categorical"]
+    assert roles["datetime"] == ["Order Date"]
+
+def test_low_cardinality_codes_are_still_categories(tmp_path):
+    df = pd.DataFrame({"Region": np.tile(["R1", "R2", "R3"], 100), "Sales": np.arange(300.0)})
+    path = tmp_path / "data.parquet"
+    df.to_parquet(path, index=False)
+    assert "Region" in _charted_columns(build_instant_report(path))
+
+
+# --- Aggregates ---
+
+def test_aggregate_tables_match_pandas(dataset):
+    path, df = dataset
+    report = build_instant_report(path)
+    tables = dict(report["tables"])
+    assert report["n_rows"] == len(df)
+    table = tables["By Platform"].set_index("Platform")
+    expected = df.groupby("Platform")
+    assert table["Rows"].to_dict() == expected.size().to_dict()
+    measure = next(c for c in table.columns if c.startswith("Mean "))[len("Mean "):]
+    assert np.allclose(table[f"Mean {measure}"], expected[measure].mean().loc[table.index])
+
+def test_time_series_counts_every_row(dataset):
+    path, df = dataset
+    report = build_instant_report(path)
+    title, fig = next((title, fig) for title, fig in report["charts"] if title.startswith("Rows per"))
+    assert title == "Rows per week (Order Date)"
+    assert sum(fig.data[0].y) == len(df)
+    assert pd.Timestamp(fig.data[0].x[0]).year in (2023, 2024)
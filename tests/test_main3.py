@@ -0,0 +1,197 @@
+import os
+import sys
+import threading
+import types
+
+import pytest
+
+import profiler
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Counts the calls of the patched functions, by name."""
+    counts = {}
+
+    def count(module, name):
+        original = getattr(module, name)
+
+        def counted(*args, **kwargs):
+            counts[name] = counts.get(name, 0) + 1
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(module, name, counted)
+
+    counts["count"] = count
+    return counts
+
+
+@pytest.fixture
+def page_messages(main3, monkeypatch):
+    """Errors and warnings the page shows."""
+    messages = []
+    for kind in ("error", "warning"):
+        monkeypatch.setattr(main3.st, kind, lambda text, *args, **kwargs: messages.append(text))
+    return messages
+
+
+# --- Dataset Summaries ---
+
+def test_file_signature_changes_when_the_file_is_rewritten(main3, tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n1,2\n")
+    first = main3.file_signature(path)
+    assert first == main3.file_signature(path)
+    path.write_text("a,b\n1,2\n3,4\n")
+    assert main3.file_signature(path) != first
+    os.utime(path, ns=(first[2] + 10**9, first[2] + 10**9))  # Same size, new mtime
+    assert main3.file_signature(path)[1:] == (path.stat().st_size, first[2] + 10**9)
+
+def test_fingerprint_is_hashed_once_per_file_version(main3, calls, tmp_path):
+    calls["count"](profiler, "fingerprint_file")
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n1,2\n")
+    fingerprint = main3.cached_fingerprint(*main3.file_signature(path))
+    assert main3.cached_fingerprint(*main3.file_signature(path)) == fingerprint
+    assert calls["fingerprint_file"] == 1
+    path.write_text("a,b\n1,2\n3,4\n")
+    assert main3.cached_fingerprint(*main3.file_signature(path)) != fingerprint
+    assert calls["fingerprint_file"] == 2
+
+def test_summary_tables_come_from_the_profile(main3, sales_df, tmp_path):
+    path = tmp_path / "data.csv"
+    sales_df.to_csv(path, index=False)
+    fingerprint = profiler.fingerprint_file(path)
+    summary = main3.cached_summary(str(path), fingerprint)
+    profile = profiler.load_profile(fingerprint)
+    assert summary["n_rows"] == len(sales_df) and summary["duplicates"] == 0
+    assert summary["column_info"].equals(profiler.column_info_frame(profile))
+    assert summary["column_info"].loc["Delivery Time", "Null Count"] == sales_df["Delivery Time"].isna().sum()
+    platform = summary["unique_summary"]["Platform"]
+    assert platform["Count"] == 3 and sorted(platform["Values"]) == sorted(sales_df["Platform"].unique())
+    assert summary["unique_summary"]["Order ID"]["Count"] == len(sales_df)
+    assert summary["unique_summary"]["Order ID"]["Values"][-1] == "..."
+    assert list(summary["correlation"].columns) == list(profiler.correlation_frame(profile).columns)
+
+def test_summary_rerun_does_not_hash_or_profile_again(main3, calls, page_messages, sales_df, tmp_path):
+    calls["count"](profiler, "fingerprint_file")
+    calls["count"](profiler, "build_profile")
+    path = tmp_path / "data.csv"
+    sales_df.to_csv(path, index=False)
+    for _ in range(3):  # Streamlit reruns the script on every interaction
+        main3.display_csv_summary(main3.st.container(), str(path), "Original Data Summary")
+    assert page_messages == []
+    assert calls["fingerprint_file"] == 1 and calls["build_profile"] == 1
+    sales_df.head(100).to_csv(path, index=False)
+    main3.display_csv_summary(main3.st.container(), str(path), "Original Data Summary")
+    assert calls["fingerprint_file"] == 2 and calls["build_profile"] == 2
+
+
+# --- Data Browser ---
+
+def test_browser_pages_are_reread_once_the_schema_sidecar_exists(main3, tmp_path):
+    from data_loader import write_schema_sidecar
+    path = tmp_path / "data.csv"
+    path.write_text("id,amount\n1,2\n2,3\n")
+    signature = main3.browse_signature(path)
+    assert signature == main3.file_signature(path)
+    assert main3.cached_page(*signature, 0, None, False, None).schema.field("amount").type == "int64"
+    write_schema_sidecar(path, {"columns": {"id": {"dtype": "int64"}, "amount": {"dtype": "float64"}}})
+    assert main3.browse_signature(path) != signature
+    assert main3.cached_page(*main3.browse_signature(path), 0, None, False, None).schema.field("amount").type == "double"
+
+
+# --- Report Sections ---
+
+def test_report_text_is_reread_only_after_it_changes(main3, calls, tmp_path):
+    calls["count"](main3, "safe_read_file")
+    path = tmp_path / "plan.md"
+    assert main3.read_file_cached(path).startswith("Error: File not found")  # Not cached: the agent writes it later
+    path.write_text("# Plan\n")
+    assert main3.read_file_cached(path) == main3.read_file_cached(path) == "# Plan\n"
+    assert calls["safe_read_file"] == 2
+    path.write_text("# Revised plan\n")
+    assert main3.read_file_cached(path) == "# Revised plan\n"
+    assert calls["safe_read_file"] == 3
+
+def rerun_page(main3, monkeypatch, section):
+    """Runs the page script again with `section` selected; returns the paths it read."""
+    for files in (main3.PLANS_FILES, main3.CODE_FILES, main3.OUTPUT_FILES):
+        for path in files.values():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"content of {path}")
+    read = []
+    read_text = main3.Path.read_text
+    monkeypatch.setattr(main3.Path, "read_text", lambda self, *args, **kwargs: read.append(str(self)) or read_text(self, *args, **kwargs))
+    monkeypatch.setattr(main3.st, "radio", lambda label, options, **kwargs: section)
+    del sys.modules["main3"]
+    import main3
+    return read
+
+@pytest.mark.parametrize("section", ["📝 Plans", "🐍 Code", "💡 Outputs"])
+def test_only_the_selected_section_is_read(main3, monkeypatch, section):
+    main3.st.session_state.agent_run_complete = True
+    shown = {"📝 Plans": main3.PLANS_FILES, "🐍 Code": main3.CODE_FILES, "💡 Outputs": main3.OUTPUT_FILES}[section]
+    assert sorted(rerun_page(main3, monkeypatch, section)) == sorted(shown.values())
+
+def test_agent_sections_wait_for_a_completed_run(main3, monkeypatch):
+    assert rerun_page(main3, monkeypatch, "📝 Plans") == []
+
+
+# --- Agent Runs ---
+
+@pytest.fixture
+def fake_agent(main3, monkeypatch):
+    """Replaces aianalyst.run_agent: waits for `release`, then writes the processed file or raises `fail`."""
+    agent = types.SimpleNamespace(release=threading.Event(), fail=None, threads=[])
+
+    def run_agent():
+        agent.threads.append(threading.current_thread())
+        agent.release.wait(10)
+        if agent.fail:
+            raise agent.fail
+        os.makedirs(main3.PROCESSED_DATA_DIR, exist_ok=True)
+        open(main3.processed_data_file(), "wb").close()
+
+    module = types.ModuleType("aianalyst")
+    module.run_agent = run_agent
+    monkeypatch.setitem(sys.modules, "aianalyst", module)
+    return agent
+
+def test_agent_job_records_its_outcome_on_its_own_thread(main3, fake_agent):
+    session = dict(main3.st.session_state)
+    job = main3.AgentJob().start()
+    assert not job.done.wait(0.1)
+    fake_agent.release.set()
+    assert job.done.wait(10)
+    assert job.processed and job.error is None
+    assert fake_agent.threads[0] is not threading.current_thread()
+    assert dict(main3.st.session_state) == session  # The worker never touches Streamlit state
+
+def test_agent_job_keeps_the_error(main3, fake_agent):
+    fake_agent.fail = RuntimeError("model unavailable")
+    fake_agent.release.set()
+    job = main3.AgentJob().start()
+    assert job.done.wait(10)
+    assert job.error is fake_agent.fail and not job.processed
+
+def test_progress_reruns_the_page_once_the_run_finishes(main3, fake_agent, monkeypatch):
+    reruns = []
+    monkeypatch.setattr(main3.st, "rerun", lambda *args, **kwargs: reruns.append(args))
+    job = main3.AgentJob().start()
+    main3.display_agent_progress(job)  # Polled every AGENT_POLL_SECONDS by its fragment
+    assert reruns == []
+    fake_agent.release.set()
+    job.done.wait(10)
+    main3.display_agent_progress(job)
+    assert len(reruns) == 1
+
+def test_page_reports_a_finished_run_once(main3, fake_agent, monkeypatch):
+    fake_agent.release.set()
+    job = main3.AgentJob().start()
+    job.done.wait(10)
+    main3.st.session_state.agent_job = job
+    rerun_page(main3, monkeypatch, "⚡ Instant Report")
+    assert "agent_job" not in main3.st.session_state
+    assert main3.st.session_state.agent_run_complete is True
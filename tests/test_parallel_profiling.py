@@ -0,0 +1,38 @@
+import pytest
+
+import profiler
+from conftest import make_sales_frame, make_wide_frame
+from profiler import build_profile
+
+
+def test_parallel_profile_matches_serial():
+    df = make_wide_frame()
+    serial = build_profile(df, n_jobs=1)
+    parallel = build_profile(df, n_jobs=2)
+    assert parallel["columns"] == serial["columns"]
+    assert parallel["correlation"]["top_pairs"] == serial["correlation"]["top_pairs"]
+
+def test_parallel_profile_handles_text_and_nulls(sales_df):
+    serial = build_profile(sales_df, n_jobs=1)
+    assert build_profile(sales_df, n_jobs=3)["columns"] == serial["columns"]
+
+def test_parallel_profile_reuses_unchanged_columns():
+    before = build_profile(make_wide_frame())
+    changed = make_wide_frame()
+    changed["metric_7"] = changed["metric_7"] * 2
+    serial = build_profile(changed, baseline=before, n_jobs=1)
+    parallel = build_profile(changed, baseline=before, n_jobs=2)
+    assert parallel["reused_columns"] == serial["reused_columns"] == [c for c in changed.columns if c != "metric_7"]
+    assert parallel["columns"] == serial["columns"]
+
+@pytest.mark.parametrize("frame, parallel", [(make_sales_frame(200), False), (make_wide_frame(n_cols=40), True)])
+def test_auto_mode_only_pools_wide_tables(monkeypatch, frame, parallel):
+    monkeypatch.setattr(profiler, "PARALLEL_MIN_COLUMNS", 30)
+    monkeypatch.setattr(profiler.os, "cpu_count", lambda: 2)
+    pooled = []
+    run_parallel = profiler._profile_columns_parallel
+    monkeypatch.setattr(profiler, "_profile_columns_parallel",
+                        lambda df, hashes, n_jobs: pooled.append(n_jobs) or run_parallel(df, hashes, n_jobs))
+    profile = build_profile(frame, n_jobs=None)
+    assert pooled == ([2] if parallel else [])
+    assert profile["columns"] == build_profile(frame, n_jobs=1)["columns"]
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from plot_utils import aggregated_scatter, binned_histogram, box_from_stats
+
+
+# --- Histograms ---
+
+def test_histogram_counts_match_numpy(sales_df):
+    fig = binned_histogram(sales_df, "Delivery Time", nbins=20)
+    values = sales_df["Delivery Time"].dropna()
+    counts, edges = np.histogram(values, bins=20)
+    assert list(fig.data[0].y) == counts.tolist()
+    assert np.allclose(fig.data[0].x, (edges[:-1] + edges[1:]) / 2)
+    assert np.allclose(fig.data[0].width, np.diff(edges))
+
+def test_histogram_colour_groups_share_bins(sales_df):
+    fig = binned_histogram(sales_df, "Quantity", color="Platform", nbins=9)
+    assert [trace.name for trace in fig.data] == sorted(sales_df["Platform"].unique())
+    assert all(np.array_equal(trace.x, fig.data[0].x) for trace in fig.data)
+    for trace in fig.data:
+        assert sum(trace.y) == (sales_df["Platform"] == trace.name).sum()
+
+def test_text_histogram_shows_top_values(sales_df):
+    fig = binned_histogram(sales_df, "Product Category")
+    counts = sales_df["Product Category"].value_counts()
+    assert dict(zip(fig.data[0].x, fig.data[0].y)) == counts.to_dict()
+
+@pytest.mark.parametrize("unit", ["s", "ms", "us", "ns"])
+def test_datetime_histogram_is_independent_of_the_unit(sales_df, unit):
+    df = pd.DataFrame({"when": sales_df["Order Date"].astype(f"datetime64[{unit}]")})
+    fig = binned_histogram(df, "when", nbins=12)
+    centers = pd.to_datetime(pd.Series(fig.data[0].x))
+    assert centers.min() > pd.Timestamp("2024-01-01") and centers.max() < pd.Timestamp("2025-01-01")
+    span_ms = (df["when"].max() - df["when"].min()) / pd.Timedelta(milliseconds=1)
+    assert np.allclose(fig.data[0].width, span_ms / 12)  # Plotly datetime axes measure widths in ms
+    assert sum(fig.data[0].y) == len(df)
+
+
+# --- Scatter ---
+
+def test_small_scatter_keeps_every_point(sales_df):
+    fig = aggregated_scatter(sales_df, "Quantity", "Order Value (INR)", max_points=5_000)
+    assert len(fig.data[0].x) == len(sales_df)
+
+def test_large_scatter_becomes_a_density_grid(sales_df):
+    fig = aggregated_scatter(sales_df, "Order Date", "Delivery Time", max_points=500, bins=10)
+    heatmap = fig.data[0]
+    assert heatmap.type == "heatmap"
+    assert np.nansum(np.array(heatmap.z, dtype=float)) == sales_df["Delivery Time"].notna().sum()
+    x = pd.to_datetime(pd.Series(heatmap.x))
+    assert x.min().year == 2024 and x.max().year == 2024
+
+def test_large_coloured_scatter_is_a_stratified_sample(sales_df):
+    fig = aggregated_scatter(sales_df, "Quantity", "Order Value (INR)", color="Platform", max_points=400)
+    assert sum(len(trace.x) for trace in fig.data) == pytest.approx(400, abs=3)
+    assert "sample of" in fig.layout.title.text
+
+
+# --- Box Plots ---
+
+def test_box_from_stats_matches_pandas_quartiles(sales_df):
+    fig = box_from_stats(sales_df, "Order Value (INR)", x="Platform")
+    box = fig.data[0]
+    grouped = sales_df.groupby("Platform")["Order Value (INR)"]
+    expected = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    for i, name in enumerate(box.x):
+        assert (box.q1[i], box.median[i], box.q3[i]) == pytest.approx(tuple(expected.loc[name]))
+        assert box.mean[i] == pytest.approx(grouped.mean()[name])
+    assert box.boxpoints is False
+
+def test_box_from_stats_rejects_text_columns(sales_df):
+    with pytest.raises(TypeError):
+        box_from_stats(sales_df, "Platform")
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+import data_loader
+from conftest import write_all_formats
+from data_loader import dataset_columns, load_dataset, optimize_dtypes, processed_data_path, save_dataset
+
+
+def test_processed_data_is_parquet_when_pyarrow_is_available(monkeypatch):
+    assert processed_data_path("output") == "output/data_processed.parquet"
+    monkeypatch.setattr(data_loader, "columnar_available", lambda: False)
+    assert processed_data_path("output") == "output/data_processed.csv"
+
+def test_save_dataset_parquet_keeps_dtypes(sales_df, tmp_path):
+    df = optimize_dtypes(sales_df)
+    path = save_dataset(df, tmp_path / "out" / "clean.parquet", csv_copy=True)
+    loaded = load_dataset(path)
+    assert isinstance(loaded["Platform"].dtype, pd.CategoricalDtype)
+    assert loaded["Order Date"].equals(df["Order Date"])
+    assert (tmp_path / "out" / "clean.csv").is_file()
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather", ".csv"])
+def test_saved_dataset_round_trips(sales_df, tmp_path, suffix):
+    path = save_dataset(sales_df, tmp_path / f"clean{suffix}")
+    loaded = load_dataset(path)
+    assert list(loaded.columns) == list(sales_df.columns)
+    pd.testing.assert_series_equal(loaded["Order Value (INR)"], sales_df["Order Value (INR)"])
+    assert (pd.to_datetime(loaded["Order Date"]) == sales_df["Order Date"]).all()
+
+def test_mixed_type_columns_are_saved_as_text(tmp_path, capsys):
+    df = pd.DataFrame({"code": [1, "A7", None, 2.5], "n": [1, 2, 3, 4]})
+    loaded = load_dataset(save_dataset(df, tmp_path / "clean.parquet", csv_copy=True))
+    assert loaded["code"].tolist()[:2] == ["1", "A7"] and loaded["code"].isna().tolist() == [False, False, True, False]
+    assert loaded["n"].tolist() == [1, 2, 3, 4]
+    assert "Retrying with mixed-type columns as strings" in capsys.readouterr().out
+
+@pytest.mark.parametrize("kind", ["csv", "gzip", "zstd", "parquet", "feather"])
+def test_dataset_columns_reads_only_the_header(sales_df, tmp_path, kind):
+    assert dataset_columns(write_all_formats(sales_df, tmp_path)[kind]) == list(sales_df.columns)
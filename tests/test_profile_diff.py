@@ -0,0 +1,44 @@
+import pandas as pd
+
+from profiler import build_profile, diff_profiles, print_profile_diff
+
+
+def test_diff_mode_reuses_unchanged_columns(sales_df):
+    before = build_profile(sales_df)
+    cleaned = sales_df.copy()
+    cleaned["Delivery Time"] = cleaned["Delivery Time"].fillna(cleaned["Delivery Time"].median())
+    cleaned = cleaned.drop(columns=["Order ID"])
+    after = build_profile(cleaned, baseline=before)
+    assert "Delivery Time" not in after["reused_columns"]
+    assert set(after["reused_columns"]) == set(cleaned.columns) - {"Delivery Time"}
+    assert after["columns"]["Platform"] == before["columns"]["Platform"]
+
+    diff = diff_profiles(before, after)
+    assert diff["columns_removed"] == ["Order ID"]
+    assert diff["columns_changed"] == ["Delivery Time"]
+    assert diff["nulls_filled"] == [["Delivery Time", int(sales_df["Delivery Time"].isna().sum()), 0]]
+
+def test_diff_reports_dropped_rows_and_type_changes(sales_df):
+    raw = sales_df.copy()
+    raw["Quantity"] = raw["Quantity"].astype(str)  # Numbers read as text
+    raw = raw.drop(columns=["Order ID"])
+    raw = pd.concat([raw, raw.iloc[:25]], ignore_index=True)  # 25 duplicate rows
+    cleaned = raw.drop_duplicates().copy()
+    cleaned["Quantity"] = cleaned["Quantity"].astype(int)
+    cleaned["Unit Value"] = cleaned["Order Value (INR)"] / cleaned["Quantity"]
+    before = build_profile(raw)
+    diff = diff_profiles(before, build_profile(cleaned, baseline=before))
+    assert (diff["rows_before"], diff["rows_after"], diff["rows_dropped"]) == (len(raw), len(cleaned), 25)
+    assert (diff["duplicates_before"], diff["duplicates_after"]) == (25, 0)
+    assert diff["columns_added"] == ["Unit Value"]
+    assert [change[0] for change in diff["dtype_changes"]] == ["Quantity"]
+    assert diff["dtype_changes"][0][2] == "int64"
+
+def test_printed_diff_lists_only_what_changed(sales_df, capsys):
+    before = build_profile(sales_df)
+    cleaned = sales_df.dropna(subset=["Delivery Time"])
+    print_profile_diff(diff_profiles(before, build_profile(cleaned, baseline=before)))
+    report = capsys.readouterr().out
+    assert f"Rows: {len(sales_df)} -> {len(cleaned)} ({len(sales_df) - len(cleaned)} dropped)" in report
+    assert "Missing values:" in report and "Delivery Time" in report
+    assert "Data type changes:" not in report and "Columns added" not in report
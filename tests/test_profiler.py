@@ -0,0 +1,73 @@
+import hashlib
+
+import pandas as pd
+import pytest
+
+import profiler
+from profiler import build_profile, fingerprint_file, load_or_build_profile, load_profile, numeric_summary_frame
+
+
+# --- Fingerprint and Artifact ---
+
+def test_fingerprint_is_blake2b_of_the_content(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"a,b\n1,2\n" * 1000)
+    assert fingerprint_file(path) == hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
+def test_profile_is_built_once_and_reloaded(sales_df, tmp_path, monkeypatch):
+    path = tmp_path / "data.parquet"
+    sales_df.to_parquet(path)
+    profile_dir = tmp_path / "profiles"
+    first = load_or_build_profile(path, profile_dir=profile_dir)
+    assert load_profile(first["fingerprint"], profile_dir)["n_rows"] == len(sales_df)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("profile should come from the cache")
+    monkeypatch.setattr(profiler, "build_profile", fail)
+    second = load_or_build_profile(path, profile_dir=profile_dir)
+    assert second["columns"] == first["columns"]
+
+def test_profile_statistics_match_pandas(sales_df):
+    profile = build_profile(sales_df)
+    numeric = numeric_summary_frame(profile)
+    expected = sales_df.describe()
+    for column in ["Order Value (INR)", "Quantity", "Delivery Time"]:
+        for stat in ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]:
+            assert numeric.loc[stat, column] == pytest.approx(expected.loc[stat, column])
+    platform = profile["columns"]["Platform"]
+    counts = sales_df["Platform"].value_counts()
+    assert platform["kind"] == "categorical"
+    assert platform["n_unique"] == 3
+    assert platform["top_values"][0] == [counts.index[0], int(counts.iloc[0])]
+    assert profile["columns"]["Delivery Time"]["nulls"] == int(sales_df["Delivery Time"].isna().sum())
+    assert profile["duplicates"] == int(sales_df.duplicated().sum())
+    assert profile["columns"]["Order Date"]["kind"] == "datetime"
+
+def test_profile_detects_day_first_text_dates():
+    df = pd.DataFrame({"when": ["25/12/2024", "03/01/2024", "14/02/2024"], "n": [1, 2, 3]})
+    col = build_profile(df)["columns"]["when"]
+    assert col["potential_datetime"] is True
+    assert col["datetime_format"] == "%d/%m/%Y"
+
+def test_profile_saves_correlation_matrix_artifact(sales_df, tmp_path):
+    path = tmp_path / "data.parquet"
+    sales_df.to_parquet(path)
+    profile = load_or_build_profile(path, profile_dir=tmp_path / "profiles")
+    matrix = pd.read_csv(profile["correlation"]["matrix_path"], index_col=0)
+    expected = sales_df.select_dtypes("number").corr()
+    pd.testing.assert_frame_equal(matrix, expected.round(4), check_exact=False, atol=1e-4, check_names=False)
+
+
+# --- Source Dtypes ---
+
+def test_profile_reports_source_dtypes(sales_df, tmp_path, capsys):
+    path = tmp_path / "data.csv"
+    sales_df.to_csv(path, index=False)
+    profile = load_or_build_profile(path, profile_dir=tmp_path / "profiles")
+    raw = pd.read_csv(path)
+    columns = profile["columns"]
+    assert columns["Quantity"]["dtype"] == str(raw["Quantity"].dtype)
+    assert columns["Quantity"]["optimized_dtype"] == "int32"
+    assert columns["Platform"]["dtype"] == str(raw["Platform"].dtype)
+    assert columns["Platform"]["optimized_dtype"] == "category"
+    assert "Memory optimised" not in capsys.readouterr().out  # Summary stdout is LLM context
@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import pytest
+
+import profiler
+from conftest import PROJECT_DIR, make_wide_frame
+from profiler import PROFILE_DIR_ENV, build_profile, diff_profiles, estimate_tokens, print_profile_report, serialize_profile
+
+
+@pytest.mark.parametrize("budget", [300, 800, 1500])
+def test_serialized_profile_fits_the_token_budget(budget):
+    profile = build_profile(make_wide_frame())
+    text = serialize_profile(profile, token_budget=budget)
+    assert estimate_tokens(text) <= budget
+    assert text.startswith("Dataset: 300 rows x 63 columns")
+    assert "less relevant columns not listed" in text
+
+def test_serialized_profile_lists_every_column_when_it_fits(sales_df):
+    text = serialize_profile(build_profile(sales_df), token_budget=5000)
+    for column in sales_df.columns:
+        assert f"\n{column} | " in text
+
+def test_serialized_profile_is_much_smaller_than_the_printed_report(capsys):
+    profile = build_profile(make_wide_frame(n_cols=200))
+    print_profile_report(profile)
+    report = capsys.readouterr().out
+    assert estimate_tokens(serialize_profile(profile)) * 5 < estimate_tokens(report)
+
+def test_serialized_diff_summarises_the_cleaning(sales_df):
+    before = build_profile(sales_df)
+    cleaned = sales_df.dropna(subset=["Delivery Time"]).drop(columns=["Order ID"])
+    diff = diff_profiles(before, build_profile(cleaned, baseline=before))
+    text = serialize_profile(build_profile(cleaned), token_budget=1500, diff=diff)
+    lines = text.splitlines()
+    assert lines[1] == f"Cleaning changes: rows {len(sales_df)} -> {len(cleaned)}, duplicates 0 -> 0"
+    assert "columns added: [], removed: ['Order ID']" in lines
+    assert estimate_tokens(text) <= 1500
+
+def test_planning_prompts_reuse_the_summary_script_profile(aianalyst, sales_df, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # The agent's hardcoded "D:/AI Data Analysis/..." paths resolve in here
+    monkeypatch.setenv(PROFILE_DIR_ENV, "")  # Restored after the test; initialize_state sets it
+    agent_dir = tmp_path / "D:" / "AI Data Analysis"
+    agent_dir.mkdir(parents=True)
+    shutil.copy(os.path.join(PROJECT_DIR, "datanew.py"), agent_dir / "datanew.py")
+    sales_df.to_csv(agent_dir / "data.csv", index=False)
+    sales_df.to_csv(tmp_path / "data.csv", index=False)  # The summary script reads it relative to the working directory
+
+    state = aianalyst.initialize_state({})
+    assert state["profile_dir"] == os.environ[PROFILE_DIR_ENV] == "D:/AI Data Analysis/output/profiles"
+    execute = getattr(aianalyst.execute_python_code, "func", aianalyst.execute_python_code)  # Unwrap the langchain tool
+    assert execute(state["current_code"]).startswith("Execution successful")
+    assert any(name.endswith(".json") for name in os.listdir(state["profile_dir"]))
+    assert not os.path.exists("output")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the summary script's profile should be reused")
+    monkeypatch.setattr(profiler, "build_profile", fail)
+    assert aianalyst.build_compact_summary(state, "cleaning").startswith(f"Dataset: {len(sales_df)} rows x 8 columns")
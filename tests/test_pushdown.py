@@ -0,0 +1,121 @@
+import ast
+
+import numpy as np
+import pytest
+
+from pushdown import apply_pushdown, plan_pushdown
+
+
+def _run(code):
+    """Executes a generated-style script and returns its namespace."""
+    namespace = {}
+    exec(compile(code, "<script>", "exec"), namespace)
+    return namespace
+
+def _load_keywords(code):
+    call = next(node for node in ast.walk(ast.parse(code))
+                if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "load_dataset")
+    return {kw.arg: ast.literal_eval(kw.value) for kw in call.keywords}
+
+@pytest.fixture
+def parquet_path(sales_df, tmp_path):
+    path = tmp_path / "data.parquet"
+    sales_df.to_parquet(path, index=False)
+    return path.as_posix()
+
+
+# --- Rewriting ---
+
+def test_pushdown_matches_the_unrewritten_script(parquet_path):
+    code = (
+        "from data_loader import load_dataset\n"
+        f"INPUT_PATH = {parquet_path!r}\n"
+        "df = load_dataset(INPUT_PATH)\n"
+        "df = df[(df['Platform'] == 'Web') & (df['Quantity'] >= 3)]\n"
+        "print(df.shape)\n"
+        "result = df.groupby('Product Category')['Order Value (INR)'].sum().sort_index()\n"
+        "rated = df.loc[df['Service Rating'] > 2, 'Delivery Time'].mean()\n"
+    )
+    rewritten = apply_pushdown(code)
+    assert _load_keywords(rewritten) == {
+        "columns": ["Platform", "Product Category", "Order Value (INR)", "Quantity", "Service Rating", "Delivery Time"],
+        "filters": [("Platform", "==", "Web"), ("Quantity", ">=", 3)],
+    }
+    original, pushed = _run(code), _run(rewritten)
+    assert pushed["result"].to_dict() == pytest.approx(original["result"].to_dict())
+    assert np.isclose(pushed["rated"], original["rated"])
+    assert pushed["df"].shape[0] == original["df"].shape[0]
+
+def test_reversed_comparisons_and_isin_are_pushed(parquet_path):
+    code = (
+        "from data_loader import load_dataset\n"
+        f"df = load_dataset({parquet_path!r})\n"
+        "df = df[100 < df['Order Value (INR)']]\n"
+        "df = df[df['Platform'].isin(['App', 'Store'])]\n"
+        "total = df['Order Value (INR)'].sum()\n"
+    )
+    rewritten = apply_pushdown(code)
+    assert _load_keywords(rewritten)["filters"] == [("Order Value (INR)", ">", 100), ("Platform", "in", ["App", "Store"])]
+    assert np.isclose(_run(rewritten)["total"], _run(code)["total"])
+
+def test_plot_calls_keep_their_columns(parquet_path):
+    code = (
+        "import plotly.express as px\n"
+        "from data_loader import load_dataset\n"
+        f"df = load_dataset({parquet_path!r})\n"
+        "fig = px.scatter(df, x='Quantity', y='Order Value (INR)', color='Platform')\n"
+    )
+    assert _load_keywords(apply_pushdown(code)) == {"columns": ["Platform", "Order Value (INR)", "Quantity"]}
+
+def test_pushdown_preserves_multiline_calls(parquet_path):
+    code = (
+        "from data_loader import load_dataset\n"
+        f"df = load_dataset(\n    {parquet_path!r},\n)\n"
+        "value = df['Quantity'].max()\n"
+    )
+    rewritten = apply_pushdown(code)
+    assert _load_keywords(rewritten) == {"columns": ["Quantity"]}
+    assert _run(rewritten)["value"] == _run(code)["value"]
+
+
+# --- Conservative Fallback ---
+
+@pytest.mark.parametrize("usage", [
+    "print(df.head())",
+    "summary = df.describe()",
+    "cols = list(df.columns)",
+    "name = 'Quantity'\nvalue = df[name].sum()",
+    "fig = px.histogram(df)",
+    "grouped = df.groupby('Platform').mean(numeric_only=True)",
+])
+def test_unknown_column_needs_disable_pushdown(parquet_path, usage):
+    code = (
+        "import plotly.express as px\n"
+        "from data_loader import load_dataset\n"
+        f"df = load_dataset({parquet_path!r})\n"
+        f"{usage}\n"
+    )
+    assert plan_pushdown(code) is None
+    assert apply_pushdown(code) == code
+
+def test_cleaning_scripts_are_never_rewritten(parquet_path):
+    code = (
+        "from data_loader import load_dataset, save_dataset\n"
+        f"df = load_dataset({parquet_path!r})\n"
+        "df = df[df['Quantity'] > 2]\n"
+        "save_dataset(df, 'out.parquet')\n"
+    )
+    assert plan_pushdown(code) is None
+
+def test_filters_after_other_statements_are_not_pushed(parquet_path):
+    code = (
+        "from data_loader import load_dataset\n"
+        f"df = load_dataset({parquet_path!r})\n"
+        "before = len(df)\n"
+        "df = df[df['Quantity'] > 2]\n"
+        "value = df['Quantity'].sum()\n"
+    )
+    plan = plan_pushdown(code)
+    assert plan["filters"] == []
+    assert plan["columns"] == ["Quantity"]
+    assert _run(apply_pushdown(code))["before"] == _run(code)["before"]
@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+
+import data_loader
+from data_loader import load_dataset, read_schema_sidecar, schema_sidecar_path, write_schema_sidecar
+from profiler import load_or_build_profile
+
+
+def test_schema_sidecar_types_csv_reads(tmp_path):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"day": ["03/01/2024", "25/12/2024"], "kind": ["a", "b"], "n": [1, 2]}).to_csv(path, index=False)
+    write_schema_sidecar(path, {"columns": {
+        "day": {"dtype": "str", "categorical": False, "datetime_format": "%d/%m/%Y"},
+        "kind": {"dtype": "str", "categorical": True, "datetime_format": None},
+        "n": {"dtype": "int32", "categorical": False, "datetime_format": None},
+    }})
+    df = load_dataset(path)
+    assert df["day"].tolist() == [pd.Timestamp("2024-01-03"), pd.Timestamp("2024-12-25")]
+    assert isinstance(df["kind"].dtype, pd.CategoricalDtype)
+    assert df["n"].dtype == "int32"
+
+def test_schema_sidecar_is_ignored_once_the_file_changes(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a\n1\n")
+    write_schema_sidecar(path, {"columns": {"a": {"dtype": "int64", "categorical": False, "datetime_format": None}}})
+    assert read_schema_sidecar(path) is not None
+    path.write_text("a\n1\n2\n")
+    os.utime(path, ns=(0, 0))
+    assert read_schema_sidecar(path) is None
+
+def test_profiling_a_csv_writes_its_sidecar(sales_df, tmp_path):
+    path = tmp_path / "data.csv"
+    sales_df.assign(**{"Order Date": sales_df["Order Date"].dt.strftime("%d/%m/%Y %H:%M")}).to_csv(path, index=False)
+    profile = load_or_build_profile(path, profile_dir=tmp_path / "profiles")
+    sidecar = read_schema_sidecar(path)
+    assert sidecar["fingerprint"] == profile["fingerprint"]
+    assert sidecar["columns"]["Order Date"]["datetime_format"] == "%d/%m/%Y %H:%M"
+    assert sidecar["columns"]["Platform"]["categorical"] and not sidecar["columns"]["Order ID"]["categorical"]
+
+    df = load_dataset(path, columns=["Order Date", "Platform", "Quantity"])
+    assert df["Order Date"].equals(sales_df["Order Date"].astype(df["Order Date"].dtype))
+    assert isinstance(df["Platform"].dtype, pd.CategoricalDtype)
+    assert df["Quantity"].tolist() == sales_df["Quantity"].tolist()
+
+def test_sidecars_are_only_written_for_csv(sales_df, tmp_path):
+    path = tmp_path / "data.parquet"
+    sales_df.to_parquet(path, index=False)
+    load_or_build_profile(path, profile_dir=tmp_path / "profiles")
+    assert not os.path.exists(schema_sidecar_path(path))
+
+def test_csv_reads_use_the_pyarrow_engine(tmp_path, monkeypatch):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n1,x\n2,y\n")
+    engines = []
+    read_csv = pd.read_csv
+    monkeypatch.setattr(data_loader.pd, "read_csv", lambda *args, **kwargs: engines.append(kwargs.get("engine")) or read_csv(*args, **kwargs))
+    assert load_dataset(path)["a"].tolist() == [1, 2]
+    assert engines == ["pyarrow"]
+
+def test_wrong_sidecar_falls_back_to_default_parsing(tmp_path, capsys):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n1,x\n2,y\n")
+    write_schema_sidecar(path, {"columns": {"b": {"dtype": "int64", "categorical": False, "datetime_format": None}}})
+    df = load_dataset(path)
+    assert df["b"].tolist() == ["x", "y"]
+    assert "Falling back to default parsing" in capsys.readouterr().out
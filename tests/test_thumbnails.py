@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import plotly.graph_objects as go
+import pytest
+
+import thumbnails
+from plot_utils import save_figure
+from thumbnails import _is_stale, render_thumbnails, start_thumbnail_renderer, thumbnail_path
+
+FAKE_PNG = b"\x89PNG\r\n\x1a\nthumbnail"
+
+# Replaces kaleido in a worker process: Figure.to_image returns fixed bytes instead of driving Chrome
+FAKE_KALEIDO = f"""
+import plotly.graph_objects as go
+go.Figure.to_image = lambda self, *args, **kwargs: {FAKE_PNG!r}
+"""
+
+
+@pytest.fixture
+def fake_kaleido(monkeypatch):
+    """Renders in threads with a fake Figure.to_image, recording the size of every rendered figure."""
+    rendered = []
+    def to_image(fig, *args, **kwargs):
+        rendered.append((fig.layout.width, fig.layout.height))
+        return FAKE_PNG
+    monkeypatch.setattr(go.Figure, "to_image", to_image)
+    monkeypatch.setattr(thumbnails, "ProcessPoolExecutor", ThreadPoolExecutor)
+    return rendered
+
+@pytest.fixture
+def plot_dir(tmp_path):
+    plot_dir = tmp_path / "saved_plots"
+    for name in ("plot1_age", "plot2_income"):
+        save_figure(go.Figure(go.Bar(x=["a", "b"], y=[1, 2])), plot_dir / f"{name}.html")
+    return plot_dir
+
+def _age(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - int(seconds * 1e9)))
+
+
+# --- Paths and Staleness ---
+
+def test_thumbnail_path():
+    assert thumbnail_path("out/saved_plots/plot1_age.json") == "out/saved_plots/plot1_age.thumb.png"
+
+def test_is_stale(plot_dir):
+    figure = plot_dir / "plot1_age.json"
+    assert _is_stale(figure)  # No thumbnail yet
+    thumb = thumbnail_path(figure)
+    with open(thumb, "wb") as f:
+        f.write(FAKE_PNG)
+    _age(figure, 10)
+    assert not _is_stale(figure)
+    _age(thumb, 20)  # The figure was saved again after its thumbnail
+    assert _is_stale(figure)
+
+
+# --- Rendering ---
+
+def test_render_thumbnails_renders_only_stale_figures(plot_dir, tmp_path, fake_kaleido):
+    assert render_thumbnails([plot_dir, tmp_path / "missing"]) == 2
+    assert fake_kaleido == [(thumbnails.THUMBNAIL_WIDTH, thumbnails.THUMBNAIL_HEIGHT)] * 2
+    assert sorted(p.name for p in plot_dir.iterdir()) == ["plot1_age.json", "plot1_age.thumb.png",
+                                                        "plot2_income.json", "plot2_income.thumb.png"]
+    assert (plot_dir / "plot1_age.thumb.png").read_bytes() == FAKE_PNG
+
+    assert render_thumbnails([plot_dir]) == 0  # Up to date
+    _age(thumbnail_path(plot_dir / "plot2_income.json"), 20)
+    assert render_thumbnails([plot_dir]) == 1
+    assert len(fake_kaleido) == 3
+
+def test_failed_render_is_reported_and_leaves_no_file(plot_dir, fake_kaleido, capsys):
+    (plot_dir / "plot3_broken.json").write_text("{not json")
+    assert render_thumbnails([plot_dir]) == 2
+    assert "Could not render a thumbnail" in capsys.readouterr().out
+    assert not any(name.startswith("plot3_broken.thumb") for name in os.listdir(plot_dir))
+    assert _is_stale(plot_dir / "plot3_broken.json")  # Retried on the next run
+
+
+# --- Background Process ---
+
+def test_renderer_is_skipped_without_kaleido(monkeypatch, plot_dir):
+    monkeypatch.setattr(thumbnails, "thumbnails_available", lambda: False)
+    assert start_thumbnail_renderer(plot_dir) is None
+
+def test_background_renderer_command_renders_the_thumbnails(monkeypatch, plot_dir, tmp_path):
+    launched = []
+    monkeypatch.setattr(thumbnails, "thumbnails_available", lambda: True)
+    monkeypatch.setattr(thumbnails.subprocess, "Popen", lambda *args, **kwargs: launched.append((args, kwargs)) or "process")
+    assert start_thumbnail_renderer(plot_dir) == "process"
+    (command,), options = launched[0]
+    assert command == [sys.executable, "-m", "thumbnails", str(plot_dir)]
+    monkeypatch.undo()
+
+    # Run the launched command for real, with kaleido replaced through sitecustomize in every process
+    (tmp_path / "site").mkdir()
+    (tmp_path / "site" / "sitecustomize.py").write_text(FAKE_KALEIDO)
+    env = {**options["env"], "PYTHONPATH": os.pathsep.join([str(tmp_path / "site"), options["env"]["PYTHONPATH"]])}
+    completed = subprocess.run(command, cwd=options["cwd"], env=env, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.strip() == "Rendered 2 thumbnails"
+    assert (plot_dir / "plot2_income.thumb.png").read_bytes() == FAKE_PNG
+
+@pytest.mark.parametrize("step, plot_dir_name", [("execute_visualisation", "saved_plots"), ("execute_trends", "trend_plots")])
+def test_agent_starts_the_renderer_for_plotting_steps(aianalyst, monkeypatch, tmp_path, step, plot_dir_name):
+    started = []
+    monkeypatch.setattr(thumbnails, "start_thumbnail_renderer", lambda *dirs: started.append(dirs) or "process")
+    assert aianalyst.start_thumbnails({"current_step": step, "output_dir": str(tmp_path)}) == "process"
+    assert started == [(f"{tmp_path}/{plot_dir_name}",)]
@@ -0,0 +1,85 @@
+"""
+Static PNG thumbnails of the saved Plotly figures, for the Visualizations/Trends tabs of main3.py.
+
+After the visualisation or trends script has written its figures, the agent starts this module
+as a background process (`python -m thumbnails <plot_dir> ...`). It renders one small PNG per
+figure JSON in a process pool, so the UI can show a grid of thumbnails straight away and load
+an interactive figure only when it is opened.
+
+Rendering needs the optional `kaleido` package; without it no thumbnails are made and the UI
+falls back to listing the figures.
+"""
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from plot_utils import FIGURE_SUFFIX, load_figure
+
+# --- Configuration ---
+THUMBNAIL_SUFFIX = ".thumb.png"
+THUMBNAIL_WIDTH = 480
+THUMBNAIL_HEIGHT = 320
+THUMBNAIL_WORKERS = 4  # Each worker drives its own headless browser, so keep the pool small
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def thumbnails_available():
+    """True if kaleido (Plotly's static image export) is installed."""
+    try:
+        import kaleido  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def thumbnail_path(figure_file):
+    """Thumbnail PNG for a figure JSON file (plot1_age.json -> plot1_age.thumb.png)."""
+    return os.path.splitext(str(figure_file))[0] + THUMBNAIL_SUFFIX
+
+def _is_stale(figure_file):
+    thumb = thumbnail_path(figure_file)
+    return not os.path.exists(thumb) or os.path.getmtime(thumb) < os.path.getmtime(figure_file)
+
+def render_thumbnail(figure_file):
+    """Renders the thumbnail of one figure JSON file (written atomically) and returns its path."""
+    fig = load_figure(figure_file)
+    fig.update_layout(width=THUMBNAIL_WIDTH, height=THUMBNAIL_HEIGHT, margin={"l": 30, "r": 10, "t": 40, "b": 30},
+                      title_font_size=13, showlegend=False)
+    thumb = thumbnail_path(figure_file)
+    tmp_path = f"{thumb}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(fig.to_image(format="png"))
+    os.replace(tmp_path, thumb)  # The UI never sees a half-written PNG
+    return thumb
+
+def render_thumbnails(plot_dirs, n_jobs=THUMBNAIL_WORKERS):
+    """Renders missing or outdated thumbnails for every figure JSON in `plot_dirs` in a process pool."""
+    figures = [os.path.join(plot_dir, name) for plot_dir in plot_dirs if os.path.isdir(plot_dir)
+               for name in sorted(os.listdir(plot_dir)) if name.endswith(FIGURE_SUFFIX)]
+    figures = [figure_file for figure_file in figures if _is_stale(figure_file)]
+    if not figures:
+        return 0
+    rendered = 0
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(figures))) as pool:
+        for figure_file, future in [(f, pool.submit(render_thumbnail, f)) for f in figures]:
+            try:
+                future.result()
+                rendered += 1
+            except Exception as e:
+                print(f"Warning: Could not render a thumbnail for {figure_file} ({repr(e)}).")
+    return rendered
+
+def start_thumbnail_renderer(*plot_dirs):
+    """Starts thumbnail rendering for `plot_dirs` in a background process; returns it (None without kaleido)."""
+    if not thumbnails_available():
+        print("Thumbnails skipped: kaleido is not installed.")
+        return None
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(p for p in [PROJECT_DIR, env.get("PYTHONPATH", "")] if p)
+    print(f"Rendering plot thumbnails in the background for {', '.join(map(str, plot_dirs))}")
+    return subprocess.Popen([sys.executable, "-m", "thumbnails", *map(str, plot_dirs)], cwd=PROJECT_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+if __name__ == "__main__":
+    print(f"Rendered {render_thumbnails(sys.argv[1:])} thumbnails")